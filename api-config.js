@@ -59,6 +59,7 @@ const ApiConfig = {
         EXECUTE_TEST: '/api/v1/execute-test',
         ANALYZE_RESULTS: '/api/v1/analyze-results',
         ANALYZE_RESULTS_STRUCTURED: '/api/v1/analyze-results-structured', // 新增结构化分析接口
+        ANALYZE_RESULTS_STRUCTURED_STREAM: '/api/v1/analyze-results-structured/stream', // 流式结构化分析接口
         
         // Node.js前端API
         PROMPTS: '/api/prompts'
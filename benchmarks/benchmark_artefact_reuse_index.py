@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成产物复用索引性能基准
+向索引写入指定数量的历史测试要点，测量索引载入耗时及命中、未命中查询的单次耗时
+
+使用方法: python benchmarks/benchmark_artefact_reuse_index.py [记录数 ...]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.artefact_reuse_index import ArtefactReuseIndex
+
+MODULES = ["用户", "订单", "商品", "支付", "库存", "物流", "评价", "优惠券", "会员", "积分",
+           "退款", "发票", "地址", "购物车", "消息", "权限", "报表", "审批", "合同", "账单"]
+ACTIONS = ["创建", "删除", "修改", "查询", "导出", "导入", "审核", "撤销", "提交", "分配"]
+SCENARIOS = ["参数缺失时返回错误提示", "鉴权失败时返回401", "请求超时时自动重试", "成功后跳转详情页",
+             "重复提交时提示已存在", "分页查询第2页返回10条", "字段超长时截断保存", "并发操作时保证一致"]
+CONDITIONS = ["管理员登录后", "普通用户登录后", "未登录时", "在移动端", "在网页端", "在批量模式下"]
+
+
+def generate_point() -> str:
+    """随机组合模块、操作、前提和场景生成一条测试要点"""
+    return (f"{random.choice(CONDITIONS)}{random.choice(MODULES)}{random.choice(ACTIONS)}接口"
+            f"编号{random.randint(1, 99999)}，{random.choice(SCENARIOS)}")
+
+
+def run(count: int, queries: int = 1000) -> None:
+    """对指定规模的索引执行一次基准测试"""
+    random.seed(count)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = ArtefactReuseIndex(os.path.join(tmp_dir, "index.db"))
+        points = [generate_point() for _ in range(count)]
+
+        start = time.perf_counter()
+        for offset in range(0, count, 10000):
+            index.add_many([
+                (f"TP{i:012d}", "test_data", "bench", point, f"name: {point}")
+                for i, point in enumerate(points[offset:offset + 10000], offset)
+            ])
+        add_elapsed = time.perf_counter() - start
+
+        # 使用新实例模拟服务重启后的首次载入
+        index = ArtefactReuseIndex(index.db_path)
+        start = time.perf_counter()
+        index._refresh()
+        load_elapsed = time.perf_counter() - start
+
+        hit_queries = [random.choice(points) + "。" for _ in range(queries)]
+        miss_queries = [f"第{i}个全新的需求描述，与历史要点均不相似" for i in range(queries)]
+        timings = []
+        for batch in (hit_queries, miss_queries):
+            start = time.perf_counter()
+            hits = sum(1 for query in batch if index.lookup(query, "test_data", "bench"))
+            timings.append(((time.perf_counter() - start) / len(batch) * 1000, hits))
+
+    print(f"{count:10d}  {add_elapsed:8.1f} 秒  {load_elapsed:8.2f} 秒  "
+          f"{timings[0][0]:8.2f} 毫秒 ({timings[0][1]}/{queries} 命中)  {timings[1][0]:8.2f} 毫秒")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    print("  记录数      写入耗时     载入耗时       命中查询单次耗时             未命中查询单次耗时")
+    for count in counts:
+        run(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel流式读取性能基准
+生成包含多个工作表的大型测试用例工作簿，测量流式逐行读取的耗时和Python堆内存峰值，
+并可与按工作表重复调用pd.read_excel的原实现对比
+
+使用方法: python benchmarks/benchmark_excel_ingestion.py [总行数 ...] [--compare]
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pandas as pd
+from openpyxl import Workbook
+
+from services.excel_processor import ExcelProcessor
+
+HEADER = ["用例编号", "用例标题", "前置条件", "测试步骤", "预期结果", "优先级"]
+SHEETS = 4
+
+
+def generate_workbook(path: str, rows: int) -> None:
+    """生成指定总行数的测试用例工作簿，行数平均分布在各工作表中"""
+    workbook = Workbook(write_only=True)
+    for sheet in range(SHEETS):
+        worksheet = workbook.create_sheet(f"模块{sheet + 1}")
+        worksheet.append(HEADER)
+        for i in range(rows // SHEETS):
+            worksheet.append([
+                f"TC{sheet + 1}-{i:06d}", f"贷款期限{i % 36 + 1}个月利率计算", "用户已登录",
+                f"1. 输入期限{i % 36 + 1}个月\n2. 选择等额本息\n3. 提交", f"返回利率{(i % 50) / 10 + 2:.1f}%",
+                f"P{i % 3}"
+            ])
+    workbook.save(path)
+
+
+def legacy_extract(file_path: str) -> int:
+    """原实现：先打开工作簿，再按工作表逐个调用pd.read_excel并拼接to_string"""
+    excel_file = pd.ExcelFile(file_path)
+    parts = []
+    for sheet_name in excel_file.sheet_names:
+        df = pd.read_excel(file_path, sheet_name=sheet_name)
+        parts.append(df.to_string(index=False))
+    return len('\n'.join(parts))
+
+
+def measure(func, *args) -> tuple:
+    """
+    执行函数并返回 (结果, 耗时秒数, Python堆内存峰值MB)
+
+    tracemalloc会显著拖慢执行，耗时和内存峰值分两次执行测量
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def stream_extract(file_path: str) -> int:
+    """流式读取并逐条消费测试用例"""
+    count = 0
+    for _ in ExcelProcessor.iter_test_cases_from_excel(file_path):
+        count += 1
+    return count
+
+
+def run(rows: int, compare: bool) -> None:
+    """对指定行数的工作簿执行一次基准测试"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f"cases_{rows}.xlsx")
+        generate_workbook(path, rows)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+
+        count, elapsed, peak = measure(stream_extract, path)
+        print(f"{rows:10d} 行  {size_mb:6.1f} MB  流式读取  {count:10d} 条  {elapsed:8.2f} 秒  峰值 {peak:8.1f} MB")
+
+        if compare:
+            _, elapsed, peak = measure(legacy_extract, path)
+            print(f"{rows:10d} 行  {size_mb:6.1f} MB  原实现                   {elapsed:8.2f} 秒  峰值 {peak:8.1f} MB")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--compare"]
+    compare = "--compare" in sys.argv[1:]
+    for rows in [int(arg) for arg in args] or [20000, 200000]:
+        run(rows, compare)
+
+
+if __name__ == "__main__":
+    main()
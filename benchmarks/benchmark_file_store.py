@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件存储元数据性能基准
+生成包含指定任务数的旧版metadata.json，测量自动迁移耗时及按任务ID、日期、文件名查询和分页列出的单次耗时，
+并与每次读写整个metadata.json的原实现对比
+
+使用方法: python benchmarks/benchmark_file_store.py [任务数 ...]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.file_store import FileStore
+
+
+def generate_legacy_metadata(count: int) -> dict:
+    """生成与旧版metadata.json结构一致的任务元数据，创建时间分布在最近100天内"""
+    start = datetime(2025, 1, 1)
+    metadata = {}
+    for i in range(count):
+        created_at = (start + timedelta(seconds=i * 86400 * 100 // count)).isoformat()
+        store_id = f"{created_at[:19].replace('-', '').replace(':', '').replace('T', '')}_{i:08x}"
+        metadata[store_id] = {
+            "created_at": created_at,
+            "task_id": str(uuid.UUID(int=i)),
+            "file_count": 1,
+            "total_size": 3602,
+            "files": [{"name": f"test_data_{i:06d}.yml", "size": 3602,
+                       "created_at": created_at, "last_modified": created_at}],
+            "last_modified": created_at
+        }
+    return metadata
+
+
+def timed(func, repeat: int = 200) -> float:
+    """返回函数单次执行的平均毫秒数"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(count: int) -> None:
+    """对指定任务数执行一次基准测试"""
+    random.seed(count)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy = generate_legacy_metadata(count)
+        legacy_path = os.path.join(tmp_dir, "metadata.json")
+        with open(legacy_path, 'w', encoding='utf-8') as f:
+            json.dump(legacy, f, ensure_ascii=False, indent=2)
+
+        # 原实现：每次查询读取整个文件，每次写入重写整个文件
+        def legacy_lookup():
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            task_id = str(uuid.UUID(int=random.randrange(count)))
+            return [entry for entry in data.values() if entry["task_id"] == task_id]
+
+        def legacy_write():
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            data[f"new_{uuid.uuid4().hex}"] = next(iter(legacy.values()))
+            with open(legacy_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+
+        legacy_repeat = max(1, 2000 // max(1, count // 1000))
+        legacy_read_ms = timed(legacy_lookup, legacy_repeat)
+        legacy_write_ms = timed(legacy_write, legacy_repeat)
+
+        start = time.perf_counter()
+        store = FileStore(base_dir=tmp_dir)
+        migrate_elapsed = time.perf_counter() - start
+
+        store_ids = list(legacy)
+        cursor = {"value": None}
+
+        def page():
+            result = store.list_tasks(limit=50, before=cursor["value"])
+            cursor["value"] = result["next_cursor"]
+
+        timings = {
+            "任务ID": timed(lambda: store.get_tasks_by_task_id(str(uuid.UUID(int=random.randrange(count))))),
+            "目录名": timed(lambda: store.get_task(random.choice(store_ids))),
+            "文件名": timed(lambda: store.list_tasks(file_name=f"test_data_{random.randrange(count):06d}.yml")),
+            "日期": timed(lambda: store.list_tasks(date=legacy[random.choice(store_ids)]["created_at"][:10], limit=50)),
+            "翻页": timed(page)
+        }
+        directory = os.path.join(tmp_dir, "new_task")
+        os.makedirs(directory)
+        with open(os.path.join(directory, "a.yml"), 'w') as f:
+            f.write("name: a")
+        write_ms = timed(lambda: store.register_task(f"new_{uuid.uuid4().hex}", directory, ["a.yml"]))
+
+    print(f"{count:8d} 个任务  迁移 {migrate_elapsed:6.2f} 秒  写入 {write_ms:6.2f} 毫秒  " +
+          "  ".join(f"{name} {ms:6.2f} 毫秒" for name, ms in timings.items()))
+    print(f"{'':8s}    原实现  查询 {legacy_read_ms:8.2f} 毫秒  写入 {legacy_write_ms:8.2f} 毫秒")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 100000]
+    for count in counts:
+        run(count)
+
+
+if __name__ == "__main__":
+    main()
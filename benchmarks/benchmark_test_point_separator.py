@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试要点分离性能基准
+生成不同大小的多级编号需求文本，测量流式分离器的耗时和吞吐量，验证耗时随输入大小线性增长
+
+使用方法: python benchmarks/benchmark_test_point_separator.py [大小MB ...]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.test_point_separator import TestPointSeparator
+
+# 一个需求章节的模板，包含中文序号、数字编号、多级编号、括号编号和无序列表
+SECTION_TEMPLATE = """{cn}、贷款利率计算规则{n}
+1. 贷款期限为3个月、6个月、12个月时使用基础利率6.0%
+   期限超出范围时返回参数错误
+1.1 等额本息还款方式按月计息
+1.2 按月付息按计划还本方式按日计息
+2. 使用优惠券时利率减免2%
+(1) 最终利率低于2.0%时按2.0%兜底
+(2) 优惠券过期时不生效
+- 优惠券与活动利率不可叠加
+- 同一用户每天最多使用一张优惠券
+"""
+
+CN_NUMBERS = "一二三四五六七八九十"
+
+
+def generate_file(path: str, size_mb: int) -> int:
+    """生成指定大小的需求文本文件，返回实际字节数"""
+    target = size_mb * 1024 * 1024
+    written = 0
+    n = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            section = SECTION_TEMPLATE.format(cn=CN_NUMBERS[n % len(CN_NUMBERS)], n=n)
+            f.write(section)
+            written += len(section.encode('utf-8'))
+            n += 1
+    return written
+
+
+def run(size_mb: int) -> None:
+    """对指定大小的输入执行一次基准测试"""
+    separator = TestPointSeparator()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f"requirements_{size_mb}mb.txt")
+        size = generate_file(path, size_mb)
+
+        start = time.perf_counter()
+        count = 0
+        for _ in separator.iter_points_from_file(path):
+            count += 1
+        elapsed = time.perf_counter() - start
+
+    mb = size / 1024 / 1024
+    print(f"{mb:8.1f} MB  {count:10d} 个要点  {elapsed:8.2f} 秒  {mb / elapsed:8.1f} MB/s  "
+          f"{elapsed / mb * 1000:8.1f} 毫秒/MB")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1, 10, 100]
+    print("输入大小     要点数量         耗时        吞吐量       单位耗时")
+    for size_mb in sizes:
+        run(size_mb)
+
+
+if __name__ == "__main__":
+    main()
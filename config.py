@@ -5,6 +5,14 @@ from dotenv import load_dotenv
 # 加载.env文件中的环境变量
 load_dotenv()
 
+# 数据目录，相对路径的配置均相对于该目录解析，多个worker或副本不依赖各自的启动工作目录
+DATA_DIR: str = os.path.abspath(os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__))))
+
+
+def data_path(name: str, default: str) -> str:
+    """读取路径配置，相对路径解析到DATA_DIR下"""
+    return os.path.join(DATA_DIR, os.getenv(name, default))
+
 class Config:
     # OpenAI配置
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
@@ -47,4 +55,103 @@ class Config:
     MODEL_TEMPERATURE: float = float(os.getenv("MODEL_TEMPERATURE", "0.7"))
     
     # 模型提供商选择
-    MODEL_PROVIDER: str = os.getenv("MODEL_PROVIDER", "openai")  # openai, azure, custom, or qwen
\ No newline at end of file
+    MODEL_PROVIDER: str = os.getenv("MODEL_PROVIDER", "openai")  # openai, azure, custom, or qwen
+    
+    # AI分析分片配置
+    ANALYSIS_TOKEN_BUDGET: int = int(os.getenv("ANALYSIS_TOKEN_BUDGET", "24000"))  # 单次分析请求的token预算
+    ANALYSIS_CHUNK_TOKENS: int = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "6000"))  # 每个报告分片的token数
+    ANALYSIS_MAX_CONCURRENCY: int = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "4"))  # 分片并发分析数
+    
+    # AI分析结果存储配置
+    ANALYSIS_STORE_DIR: str = data_path("ANALYSIS_STORE_DIR", "analysis_store")
+    ANALYSIS_STORE_MAX_RUNS: int = int(os.getenv("ANALYSIS_STORE_MAX_RUNS", "200"))  # 最多保留的运行数量
+    ANALYSIS_STORE_MAX_PER_RUN: int = int(os.getenv("ANALYSIS_STORE_MAX_PER_RUN", "10"))  # 每个运行最多保留的分析数量
+    
+    # 测试要点注册表配置
+    TEST_POINT_REGISTRY_PATH: str = data_path("TEST_POINT_REGISTRY_PATH", "file_store/test_point_registry.db")
+    
+    # 测试要点去重配置
+    DEDUP_SIMILARITY_THRESHOLD: float = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD", "0.8"))  # 判定为近似重复的最小相似度
+    
+    # 需求版本存储配置
+    REQUIREMENT_VERSION_STORE_PATH: str = data_path("REQUIREMENT_VERSION_STORE_PATH", "file_store/requirement_versions.db")
+    
+    # 生成产物复用索引配置
+    REUSE_INDEX_PATH: str = data_path("REUSE_INDEX_PATH", "file_store/artefact_reuse_index.db")
+    REUSE_FUZZY_ENABLED: bool = os.getenv("REUSE_FUZZY_ENABLED", "false").lower() == "true"  # 是否复用相似而非相同的历史要点的产物
+    REUSE_SIMILARITY_THRESHOLD: float = float(os.getenv("REUSE_SIMILARITY_THRESHOLD", "0.9"))  # 模糊复用历史产物的最小相似度
+    
+    # 测试用例生成分片配置
+    TEST_CASE_CHUNK_TOKENS: int = int(os.getenv("TEST_CASE_CHUNK_TOKENS", "6000"))  # 需求文档每个分片的token数
+    
+    # 测试脚本批量生成配置
+    GENERATION_BATCH_ENABLED: bool = os.getenv("GENERATION_BATCH_ENABLED", "true").lower() == "true"
+    GENERATION_TOKEN_BUDGET: int = int(os.getenv("GENERATION_TOKEN_BUDGET", "16000"))  # 单次生成请求的上下文token预算
+    GENERATION_OUTPUT_TOKENS_PER_POINT: int = int(os.getenv("GENERATION_OUTPUT_TOKENS_PER_POINT", "800"))  # 每个要点预计输出的token数
+    GENERATION_BATCH_MAX_POINTS: int = int(os.getenv("GENERATION_BATCH_MAX_POINTS", "10"))  # 每个批次最多包含的要点数
+    GENERATION_MAX_CONCURRENCY: int = int(os.getenv("GENERATION_MAX_CONCURRENCY", "4"))  # 批次及分片并发请求数
+    
+    # 文件存储配置
+    FILE_STORE_DIR: str = data_path("FILE_STORE_DIR", "file_store")
+    FILE_STORE_DB_PATH: str = data_path("FILE_STORE_DB_PATH", "file_store/metadata.db")  # 任务及文件元数据数据库
+    BLOB_STORE_DIR: str = data_path("BLOB_STORE_DIR", "file_store/blobs")  # 生成文件按内容去重压缩存储的目录
+    BLOB_STORE_CODEC: Optional[str] = os.getenv("BLOB_STORE_CODEC") or None  # zstd、gzip或none，默认安装zstandard时使用zstd
+    BLOB_GC_GRACE_SECONDS: int = int(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))  # 未引用内容保留的宽限期
+    
+    # 文档上传导入配置
+    UPLOAD_DIR: str = data_path("UPLOAD_DIR", "file_store/uploads")
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # 流式写入磁盘的分块字节数
+    UPLOAD_MAX_SIZE: int = int(os.getenv("UPLOAD_MAX_SIZE", str(1024 * 1024 * 1024)))  # 单个文件的最大字节数
+    INGESTION_MAX_WORKERS: int = int(os.getenv("INGESTION_MAX_WORKERS", "4"))  # 并行提取文档的进程数
+    
+    # 测试产物保留策略配置
+    RETENTION_ENABLED: bool = os.getenv("RETENTION_ENABLED", "true").lower() == "true"  # 是否在后台定期执行保留策略
+    RETENTION_INTERVAL_SECONDS: int = int(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+    RETENTION_ARCHIVE_DIR: str = data_path("RETENTION_ARCHIVE_DIR", "file_store/archives")
+    RETENTION_POLICIES: Optional[str] = os.getenv("RETENTION_POLICIES") or None  # JSON格式的目录保留策略，为空时使用默认策略
+    RETENTION_IO_RATE_MB: float = float(os.getenv("RETENTION_IO_RATE_MB", "5"))  # 归档时每秒读取的最大MB数，0表示不限速
+    RETENTION_MIN_AGE_SECONDS: int = int(os.getenv("RETENTION_MIN_AGE_SECONDS", "600"))  # 最近修改的条目视为正在使用
+    RETENTION_ARCHIVE_MAX_AGE_DAYS: float = float(os.getenv("RETENTION_ARCHIVE_MAX_AGE_DAYS", "365"))  # 归档文件保留天数，0表示永久保留
+    
+    # 多worker部署配置
+    WORKERS: int = int(os.getenv("WORKERS", "1"))  # uvicorn工作进程数，所有worker共享DATA_DIR下的数据
+    DATA_DIR: str = DATA_DIR
+    TESTCASES_DIR: str = data_path("TESTCASES_DIR", "demo/testcases")  # 生成的测试数据文件目录
+    RESULTS_DIR: str = data_path("RESULTS_DIR", "results")  # hrp测试报告目录
+    REPORTS_DIR: str = data_path("REPORTS_DIR", "reports")
+    ALLURE_RESULTS_DIR: str = data_path("ALLURE_RESULTS_DIR", "allure-results")
+    ALLURE_REPORT_DIR: str = data_path("ALLURE_REPORT_DIR", "allure-report")
+    RUN_WORKSPACE_DIR: str = data_path("RUN_WORKSPACE_DIR", "file_store/workspaces")  # 每次执行测试的独立工作目录
+    LOCK_DIR: str = data_path("LOCK_DIR", "file_store/locks")  # 跨进程锁文件目录
+    HRP_PATH: str = os.getenv("HRP_PATH", "C:\\Users\\62411\\Project\\LLMProjects\\TestAssistiant\\hrp-v4.3.5-windows-amd64\\hrp.exe")
+    
+    # 共享缓存配置
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "sqlite")  # memory（仅当前worker）、sqlite（同一主机共享）或redis
+    CACHE_DB_PATH: str = data_path("CACHE_DB_PATH", "file_store/cache.db")
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")  # 任何兼容Redis协议的服务
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))  # 进程内缓存最多缓存的条目数
+    CACHE_MAX_MB: int = int(os.getenv("CACHE_MAX_MB", "512"))  # 进程内及SQLite缓存的最大总MB数
+    CACHE_DEFAULT_TTL_SECONDS: int = int(os.getenv("CACHE_DEFAULT_TTL_SECONDS", "86400"))  # 0表示不过期
+    CACHE_LOCK_TIMEOUT: int = int(os.getenv("CACHE_LOCK_TIMEOUT", "300"))  # 等待其他请求计算同一个键的最长秒数
+    
+    # 并发请求合并配置
+    SINGLE_FLIGHT_SHARED: bool = os.getenv("SINGLE_FLIGHT_SHARED", "true").lower() == "true"  # 通过共享缓存合并不同worker中的相同请求
+    SINGLE_FLIGHT_RESULT_TTL: float = float(os.getenv("SINGLE_FLIGHT_RESULT_TTL", "5"))  # 跨worker合并时计算结果保留的秒数
+    
+    # 准入控制配置，限制均按worker计算
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_CLASSES: Optional[str] = os.getenv("ADMISSION_CLASSES") or None  # JSON格式的类别配置，为空时使用默认配置
+    ADMISSION_TOTAL_CONCURRENCY: int = int(os.getenv("ADMISSION_TOTAL_CONCURRENCY", "0"))  # 所有类别合计的最大并发数，0表示不限制
+    
+    # 运行指标配置
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"  # 是否记录接口耗时并提供/metrics接口
+    METRICS_DIR: str = data_path("METRICS_DIR", "file_store/metrics")  # 各worker指标快照的共享目录
+    METRICS_SNAPSHOT_SECONDS: int = int(os.getenv("METRICS_SNAPSHOT_SECONDS", "15"))  # worker写入指标快照的间隔
+    
+    # 链路追踪配置
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACING_JSONL_PATH: str = data_path("TRACING_JSONL_PATH", "file_store/traces/traces.jsonl")  # 本地导出的trace文件，每行一个span
+    TRACING_MAX_MB: int = int(os.getenv("TRACING_MAX_MB", "100"))  # trace文件超过该大小时轮转，0表示不轮转
+    TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "")  # OTLP/HTTP接收地址，如http://localhost:4318/v1/traces，为空时不发送
+    TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "test-assistant")
+    TRACING_SERVER_TIMING: bool = os.getenv("TRACING_SERVER_TIMING", "true").lower() == "true"  # 是否在响应头中添加Server-Timing
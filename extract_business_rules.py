@@ -3,10 +3,11 @@
 """
 从Word文档中提取业务规则的脚本
 """
-import docx
 import sys
 import os
 
+from services.document_ingestion_service import extract_text_from_docx as _extract_text_from_docx
+
 def extract_text_from_docx(file_path):
     """
     从DOCX文件中提取文本内容
@@ -18,25 +19,7 @@ def extract_text_from_docx(file_path):
         str: 提取的文本内容
     """
     try:
-        doc = docx.Document(file_path)
-        full_text = []
-        
-        # 提取段落文本
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():  # 只添加非空段落
-                full_text.append(paragraph.text.strip())
-                
-        # 提取表格内容
-        for table in doc.tables:
-            for row in table.rows:
-                row_text = []
-                for cell in row.cells:
-                    if cell.text.strip():
-                        row_text.append(cell.text.strip())
-                if row_text:
-                    full_text.append('\t'.join(row_text))
-                    
-        return '\n'.join(full_text)
+        return _extract_text_from_docx(file_path)
     except Exception as e:
         raise Exception(f"读取DOCX文件时出错: {str(e)}")
 
@@ -3,39 +3,23 @@
 """
 从Excel文件中提取测试用例的脚本
 """
-import pandas as pd
 import sys
 import os
 
-def extract_test_cases_from_excel(file_path):
+from services.excel_processor import ExcelProcessor
+
+def extract_test_cases_from_excel(file_path, buf=None):
     """
     从Excel文件中提取测试用例
     
     Args:
         file_path (str): Excel文件路径
+        buf: 逐行写入内容的文本流，为空时返回完整内容
         
     Returns:
-        str: 提取的测试用例内容
+        str: 提取的测试用例内容，指定buf时返回None
     """
-    try:
-        # 读取Excel文件的所有工作表
-        excel_file = pd.ExcelFile(file_path)
-        all_test_cases = []
-        
-        for sheet_name in excel_file.sheet_names:
-            # 读取每个工作表
-            df = pd.read_excel(file_path, sheet_name=sheet_name)
-            
-            # 将DataFrame转换为文本格式
-            sheet_content = f"工作表: {sheet_name}\n"
-            sheet_content += df.to_string(index=False)
-            sheet_content += "\n" + "="*50 + "\n"
-            
-            all_test_cases.append(sheet_content)
-            
-        return '\n'.join(all_test_cases)
-    except Exception as e:
-        raise Exception(f"读取Excel文件时出错: {str(e)}")
+    return ExcelProcessor.extract_test_cases_from_excel(file_path, buf=buf)
 
 def main():
     if len(sys.argv) != 2:
@@ -49,11 +33,11 @@ def main():
         sys.exit(1)
         
     try:
-        content = extract_test_cases_from_excel(file_path)
-        print(content)
+        # 逐行流式输出，大文件无需在内存中拼接完整内容
+        extract_test_cases_from_excel(file_path, buf=sys.stdout)
     except Exception as e:
         print(f"错误: {str(e)}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,6 +1,7 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Union, Dict, Any
 from datetime import datetime
@@ -8,9 +9,31 @@ import traceback
 from services.test_case_service import TestCaseConversionService
 from services.langchain_service import LangChainService
 from services.test_case_management_service import TestCaseManagementService
+from services.test_report_extractor import TestReportExtractor
+from services.failure_clustering_service import FailureClusteringService
+from services.analysis_stream_parser import IncrementalSectionParser
+from services.analysis_store import AnalysisStore
+from services.delta_analysis_service import DeltaAnalysisService
+from services.document_ingestion_service import DocumentIngestionService, UploadOffsetError
+from services.file_store import FileStore
+from services.blob_store import BlobStore
+from services.retention_service import RetentionService
+from services.process_lock import ProcessLock
+from services.cache_service import CacheService, create_cache_backend, make_cache_key
+from services.single_flight import SingleFlight
+from services.admission_control import AdmissionController, AdmissionMiddleware
+from services.metrics import metrics, MetricsMiddleware, route_template
+from services.tracing import tracer, TracingMiddleware, JsonlSpanExporter, OtlpHttpSpanExporter
+from services.test_point_separator import compute_point_id, normalize_point_content, generation_content, generation_points
 from config import Config
 import tempfile
+import json
+import hashlib
 import subprocess
+import re
+import uuid
+import shutil
+import asyncio
 import os
 import time
 import logging
@@ -27,6 +50,45 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 app = FastAPI(title="AI测试用例转换服务", version="1.0.0")
 
+# 接口的准入优先级类别，未列出的接口不做准入控制
+ADMISSION_ROUTE_CLASSES = {
+    "/api/v1/convert-test-case": "interactive",
+    "/api/v1/separate-test-points": "interactive",
+    "/api/v1/execute-test": "interactive",
+    "/api/v1/analyze-results": "analysis",
+    "/api/v1/analyze-results-structured": "analysis",
+    "/api/v1/analyze-results-structured/stream": "analysis",
+    "/api/v1/analyze-results-delta": "analysis",
+    "/api/v1/batch-convert": "batch",
+    "/api/v1/batch-execute-tests": "batch",
+    "/api/v1/documents/upload": "batch",
+    "/api/v1/retention/run": "batch",
+    "/api/v1/file-store/compact": "batch"
+}
+ADMISSION_ROUTE_PATTERNS = [
+    (re.compile(r"^/api/v1/uploads/[^/]+/complete$"), "batch"),
+    (re.compile(r"^/api/v1/requirements/[^/]+/revisions$"), "batch")
+]
+
+def admission_class(method: str, path: str) -> Optional[str]:
+    """获取接口对应的准入优先级类别，未启用准入控制或不需要控制时返回None"""
+    if not Config.ADMISSION_ENABLED or method != "POST":
+        return None
+    if path in ADMISSION_ROUTE_CLASSES:
+        return ADMISSION_ROUTE_CLASSES[path]
+    for pattern, name in ADMISSION_ROUTE_PATTERNS:
+        if pattern.match(path):
+            return name
+    return None
+
+# 准入控制，并发及排队限制按worker计算
+admission_controller = AdmissionController(
+    classes=json.loads(Config.ADMISSION_CLASSES) if Config.ADMISSION_CLASSES else None,
+    total_concurrency=Config.ADMISSION_TOTAL_CONCURRENCY or None
+)
+# 准入中间件需在CORS中间件之前添加，使429响应同样带有CORS头
+app.add_middleware(AdmissionMiddleware, controller=admission_controller, classify=admission_class)
+
 # 添加CORS中间件以支持跨域请求
 app.add_middleware(
     CORSMiddleware,
@@ -36,32 +98,188 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 挂载静态文件目录以提供Allure报告访问
-app.mount("/allure-results", StaticFiles(directory="allure-results"), name="allure-results")
-app.mount("/allure-report", StaticFiles(directory="allure-report"), name="allure-report")
+# 指标中间件在准入中间件之外，接口耗时包含准入排队时间，429响应同样计入
+if Config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics)
+
+# 追踪中间件位于最外层，每个请求的根span覆盖准入排队及所有中间件；导出器在应用启动时配置
+if Config.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware, tracer=tracer, route_namer=route_template,
+                       add_server_timing=Config.TRACING_SERVER_TIMING)
+
+# 挂载静态文件目录以提供Allure报告访问，报告目录在应用启动时创建
+app.mount("/allure-results", StaticFiles(directory=Config.ALLURE_RESULTS_DIR, check_dir=False), name="allure-results")
+app.mount("/allure-report", StaticFiles(directory=Config.ALLURE_REPORT_DIR, check_dir=False), name="allure-report")
 # 挂载静态文件目录以提供前端页面访问
-app.mount("/static", StaticFiles(directory=".", html=True), name="static")
+app.mount("/static", StaticFiles(directory=os.path.dirname(os.path.abspath(__file__)), html=True), name="static")
 # 挂载results目录以提供hrp测试报告访问
-app.mount("/results", StaticFiles(directory="results"), name="results")
+app.mount("/results", StaticFiles(directory=Config.RESULTS_DIR, check_dir=False), name="results")
 
-# 初始化服务
-test_case_service = TestCaseConversionService()
-langchain_service = LangChainService()
-test_case_management_service = TestCaseManagementService()
+# 各服务在应用启动或执行migrate命令时初始化，导入main不会改动数据目录
+file_store: Optional[FileStore] = None
+test_case_service: Optional[TestCaseConversionService] = None
+langchain_service: Optional[LangChainService] = None
+test_case_management_service: Optional[TestCaseManagementService] = None
+test_report_extractor: Optional[TestReportExtractor] = None
+failure_clustering_service: Optional[FailureClusteringService] = None
+delta_analysis_service: Optional[DeltaAnalysisService] = None
+analysis_store: Optional[AnalysisStore] = None
+document_ingestion_service: Optional[DocumentIngestionService] = None
+cache_service: Optional[CacheService] = None
+single_flight: Optional[SingleFlight] = None
+retention_service: Optional[RetentionService] = None
+
+def init_services() -> None:
+    """
+    创建数据目录并初始化各服务，重复调用时只初始化一次
+    
+    初始化会创建报告目录及各服务的数据库，并将旧版metadata.json迁移到文件存储数据库
+    """
+    global file_store, test_case_service, langchain_service, test_case_management_service, \
+        test_report_extractor, failure_clustering_service, delta_analysis_service, analysis_store, \
+        document_ingestion_service, cache_service, single_flight, retention_service
+    if file_store is not None:
+        return
+    
+    # 报告目录位于共享数据目录下，所有worker访问同一份文件
+    for directory in (Config.ALLURE_RESULTS_DIR, Config.ALLURE_REPORT_DIR, Config.RESULTS_DIR, Config.REPORTS_DIR):
+        os.makedirs(directory, exist_ok=True)
+    
+    file_store = FileStore(
+        base_dir=Config.FILE_STORE_DIR,
+        db_path=Config.FILE_STORE_DB_PATH,
+        blob_store=BlobStore(Config.BLOB_STORE_DIR, codec=Config.BLOB_STORE_CODEC)
+    )
+    test_case_service = TestCaseConversionService(file_store=file_store)
+    langchain_service = LangChainService()
+    test_case_management_service = TestCaseManagementService(registry=test_case_service.registry)
+    test_report_extractor = TestReportExtractor()
+    failure_clustering_service = FailureClusteringService()
+    delta_analysis_service = DeltaAnalysisService(failure_clustering_service)
+    analysis_store = AnalysisStore(
+        base_dir=Config.ANALYSIS_STORE_DIR,
+        max_runs=Config.ANALYSIS_STORE_MAX_RUNS,
+        max_per_run=Config.ANALYSIS_STORE_MAX_PER_RUN
+    )
+    document_ingestion_service = DocumentIngestionService(
+        upload_dir=Config.UPLOAD_DIR,
+        chunk_size=Config.UPLOAD_CHUNK_SIZE,
+        max_upload_size=Config.UPLOAD_MAX_SIZE,
+        max_workers=Config.INGESTION_MAX_WORKERS,
+        file_store=file_store
+    )
+    cache_service = CacheService(
+        create_cache_backend(
+            Config.CACHE_BACKEND,
+            db_path=Config.CACHE_DB_PATH,
+            redis_url=Config.CACHE_REDIS_URL,
+            max_entries=Config.CACHE_MAX_ENTRIES,
+            max_bytes=Config.CACHE_MAX_MB * 1024 * 1024,
+            lock_dir=os.path.join(Config.LOCK_DIR, "cache")
+        ),
+        default_ttl=Config.CACHE_DEFAULT_TTL_SECONDS or None,
+        lock_timeout=Config.CACHE_LOCK_TIMEOUT
+    )
+    single_flight = SingleFlight(
+        cache=cache_service if Config.SINGLE_FLIGHT_SHARED else None,
+        result_ttl=Config.SINGLE_FLIGHT_RESULT_TTL
+    )
+    retention_service = RetentionService(
+        archive_dir=Config.RETENTION_ARCHIVE_DIR,
+        policies=json.loads(Config.RETENTION_POLICIES) if Config.RETENTION_POLICIES else None,
+        io_rate_bytes=Config.RETENTION_IO_RATE_MB * 1024 * 1024,
+        min_age_seconds=Config.RETENTION_MIN_AGE_SECONDS,
+        archive_max_age_days=Config.RETENTION_ARCHIVE_MAX_AGE_DAYS or None,
+        directories={
+            "results": Config.RESULTS_DIR,
+            "reports": Config.REPORTS_DIR,
+            "allure-results": Config.ALLURE_RESULTS_DIR,
+            "allure-report": Config.ALLURE_REPORT_DIR
+        }
+    )
+
+@app.on_event("startup")
+def startup_services():
+    """初始化各服务，并配置链路追踪导出到本地JSONL文件，配置OTLP地址时同时发送到collector"""
+    init_services()
+    if Config.TRACING_ENABLED and not tracer.enabled:
+        span_exporters = [JsonlSpanExporter(Config.TRACING_JSONL_PATH, max_bytes=Config.TRACING_MAX_MB * 1024 * 1024,
+                                            lock_path=os.path.join(Config.LOCK_DIR, "traces.lock"))]
+        if Config.TRACING_OTLP_ENDPOINT:
+            span_exporters.append(OtlpHttpSpanExporter(Config.TRACING_OTLP_ENDPOINT, Config.TRACING_SERVICE_NAME))
+        tracer.configure(span_exporters)
 
 class SeparateTestPointsRequest(BaseModel):
     test_cases_content: str
+    num_groups: Optional[int] = None  # 分组数量（并行执行数），默认每5个要点一组
 
 class SeparateTestPointsResponse(BaseModel):
     success: bool
     separated_test_points: List[Dict[str, Any]]
     grouped_test_points: Dict[str, List[Dict[str, Any]]]
+    group_estimates: Optional[Dict[str, Dict[str, Any]]] = None  # 各组预估耗时和共享前置条件
     total_points: int
     error: Optional[str] = None
 
+class UploadSessionRequest(BaseModel):
+    filename: str
+    total_size: int  # 文件总字节数
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    filename: str
+    total_size: int
+    offset: int  # 服务端已接收的字节数，续传时从该偏移量开始
+    completed: bool
+
+class CompleteUploadRequest(BaseModel):
+    generation_type: Optional[str] = None  # test_data或script，为空时只提取和分组测试要点
+    num_groups: Optional[int] = None
+
+class DocumentIngestionResponse(BaseModel):
+    success: bool
+    files: List[Dict[str, Any]]  # 各文件的大小、sha256、提取出的要点数和错误信息
+    separated_test_points: List[Dict[str, Any]]
+    grouped_test_points: Dict[str, List[Dict[str, Any]]]
+    group_estimates: Optional[Dict[str, Dict[str, Any]]] = None
+    total_points: int
+    generation: Optional[Dict[str, Any]] = None  # 按generation_type生成的测试数据或测试脚本
+    error: Optional[str] = None
+
+class RequirementRevisionResponse(BaseModel):
+    success: bool
+    document_id: str
+    version: Optional[int] = None
+    previous_version: Optional[int] = None
+    added: List[Dict[str, Any]] = []  # 新增需求及其生成的测试用例
+    changed: List[Dict[str, Any]] = []  # 修改的需求及其重新生成的测试用例
+    removed: List[Dict[str, Any]] = []  # 删除的需求，对应测试用例已停用
+    unchanged: int = 0
+    reused_artefacts: List[Dict[str, Any]] = []
+    store_id: Optional[str] = None  # 新生成的测试用例在文件存储中的任务ID
+    error: Optional[str] = None
+
+class RequirementDocumentResponse(BaseModel):
+    success: bool
+    document: Optional[Dict[str, Any]] = None
+    units: List[Dict[str, Any]]  # 需求单元及其测试用例
+    error: Optional[str] = None
+
+class FileStoreTasksResponse(BaseModel):
+    success: bool
+    tasks: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None  # 下一页游标，传入before参数获取下一页
+    error: Optional[str] = None
+
+class RetentionArchivesResponse(BaseModel):
+    success: bool
+    archives: List[Dict[str, Any]]
+    error: Optional[str] = None
+
 class BatchExecuteTestsRequest(BaseModel):
     test_points: List[Dict[str, Any]]
     group_name: Optional[str] = None
+    reuse_cached_results: Optional[bool] = True  # 测试要点、生成产物及测试数据文件均未变化时复用上次的执行结果
 
 class BatchExecuteTestsResponse(BaseModel):
     success: bool
@@ -106,12 +324,15 @@ class TestCaseRequest(BaseModel):
     parser_prompt_template: Optional[str] = None
     generator_prompt_template: Optional[str] = None
     generation_type: Optional[str] = "script"
+    deduplicate: Optional[bool] = True  # 重复及近似重复的测试要点只调用一次大模型
+    batch_generation: Optional[bool] = None  # 多个测试要点合并为一次大模型请求，默认使用配置
 
 class BatchTestCaseRequest(BaseModel):
     test_cases: List[str]
     template_type: Optional[str] = "pytest"
     parser_prompt_template: Optional[str] = None
     generator_prompt_template: Optional[str] = None
+    deduplicate: Optional[bool] = True  # 重复及近似重复的测试用例只调用一次大模型
 
 class TestExecutionRequest(BaseModel):
     script_content: str
@@ -126,6 +347,7 @@ class TestCaseResponse(BaseModel):
 class BatchTestCaseResponse(BaseModel):
     status: str
     results: List[dict]
+    dedup: Optional[dict] = None  # 去重统计，包含节省的大模型调用次数
 
 class TestExecutionResponse(BaseModel):
     success: bool
@@ -136,10 +358,21 @@ class TestExecutionResponse(BaseModel):
 class AIAnalysisRequest(BaseModel):
     test_report_path: str
     execution_result: TestExecutionResponse
+    cluster_failures: Optional[bool] = True  # 是否在分析前对失败步骤进行签名聚类
+    analysis_mode: Optional[str] = "auto"  # single: 单次分析, chunked: 分片并行分析, auto: 超出token预算时分片
+    chunk_tokens: Optional[int] = None  # 每个分片的token数
+    max_concurrency: Optional[int] = None  # 分片并发分析数
+    token_budget: Optional[int] = None  # 单次分析请求的token预算
+    run_id: Optional[str] = None  # 运行ID，为空时根据报告路径推导
+    use_cache: Optional[bool] = True  # 相同报告已分析过时直接返回存储的结果
 
 class AIAnalysisResponse(BaseModel):
     success: bool
     analysis: str
+    failure_clusters: List[Dict[str, Any]] = []  # 失败签名分组
+    run_id: Optional[str] = None  # 运行ID
+    analysis_id: Optional[str] = None  # 分析结果ID
+    cached: bool = False  # 是否命中已存储的分析结果
     error: Optional[str] = None
 
 class StructuredAIAnalysisResponse(BaseModel):
@@ -150,35 +383,78 @@ class StructuredAIAnalysisResponse(BaseModel):
     second_part: str = ""  # 第二部分
     third_part: str = ""  # 第三部分
     summary: str = ""  # 总结
+    failure_clusters: List[Dict[str, Any]] = []  # 失败签名分组
+    run_id: Optional[str] = None  # 运行ID
+    analysis_id: Optional[str] = None  # 分析结果ID
+    cached: bool = False  # 是否命中已存储的分析结果
+    error: Optional[str] = None
+
+class DeltaAIAnalysisRequest(AIAnalysisRequest):
+    """增量AI分析请求模型"""
+    baseline_run_id: Optional[str] = None  # 基线运行ID，为空时使用当前运行之前最近的一次运行
+
+class DeltaAIAnalysisResponse(StructuredAIAnalysisResponse):
+    """增量AI分析结果响应模型"""
+    baseline_run_id: Optional[str] = None  # 基线运行ID
+    delta: Dict[str, Any] = {}  # 两次运行之间的变化明细
+    reused_baseline: bool = False  # 无变化时直接复用基线分析结果
+
+class StoredAnalysisSummary(BaseModel):
+    """已存储分析结果摘要模型"""
+    run_id: str
+    analysis_id: str
+    created_at: float
+
+class StoredAnalysesListResponse(BaseModel):
+    """已存储分析结果列表响应模型"""
+    success: bool
+    analyses: List[StoredAnalysisSummary]
+    total: int
+    error: Optional[str] = None
+
+class StoredAnalysisResponse(BaseModel):
+    """已存储分析结果响应模型"""
+    success: bool
+    analysis: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
 @app.post("/api/v1/convert-test-case", response_model=TestCaseResponse)
 async def convert_test_case(request: TestCaseRequest):
-    """转换单个测试用例"""
-    try:
+    """转换单个测试用例，内容相同的并发请求只调用一次大模型"""
+    def convert():
         result = test_case_service.convert_single_case(
             test_case_description=request.test_case_description,
             parser_prompt_template=request.parser_prompt_template,
             generator_prompt_template=request.generator_prompt_template,
-            generation_type=request.generation_type
+            generation_type=request.generation_type,
+            deduplicate=request.deduplicate,
+            batch_generation=request.batch_generation
         )
-        
-        # 检查是否有错误
+        # 出错的结果不共享给之后的请求
         if result.get("status") == "error":
-            raise HTTPException(status_code=500, detail=f"处理测试用例时出错: {result.get('error')}")
-        
+            raise RuntimeError(result.get('error'))
+        return result
+    
+    try:
+        key = make_cache_key(
+            "convert", normalize_point_content(request.test_case_description),
+            request.model_dump(exclude={"test_case_description"})
+        )
+        result, _ = await single_flight.run("convert", key, convert)
         return TestCaseResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理测试用例时出错: {str(e)}")
 
 @app.post("/api/v1/batch-convert", response_model=BatchTestCaseResponse)
 async def batch_convert(request: BatchTestCaseRequest):
-    """批量转换测试用例"""
+    """批量转换测试用例，转换在线程中执行，不阻塞事件循环"""
     try:
-        result = test_case_service.convert_batch_cases(
+        result = await asyncio.to_thread(
+            test_case_service.convert_batch_cases,
             test_cases=request.test_cases,
             parser_prompt_template=request.parser_prompt_template,
-            generator_prompt_template=request.generator_prompt_template
+            generator_prompt_template=request.generator_prompt_template,
+            deduplicate=request.deduplicate
         )
         return BatchTestCaseResponse(**result)
     except Exception as e:
@@ -186,54 +462,25 @@ async def batch_convert(request: BatchTestCaseRequest):
 
 @app.post("/api/v1/execute-test", response_model=TestExecutionResponse)
 async def execute_test_script(request: TestExecutionRequest):
-    """执行测试脚本并生成HTML报告"""
-    # 确保reports目录存在
-    reports_dir = "reports"
-    os.makedirs(reports_dir, exist_ok=True)
+    """
+    执行测试脚本并生成HTML报告
     
-    # 测试数据目录
-    testcases_dir = "demo/testcases"
+    每次执行使用独立的工作目录，多个worker同时执行时不会互相覆盖报告，返回的报告一定是本次执行生成的；
+    测试数据文件相同的并发执行请求只执行一次，共享同一份报告
+    """
+    # 确保reports目录存在
+    os.makedirs(Config.REPORTS_DIR, exist_ok=True)
     
     try:
-        # 遍历目录下所有.yml文件
-        yml_files = []
-        for filename in os.listdir(testcases_dir):
-            if filename.endswith('.yml'):
-                yml_files.append(os.path.join(testcases_dir, filename))
-        
-        if not yml_files:
-            raise HTTPException(status_code=404, detail="在demo/testcases/目录下未找到.yml文件")
-        
-        # 使用指定路径的hrp工具执行测试并生成HTML报告
-        hrp_path = "C:\\Users\\62411\\Project\\LLMProjects\\TestAssistiant\\hrp-v4.3.5-windows-amd64\\hrp.exe"
-        
-        # 构建命令，将所有yml文件作为参数
-        cmd = [hrp_path, 'run'] + yml_files + ['--gen-html-report']
+        key = testcases_fingerprint()
+        if key is None:
+            raise HTTPException(status_code=404, detail=f"在{Config.TESTCASES_DIR}目录下未找到.yml文件")
         
-        logger.info(f"执行命令: {' '.join(cmd)}")
-        
-        # 执行命令，指定编码为utf-8以避免中文乱码问题
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300, encoding='utf-8')
-        
-        # 查找生成的HTML报告路径
-        report_path = None
-        # hrp工具默认将HTML报告生成在results目录下，按照时间戳命名的子目录中
-        results_dir = "results"
-        if os.path.exists(results_dir):
-            # 获取最新的报告目录（按修改时间排序）
-            subdirs = [d for d in os.listdir(results_dir) if os.path.isdir(os.path.join(results_dir, d))]
-            if subdirs:
-                latest_dir = max(subdirs, key=lambda x: os.path.getmtime(os.path.join(results_dir, x)))
-                report_path = os.path.join("results", latest_dir, "report.html")
+        result, _ = await single_flight.run("execute", key, run_testcases)
                 
         # 返回执行结果
         # 即使测试失败，只要hrp命令本身执行成功，我们也认为执行成功
-        return TestExecutionResponse(
-            success=True,
-            output=result.stdout,
-            error=result.stderr if result.stderr else None,
-            report_path=report_path
-        )
+        return TestExecutionResponse(success=True, **result)
     except subprocess.TimeoutExpired:
         raise HTTPException(status_code=408, detail="测试执行超时")
     except HTTPException:
@@ -241,26 +488,181 @@ async def execute_test_script(request: TestExecutionRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"测试执行失败: {str(e)}")
 
+def testcases_fingerprint() -> Optional[str]:
+    """
+    计算当前测试数据文件集合的指纹，作为合并执行请求的键
+    
+    Returns:
+        Optional[str]: 文件名及内容的哈希，没有yml文件时返回None
+    """
+    if not os.path.isdir(Config.TESTCASES_DIR):
+        return None
+    digest = hashlib.sha256()
+    found = False
+    with ProcessLock(os.path.join(Config.LOCK_DIR, "testcases.lock")):
+        for filename in sorted(os.listdir(Config.TESTCASES_DIR)):
+            if filename.endswith('.yml'):
+                found = True
+                digest.update(filename.encode('utf-8') + b'\0')
+                with open(os.path.join(Config.TESTCASES_DIR, filename), 'rb') as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+    return make_cache_key("execute", digest.hexdigest()) if found else None
+
+def run_testcases() -> Dict[str, Any]:
+    """
+    在独立的工作目录中用hrp执行当前的测试数据文件
+    
+    Returns:
+        Dict[str, Any]: 包含output、error和report_path的执行结果
+    """
+    workspace = os.path.join(Config.RUN_WORKSPACE_DIR, uuid.uuid4().hex)
+    try:
+        # 复制当前的测试数据文件到工作目录
+        with tracer.span("execute.prepare_workspace") as span:
+            yml_files = prepare_run_workspace(workspace)
+            span.set_attribute("files", len(yml_files))
+        if not yml_files:
+            raise HTTPException(status_code=404, detail=f"在{Config.TESTCASES_DIR}目录下未找到.yml文件")
+        
+        # 构建命令，将所有yml文件作为参数
+        cmd = [Config.HRP_PATH, 'run'] + yml_files + ['--gen-html-report']
+        
+        logger.info(f"执行命令: {' '.join(cmd)}")
+        
+        # 在工作目录中执行命令，指定编码为utf-8以避免中文乱码问题
+        with tracer.span("execute.hrp", files=len(yml_files)) as span, \
+                metrics.timer("hrp_run_duration_seconds") as labels:
+            labels["exit_code"] = "timeout"
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=300, encoding='utf-8', cwd=workspace)
+                labels["exit_code"] = result.returncode
+            finally:
+                metrics.inc("hrp_runs_total", labels)
+                span.set_attribute("exit_code", labels["exit_code"])
+        
+        # hrp工具将HTML报告生成在工作目录results下按照时间戳命名的子目录中，移入共享的结果目录
+        with tracer.span("execute.collect_results"):
+            report_path = collect_run_results(workspace)
+        return {
+            "output": result.stdout,
+            "error": result.stderr if result.stderr else None,
+            "report_path": report_path
+        }
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+def prepare_run_workspace(workspace: str) -> List[str]:
+    """
+    准备测试执行的工作目录
+    
+    持有测试数据目录锁复制当前的yml文件，同时复制hrp项目根目录下的proj.json、debugtalk.py等文件
+    
+    Args:
+        workspace: 工作目录路径
+        
+    Returns:
+        List[str]: 相对于工作目录的yml文件路径列表
+    """
+    testcases_dir = Config.TESTCASES_DIR
+    project_dir = os.path.dirname(os.path.normpath(testcases_dir))
+    target_dir = os.path.join(workspace, os.path.basename(os.path.normpath(testcases_dir)))
+    os.makedirs(target_dir)
+    
+    for name in os.listdir(project_dir):
+        path = os.path.join(project_dir, name)
+        if os.path.isfile(path):
+            shutil.copy2(path, os.path.join(workspace, name))
+    
+    yml_files = []
+    if os.path.isdir(testcases_dir):
+        with ProcessLock(os.path.join(Config.LOCK_DIR, "testcases.lock")):
+            for filename in sorted(os.listdir(testcases_dir)):
+                if filename.endswith('.yml'):
+                    shutil.copy2(os.path.join(testcases_dir, filename), os.path.join(target_dir, filename))
+                    yml_files.append(os.path.join(os.path.basename(target_dir), filename))
+    return yml_files
+
+def collect_run_results(workspace: str) -> Optional[str]:
+    """
+    将工作目录中生成的报告目录移入共享的结果目录
+    
+    Args:
+        workspace: 工作目录路径
+        
+    Returns:
+        Optional[str]: 本次执行的报告路径（results/<报告目录>/report.html），没有生成报告时返回None
+    """
+    run_results_dir = os.path.join(workspace, "results")
+    if not os.path.isdir(run_results_dir):
+        return None
+    report_path = None
+    subdirs = [d for d in os.listdir(run_results_dir) if os.path.isdir(os.path.join(run_results_dir, d))]
+    with ProcessLock(os.path.join(Config.LOCK_DIR, "results.lock")):
+        for subdir in sorted(subdirs, key=lambda x: os.path.getmtime(os.path.join(run_results_dir, x))):
+            # 多个worker在同一秒生成的报告目录同名时追加后缀
+            name = subdir
+            while os.path.exists(os.path.join(Config.RESULTS_DIR, name)):
+                name = f"{subdir}_{uuid.uuid4().hex[:6]}"
+            shutil.move(os.path.join(run_results_dir, subdir), os.path.join(Config.RESULTS_DIR, name))
+            if os.path.exists(os.path.join(Config.RESULTS_DIR, name, "report.html")):
+                report_path = f"results/{name}/report.html"
+    return report_path
+
+def extract_report(report_path: str) -> Dict[str, Any]:
+    """
+    提取结构化测试报告，报告文件及summary.json未修改时直接使用共享缓存中的结果
+    
+    Args:
+        report_path: 报告路径
+        
+    Returns:
+        Dict[str, Any]: 结构化报告
+    """
+    path = resolve_report_path(report_path)
+    with tracer.span("report.extract", path=report_path), \
+            metrics.timer("report_scan_duration_seconds", {"operation": "extract_report"}):
+        files = [p for p in (path, os.path.join(os.path.dirname(path or ""), "summary.json"))
+                 if p and os.path.isfile(p)]
+        if not files:
+            return test_report_extractor.extract(path)
+        signature = [(p, os.path.getmtime(p), os.path.getsize(p)) for p in files]
+        return cache_service.get_or_compute("report", make_cache_key("report", signature),
+                                            lambda: test_report_extractor.extract(path))
+
+def resolve_report_path(report_path: str) -> str:
+    """
+    将接口中的报告路径解析为数据目录下的文件路径
+    
+    接口返回的报告路径形如results/<报告目录>/report.html，与静态文件访问路径一致，不依赖服务的工作目录
+    
+    Args:
+        report_path: 报告路径
+        
+    Returns:
+        str: 文件系统中的报告路径
+    """
+    if not report_path or (os.path.isabs(report_path) and os.path.exists(report_path)):
+        return report_path
+    normalized = report_path.replace('\\', '/').lstrip('/')
+    if normalized.startswith("results/"):
+        return os.path.join(Config.RESULTS_DIR, normalized[len("results/"):])
+    return os.path.join(Config.DATA_DIR, normalized)
+
 
 @app.post("/api/v1/analyze-results", response_model=AIAnalysisResponse)
 async def analyze_test_results(request: AIAnalysisRequest):
     """分析测试结果"""
     try:
-        # 读取测试报告内容
-        test_report_content = ""
-        if request.test_report_path and os.path.exists(request.test_report_path):
-            with open(request.test_report_path, 'r', encoding='utf-8') as f:
-                test_report_content = f.read()
-        
-        # 调用LangChain服务进行分析
-        analysis = langchain_service.analyze_test_results(
-            test_report=test_report_content,
-            execution_result=request.execution_result
-        )
+        # 读取测试报告内容并分析，相同内容已分析过时直接返回存储的结果
+        record, cached = await analyze_coalesced(request)
         
         return AIAnalysisResponse(
             success=True,
-            analysis=analysis,
+            analysis=record["analysis"],
+            failure_clusters=record.get("failure_clusters", []),
+            run_id=record["run_id"],
+            analysis_id=record["analysis_id"],
+            cached=cached,
             error=None
         )
     except Exception as e:
@@ -274,30 +676,19 @@ async def analyze_test_results(request: AIAnalysisRequest):
 async def analyze_test_results_structured(request: AIAnalysisRequest):
     """分析测试结果并返回结构化数据"""
     try:
-        # 读取测试报告内容
-        test_report_content = ""
-        if request.test_report_path and os.path.exists(request.test_report_path):
-            with open(request.test_report_path, 'r', encoding='utf-8') as f:
-                test_report_content = f.read()
-        
-        # 调用LangChain服务进行分析
-        analysis = langchain_service.analyze_test_results(
-            test_report=test_report_content,
-            execution_result=request.execution_result
-        )
-        
-        # 解析分析结果
-        parsed_result = parse_ai_analysis_result(analysis)
-        
-        # 缓存AI分析报告到根路径的MD文件
-        cache_ai_analysis_report(parsed_result)
+        # 读取测试报告内容并分析，相同内容已分析过时直接返回存储的结果
+        record, cached = await analyze_coalesced(request)
         
         return StructuredAIAnalysisResponse(
             success=True,
-            first_part=parsed_result["first_part"],
-            second_part=parsed_result["second_part"],
-            third_part=parsed_result["third_part"],
-            summary=parsed_result["summary"],
+            first_part=record["first_part"],
+            second_part=record["second_part"],
+            third_part=record["third_part"],
+            summary=record["summary"],
+            failure_clusters=record.get("failure_clusters", []),
+            run_id=record["run_id"],
+            analysis_id=record["analysis_id"],
+            cached=cached,
             error=None
         )
     except Exception as e:
@@ -310,6 +701,131 @@ async def analyze_test_results_structured(request: AIAnalysisRequest):
             error=str(e)
         )
 
+@app.post("/api/v1/analyze-results-structured/stream")
+async def analyze_test_results_structured_stream(request: AIAnalysisRequest):
+    """
+    流式分析测试结果，以Server-Sent Events返回结构化数据
+    
+    事件类型：
+    - clusters: 失败签名分组
+    - section: 某个部分已完成，data为 {"section": 字段名, "content": 内容}
+    - done: 分析完成，data为完整的结构化结果
+    - error: 分析出错
+    """
+    def event_stream():
+        try:
+            # 读取测试报告内容，并对失败步骤进行签名聚类
+            test_report_content, failure_clusters, report = prepare_analysis_report(request)
+            yield format_sse_event("clusters", {"failure_clusters": failure_clusters})
+            
+            run_id, analysis_id, prompt_version = resolve_analysis_key(request, test_report_content)
+            record = analysis_store.get(run_id, analysis_id) if request.use_cache else None
+            cached = record is not None
+            
+            if cached:
+                # 命中已存储的分析结果，直接推送各部分
+                for section in ("first_part", "second_part", "third_part", "summary"):
+                    if record.get(section):
+                        yield format_sse_event("section", {"section": section, "content": record[section]})
+            else:
+                # 边接收大模型输出边解析，每个部分完成后立即推送
+                parser = IncrementalSectionParser()
+                chunks = []
+                for text in stream_ai_analysis(request, test_report_content):
+                    chunks.append(text)
+                    for section, content in parser.feed(text):
+                        yield format_sse_event("section", {"section": section, "content": content})
+                for section, content in parser.close():
+                    yield format_sse_event("section", {"section": section, "content": content})
+                
+                record = analysis_store.save(
+                    run_id, analysis_id, prompt_version,
+                    analysis="".join(chunks),
+                    parsed_result=parser.result,
+                    failure_clusters=failure_clusters,
+                    case_results=delta_analysis_service.build_case_digest(report)
+                )
+            
+            yield format_sse_event("done", {
+                "success": True,
+                "first_part": record["first_part"],
+                "second_part": record["second_part"],
+                "third_part": record["third_part"],
+                "summary": record["summary"],
+                "failure_clusters": record.get("failure_clusters", []),
+                "run_id": record["run_id"],
+                "analysis_id": record["analysis_id"],
+                "cached": cached
+            })
+        except Exception as e:
+            logger.error(f"流式分析测试结果时出错: {e}")
+            yield format_sse_event("error", {"success": False, "error": str(e)})
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/api/v1/analyze-results-delta", response_model=DeltaAIAnalysisResponse)
+async def analyze_test_results_delta(request: DeltaAIAnalysisRequest):
+    """
+    增量分析测试结果
+    
+    将当前运行与基线运行逐用例对比，只把变化部分交给大模型，
+    未变化的结论复用基线运行已存储的分析结果；没有基线分析时退化为完整分析。
+    分析在线程中执行，参数相同的并发请求共享同一次分析
+    """
+    try:
+        result, _ = await single_flight.run(
+            "analyze_delta", make_cache_key("analyze_delta", request.model_dump()),
+            lambda: analyze_delta_with_store(request)
+        )
+        return build_delta_response(**result)
+    except Exception as e:
+        return DeltaAIAnalysisResponse(
+            success=False,
+            error=str(e)
+        )
+
+@app.get("/api/v1/analyses", response_model=StoredAnalysesListResponse)
+async def list_stored_analyses(run_id: Optional[str] = None, limit: int = 50):
+    """获取已存储的AI分析结果列表"""
+    try:
+        entries = analysis_store.list_analyses(run_id=run_id, limit=limit)
+        return StoredAnalysesListResponse(
+            success=True,
+            analyses=[StoredAnalysisSummary(**entry) for entry in entries],
+            total=len(entries)
+        )
+    except Exception as e:
+        return StoredAnalysesListResponse(
+            success=False,
+            analyses=[],
+            total=0,
+            error=str(e)
+        )
+
+@app.get("/api/v1/analyses/{run_id}/latest", response_model=StoredAnalysisResponse)
+async def get_latest_stored_analysis(run_id: str):
+    """获取指定运行最新的AI分析结果"""
+    record = analysis_store.latest(run_id)
+    if record is None:
+        return StoredAnalysisResponse(success=False, error=f"运行 {run_id} 没有已存储的分析结果")
+    return StoredAnalysisResponse(success=True, analysis=record)
+
+@app.get("/api/v1/analyses/{run_id}/{analysis_id}", response_model=StoredAnalysisResponse)
+async def get_stored_analysis(run_id: str, analysis_id: str):
+    """获取指定的AI分析结果"""
+    record = analysis_store.get(run_id, analysis_id)
+    if record is None:
+        return StoredAnalysisResponse(success=False, error=f"未找到分析结果: {run_id}/{analysis_id}")
+    return StoredAnalysisResponse(success=True, analysis=record)
+
+@app.get("/api/v1/analyses/{run_id}/{analysis_id}/markdown", response_class=PlainTextResponse)
+async def get_stored_analysis_markdown(run_id: str, analysis_id: str):
+    """以Markdown格式获取指定的AI分析报告"""
+    record = analysis_store.get(run_id, analysis_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"未找到分析结果: {run_id}/{analysis_id}")
+    return PlainTextResponse(AnalysisStore.render_markdown(record), media_type="text/markdown; charset=utf-8")
+
 @app.post("/api/v1/separate-test-points", response_model=SeparateTestPointsResponse)
 async def separate_test_points(request: SeparateTestPointsRequest):
     """将测试用例内容分离为独立的测试要点"""
@@ -317,13 +833,24 @@ async def separate_test_points(request: SeparateTestPointsRequest):
         # 分离测试要点
         separated_points = test_case_management_service.separate_test_points(request.test_cases_content)
         
-        # 按逻辑分组
-        grouped_points = test_case_management_service.group_test_cases_by_logic(separated_points)
+        # 按前置条件和相似度分组，并按执行耗时均衡各组
+        execution_groups = test_case_management_service.build_execution_groups(
+            separated_points, num_groups=request.num_groups
+        )
+        grouped_points = {name: group["points"] for name, group in execution_groups.items()}
+        group_estimates = {
+            name: {
+                "estimated_duration": group["estimated_duration"],
+                "preconditions": group["preconditions"]
+            }
+            for name, group in execution_groups.items()
+        }
         
         return SeparateTestPointsResponse(
             success=True,
             separated_test_points=separated_points,
             grouped_test_points=grouped_points,
+            group_estimates=group_estimates,
             total_points=len(separated_points)
         )
     except Exception as e:
@@ -335,22 +862,305 @@ async def separate_test_points(request: SeparateTestPointsRequest):
             error=str(e)
         )
 
+def request_content_length(request: Request) -> Optional[int]:
+    """获取请求的Content-Length，未提供或格式错误时返回None"""
+    value = request.headers.get("content-length")
+    return int(value) if value and value.isdigit() else None
+
+def multipart_openapi(file_field: str, multiple: bool, **fields: Dict[str, Any]) -> Dict[str, Any]:
+    """构建直接读取请求体的上传接口在OpenAPI文档中的multipart/form-data请求体描述"""
+    file_schema: Dict[str, Any] = {"type": "string", "format": "binary"}
+    properties = {file_field: {"type": "array", "items": file_schema} if multiple else file_schema, **fields}
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {
+        "schema": {"type": "object", "required": [file_field], "properties": properties}
+    }}}}
+
+@app.post("/api/v1/documents/upload", response_model=DocumentIngestionResponse,
+          openapi_extra=multipart_openapi("files", True, generation_type={"type": "string"},
+                                          num_groups={"type": "integer"}))
+async def upload_documents(request: Request):
+    """
+    上传多个需求文档（.xlsx/.docx/.txt），并行提取测试要点后分组，可选生成测试数据或测试脚本
+
+    请求体为multipart/form-data，字段files为文件，可选字段generation_type和num_groups；
+    直接从请求流写入磁盘，单个文件超过大小上限时立即中止
+    """
+    try:
+        task_id = str(uuid.uuid4())
+        saved_files, fields = await document_ingestion_service.save_multipart_upload(
+            request.headers.get("content-type", ""), request.stream(),
+            content_length=request_content_length(request), task_id=task_id
+        )
+        if not saved_files:
+            raise ValueError("未上传文件")
+        num_groups = int(fields["num_groups"]) if fields.get("num_groups") else None
+        return await ingest_documents(saved_files, fields.get("generation_type") or None, num_groups)
+    except Exception as e:
+        return DocumentIngestionResponse(
+            success=False,
+            files=[],
+            separated_test_points=[],
+            grouped_test_points={},
+            total_points=0,
+            error=str(e)
+        )
+
+@app.post("/api/v1/uploads", response_model=UploadSessionResponse)
+async def create_upload_session(request: UploadSessionRequest):
+    """创建分片上传会话，用于大文件的断点续传"""
+    try:
+        return UploadSessionResponse(
+            **document_ingestion_service.create_upload_session(request.filename, request.total_size)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/v1/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(upload_id: str):
+    """获取分片上传会话的进度，客户端中断后从返回的offset继续上传"""
+    try:
+        return UploadSessionResponse(**document_ingestion_service.get_upload_session(upload_id))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+@app.put("/api/v1/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    """上传一个分片，请求体为分片的原始字节，offset为分片在文件中的起始偏移量"""
+    try:
+        return UploadSessionResponse(
+            **await document_ingestion_service.append_chunk(upload_id, offset, request.stream(),
+                                                            content_length=request_content_length(request))
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "offset": e.offset})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/v1/uploads/{upload_id}/complete", response_model=DocumentIngestionResponse)
+async def complete_upload(upload_id: str, request: CompleteUploadRequest):
+    """完成分片上传，提取测试要点后分组，可选生成测试数据或测试脚本"""
+    try:
+        saved_file = document_ingestion_service.complete_upload_session(upload_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "offset": e.offset})
+    try:
+        return await ingest_documents([saved_file], request.generation_type, request.num_groups)
+    except Exception as e:
+        return DocumentIngestionResponse(
+            success=False,
+            files=[saved_file],
+            separated_test_points=[],
+            grouped_test_points={},
+            total_points=0,
+            error=str(e)
+        )
+
+@app.post("/api/v1/requirements/{document_id}/revisions", response_model=RequirementRevisionResponse,
+          openapi_extra=multipart_openapi("file", False))
+async def upload_requirement_revision(document_id: str, request: Request):
+    """
+    上传需求文档的新版本，只为新增和修改的需求生成测试用例，删除的需求对应的测试用例被停用
+
+    请求体为multipart/form-data，字段file为文件，直接从请求流写入磁盘；生成测试用例在线程中执行，不阻塞事件循环
+    """
+    try:
+        saved_files, _ = await document_ingestion_service.save_multipart_upload(
+            request.headers.get("content-type", ""), request.stream(),
+            content_length=request_content_length(request), max_files=1
+        )
+        if not saved_files:
+            raise ValueError("未上传文件")
+        saved_file = saved_files[0]
+        units = await document_ingestion_service.extract_requirement_units(saved_file["path"])
+        result = await asyncio.to_thread(
+            test_case_service.regenerate_from_requirements, document_id, units, sha256=saved_file["sha256"]
+        )
+        if result.get("status") == "error":
+            return RequirementRevisionResponse(success=False, document_id=document_id, error=result.get("error"))
+        result.pop("status")
+        return RequirementRevisionResponse(success=True, **result)
+    except Exception as e:
+        return RequirementRevisionResponse(success=False, document_id=document_id, error=str(e))
+
+@app.get("/api/v1/requirements/{document_id}", response_model=RequirementDocumentResponse)
+async def get_requirement_document(document_id: str, include_retired: bool = False):
+    """获取需求文档的当前版本及各需求单元的测试用例"""
+    document = test_case_service.requirement_store.get_document(document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail=f"需求文档不存在: {document_id}")
+    return RequirementDocumentResponse(
+        success=True,
+        document=document,
+        units=test_case_service.requirement_store.get_units(document_id, include_retired=include_retired)
+    )
+
+@app.get("/api/v1/file-store/tasks", response_model=FileStoreTasksResponse)
+async def list_file_store_tasks(task_id: Optional[str] = None, date: Optional[str] = None,
+                                file_name: Optional[str] = None, limit: int = 100,
+                                before: Optional[str] = None):
+    """按任务ID、创建日期（YYYY-MM-DD）或文件名查询文件存储中的任务，按创建时间倒序分页"""
+    try:
+        if task_id:
+            return FileStoreTasksResponse(success=True, tasks=file_store.get_tasks_by_task_id(task_id))
+        result = file_store.list_tasks(date=date, file_name=file_name, limit=max(1, min(limit, 1000)),
+                                       before=before)
+        return FileStoreTasksResponse(success=True, **result)
+    except Exception as e:
+        return FileStoreTasksResponse(success=False, tasks=[], error=str(e))
+
+@app.get("/api/v1/file-store/tasks/{store_id}")
+async def get_file_store_task(store_id: str):
+    """获取文件存储中单个任务目录的元数据"""
+    task = file_store.get_task(store_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {store_id}")
+    return task
+
+@app.get("/api/v1/file-store/tasks/{store_id}/files/{file_name}", response_class=PlainTextResponse)
+async def read_file_store_file(store_id: str, file_name: str):
+    """读取文件存储中任务文件的内容"""
+    try:
+        return PlainTextResponse(file_store.read_file(store_id, file_name).decode('utf-8', errors='replace'))
+    except (KeyError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/v1/file-store/stats")
+async def get_file_store_stats():
+    """获取文件存储的任务数量及内容去重、压缩统计"""
+    return {"tasks": file_store.count(), "blobs": file_store.blob_stats()}
+
+@app.post("/api/v1/file-store/compact")
+async def compact_file_store():
+    """将任务目录中的文件转入内容寻址存储，并删除不再被引用的内容"""
+    try:
+        migrated = file_store.migrate_files_to_blobs()
+        collected = file_store.gc_blobs(grace_seconds=Config.BLOB_GC_GRACE_SECONDS)
+        return {"success": True, **migrated, **collected, "stats": file_store.blob_stats()}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@app.post("/api/v1/retention/run")
+async def run_retention(dry_run: bool = False):
+    """立即执行一次测试产物保留策略，dry_run为true时只返回计划归档的条目"""
+    try:
+        result = await asyncio.to_thread(retention_service.run_once, dry_run)
+        return {"success": True, **result}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@app.get("/api/v1/retention/status")
+async def get_retention_status():
+    """获取保留策略配置及最近一次执行结果"""
+    return {
+        "enabled": Config.RETENTION_ENABLED,
+        "interval_seconds": Config.RETENTION_INTERVAL_SECONDS,
+        "policies": retention_service.policies,
+        "last_run": retention_service.get_last_run()
+    }
+
+@app.get("/api/v1/retention/archives", response_model=RetentionArchivesResponse)
+async def list_retention_archives(directory: Optional[str] = None, name: Optional[str] = None, limit: int = 100):
+    """查询已归档的测试运行及其结构化摘要"""
+    try:
+        return RetentionArchivesResponse(
+            success=True,
+            archives=retention_service.list_archives(directory=directory, name=name, limit=limit)
+        )
+    except Exception as e:
+        return RetentionArchivesResponse(success=False, archives=[], error=str(e))
+
+@app.get("/api/v1/cache/stats")
+async def get_cache_stats():
+    """获取共享缓存按命名空间的统计，命中等计数为当前worker的统计"""
+    try:
+        return {"success": True, **cache_service.stats()}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@app.delete("/api/v1/cache")
+async def clear_cache(namespace: Optional[str] = None):
+    """清空共享缓存，指定namespace时只清空该命名空间"""
+    try:
+        return {"success": True, "deleted": cache_service.clear(namespace)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@app.get("/api/v1/single-flight/stats")
+async def get_single_flight_stats():
+    """获取当前worker中相同并发请求的合并统计"""
+    return {"pid": os.getpid(), "shared": single_flight.cache is not None, "stats": single_flight.stats()}
+
+@app.get("/api/v1/admission/stats")
+async def get_admission_stats():
+    """获取当前worker各优先级类别的并发、排队及拒绝统计"""
+    return {"pid": os.getpid(), "enabled": Config.ADMISSION_ENABLED, "classes": admission_controller.stats()}
+
+def sync_component_metrics():
+    """将缓存、请求合并及准入控制各自累计的统计同步到指标注册表"""
+    for namespace, stats in cache_service.stats()["namespaces"].items():
+        for result in ("hits", "misses"):
+            metrics.set("cache_requests_total", stats.get(result, 0), {"namespace": namespace, "result": result})
+    for namespace, stats in single_flight.stats().items():
+        for result in ("calls", "executions", "coalesced", "coalesced_remote", "errors"):
+            metrics.set("single_flight_requests_total", stats.get(result, 0),
+                        {"namespace": namespace, "result": result})
+    for name, stats in admission_controller.stats().items():
+        labels = {"class": name}
+        metrics.set("admission_running", stats["running"], labels)
+        metrics.set("admission_queue_depth", stats["queued"], labels)
+        metrics.set("admission_queue_wait_seconds_total", stats["wait_seconds_sum"], labels)
+        for result in ("admitted", "rejected", "timed_out"):
+            metrics.set("admission_requests_total", stats[result], dict(labels, result=result))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """以Prometheus文本格式输出所有worker合并后的运行指标"""
+    if not Config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="运行指标未启用")
+    sync_component_metrics()
+    # 超过3个快照间隔未更新的快照视为已退出的worker
+    snapshot = metrics.collect(Config.METRICS_DIR if Config.WORKERS > 1 else None,
+                               max_age=Config.METRICS_SNAPSHOT_SECONDS * 3)
+    # 命中率由合并后的命中及未命中次数计算，不能直接相加各worker的命中率
+    cache_requests = {}
+    for key, value in snapshot.get("cache_requests_total", {}).get("series", []):
+        labels = dict(key)
+        counts = cache_requests.setdefault(labels["namespace"], {})
+        counts[labels["result"]] = value
+    snapshot["cache_hit_ratio"]["series"] = [
+        [[("namespace", namespace)], counts.get("hits", 0) / (counts.get("hits", 0) + counts.get("misses", 0))]
+        for namespace, counts in cache_requests.items()
+        if counts.get("hits", 0) + counts.get("misses", 0)
+    ]
+    return PlainTextResponse(metrics.render(snapshot), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/api/v1/batch-execute-tests", response_model=BatchExecuteTestsResponse)
 async def batch_execute_tests(request: BatchExecuteTestsRequest):
-    """批量执行测试用例"""
+    """批量执行测试用例，生成测试脚本在线程中执行，不阻塞事件循环"""
     execution_results = []
     
     try:
         for test_point in request.test_points:
+            if test_point.get("has_children"):
+                # 含子要点的分组标题不单独生成和执行，其内容作为子要点的上下文
+                continue
+            
             # 记录开始时间
             start_time = time.time()
             
             # 为每个测试要点生成测试脚本
-            script_result = test_case_service.convert_single_case(
-                test_case_description=test_point.get("content", ""),
+            script_result = await asyncio.to_thread(
+                test_case_service.convert_single_case,
+                test_case_description=generation_content(test_point),
                 generation_type="script"
             )
             
+            point_id = test_point.get("id") or compute_point_id(test_point.get("content", ""))
+            
             if script_result.get("status") != "success":
                 # 生成脚本失败
                 execution_result = {
@@ -365,6 +1175,22 @@ async def batch_execute_tests(request: BatchExecuteTestsRequest):
             else:
                 # 执行测试脚本
                 script_content = script_result.get("generated_script", "")
+                artefact = script_content or str(script_result.get("generated_test_cases", ""))
+                # execute_test_script执行的是测试数据目录下的全部yml文件，
+                # 执行结果按生成产物及实际执行的测试数据文件指纹共同标识
+                testcases_key = await asyncio.to_thread(testcases_fingerprint)
+                artefact_hash = hashlib.sha256(
+                    f"{artefact}\0{testcases_key or ''}".encode("utf-8")
+                ).hexdigest()
+                cached_result = test_case_service.registry.get_result(point_id, artefact_hash) \
+                    if request.reuse_cached_results and testcases_key is not None else None
+                
+                if cached_result is not None:
+                    # 测试要点、生成产物及执行的测试数据文件均未变化，复用上次的执行结果
+                    execution_result = dict(cached_result, cached=True)
+                    execution_results.append(execution_result)
+                    continue
+                
                 execute_request = TestExecutionRequest(script_content=script_content)
                 
                 try:
@@ -379,6 +1205,7 @@ async def batch_execute_tests(request: BatchExecuteTestsRequest):
                         "execution_time": time.time() - start_time,
                         "timestamp": time.time()
                     }
+                    test_case_service.registry.record_result(point_id, artefact_hash, execution_result)
                 except Exception as e:
                     execution_result = {
                         "test_case_id": test_point.get("id", "unknown"),
@@ -407,6 +1234,14 @@ async def batch_execute_tests(request: BatchExecuteTestsRequest):
             error=str(e)
         )
 
+@app.get("/api/v1/test-points/{point_id}")
+async def get_test_point_registry(point_id: str):
+    """获取测试要点的生成产物及最近一次执行结果"""
+    try:
+        return {"success": True, **test_case_service.registry.describe(point_id)}
+    except Exception as e:
+        return {"success": False, "point_id": point_id, "error": str(e)}
+
 @app.post("/api/v1/integrate-reports", response_model=IntegrateReportsResponse)
 async def integrate_test_reports(request: IntegrateReportsRequest):
     """整合多个测试报告为统一报告"""
@@ -437,7 +1272,7 @@ def create_report_info(report_dir):
     report_url = f"/results/{report_dir}/report.html"
     
     # 获取创建时间和修改时间
-    dir_path = os.path.join("results", report_dir)
+    dir_path = os.path.join(Config.RESULTS_DIR, report_dir)
     if os.path.exists(dir_path):
         stat_info = os.stat(dir_path)
         created_at = stat_info.st_ctime
@@ -458,17 +1293,18 @@ def create_report_info(report_dir):
 async def get_reports_list():
     """获取所有测试报告列表"""
     try:
-        results_dir = "results"
+        results_dir = Config.RESULTS_DIR
         reports = []
         
         if os.path.exists(results_dir):
-            # 获取所有报告目录（按修改时间排序）
-            subdirs = [d for d in os.listdir(results_dir) if os.path.isdir(os.path.join(results_dir, d))]
-            for subdir in sorted(subdirs, key=lambda x: os.path.getmtime(os.path.join(results_dir, x)), reverse=True):
-                # 检查report.html是否存在
-                report_html_path = os.path.join(results_dir, subdir, "report.html")
-                if os.path.exists(report_html_path):
-                    reports.append(create_report_info(subdir))
+            with metrics.timer("report_scan_duration_seconds", {"operation": "list_reports"}):
+                # 获取所有报告目录（按修改时间排序）
+                subdirs = [d for d in os.listdir(results_dir) if os.path.isdir(os.path.join(results_dir, d))]
+                for subdir in sorted(subdirs, key=lambda x: os.path.getmtime(os.path.join(results_dir, x)), reverse=True):
+                    # 检查report.html是否存在
+                    report_html_path = os.path.join(results_dir, subdir, "report.html")
+                    if os.path.exists(report_html_path):
+                        reports.append(create_report_info(subdir))
         
         return ReportsListResponse(
             success=True,
@@ -487,20 +1323,21 @@ async def get_reports_list():
 async def get_latest_report():
     """获取最新的测试报告"""
     try:
-        results_dir = "results"
+        results_dir = Config.RESULTS_DIR
         
         if os.path.exists(results_dir):
-            # 获取所有报告目录（按修改时间排序）
-            subdirs = [d for d in os.listdir(results_dir) if os.path.isdir(os.path.join(results_dir, d))]
-            if subdirs:
-                # 按修改时间降序排序，取第一个作为最新的
-                latest_dir = max(subdirs, key=lambda x: os.path.getmtime(os.path.join(results_dir, x)))
-                report_html_path = os.path.join(results_dir, latest_dir, "report.html")
-                if os.path.exists(report_html_path):
-                    return LatestReportResponse(
-                        success=True,
-                        latest_report=create_report_info(latest_dir)
-                    )
+            with metrics.timer("report_scan_duration_seconds", {"operation": "latest_report"}):
+                # 获取所有报告目录（按修改时间排序）
+                subdirs = [d for d in os.listdir(results_dir) if os.path.isdir(os.path.join(results_dir, d))]
+                if subdirs:
+                    # 按修改时间降序排序，取第一个作为最新的
+                    latest_dir = max(subdirs, key=lambda x: os.path.getmtime(os.path.join(results_dir, x)))
+                    report_html_path = os.path.join(results_dir, latest_dir, "report.html")
+                    if os.path.exists(report_html_path):
+                        return LatestReportResponse(
+                            success=True,
+                            latest_report=create_report_info(latest_dir)
+                        )
         
         # 没有找到报告
         return LatestReportResponse(
@@ -520,41 +1357,400 @@ async def health_check():
     """健康检查接口"""
     return {"status": "healthy"}
 
-def cache_ai_analysis_report(parsed_result: dict) -> None:
+async def retention_loop():
+    """按配置的间隔在后台线程中执行保留策略"""
+    while True:
+        await asyncio.sleep(Config.RETENTION_INTERVAL_SECONDS)
+        try:
+            # 每个worker都运行该任务，距上次执行（任意worker）不足半个间隔时跳过
+            result = await asyncio.to_thread(retention_service.run_once, False,
+                                             Config.RETENTION_INTERVAL_SECONDS / 2)
+            if result.get("archived"):
+                logger.info(f"保留策略归档 {result['archived']} 个条目，释放 {result['freed_bytes']} 字节")
+        except Exception as e:
+            logger.error(f"执行保留策略失败: {str(e)}")
+
+@app.on_event("startup")
+async def start_retention_loop():
+    """启动测试产物保留策略后台任务"""
+    if Config.RETENTION_ENABLED:
+        app.state.retention_task = asyncio.create_task(retention_loop())
+
+async def metrics_snapshot_loop():
+    """定期将当前worker的指标快照写入共享目录，供其他worker输出/metrics时合并"""
+    while True:
+        try:
+            sync_component_metrics()
+            await asyncio.to_thread(metrics.write_snapshot, Config.METRICS_DIR)
+        except Exception as e:
+            logger.error(f"写入指标快照失败: {str(e)}")
+        await asyncio.sleep(Config.METRICS_SNAPSHOT_SECONDS)
+
+@app.on_event("startup")
+async def start_metrics_snapshot_loop():
+    """多worker部署时启动指标快照后台任务"""
+    if Config.METRICS_ENABLED and Config.WORKERS > 1:
+        app.state.metrics_task = asyncio.create_task(metrics_snapshot_loop())
+
+@app.on_event("shutdown")
+def shutdown_ingestion_pool():
+    """关闭文档提取进程池"""
+    document_ingestion_service.shutdown()
+
+@app.on_event("shutdown")
+def stop_retention_loop():
+    """停止测试产物保留策略后台任务"""
+    retention_task = getattr(app.state, "retention_task", None)
+    if retention_task is not None:
+        retention_task.cancel()
+
+@app.on_event("shutdown")
+def shutdown_tracer():
+    """导出剩余的链路追踪数据"""
+    tracer.shutdown()
+
+@app.on_event("shutdown")
+def stop_metrics_snapshot_loop():
+    """停止指标快照后台任务并删除当前worker的快照"""
+    metrics_task = getattr(app.state, "metrics_task", None)
+    if metrics_task is not None:
+        metrics_task.cancel()
+        metrics.remove_snapshot(Config.METRICS_DIR)
+
+async def ingest_documents(saved_files: List[Dict[str, Any]], generation_type: Optional[str],
+                           num_groups: Optional[int]) -> DocumentIngestionResponse:
     """
-    缓存AI分析报告到根路径的MD文件
+    并行提取已上传文档中的测试要点，分组后按generation_type生成测试数据或测试脚本
     
     Args:
-        parsed_result: 解析后的AI分析结果字典
+        saved_files: save_multipart_upload或complete_upload_session返回的文件信息列表
+        generation_type: test_data生成测试数据，script生成测试脚本，为空时不生成
+        num_groups: 分组数量（并行执行数）
+        
+    Returns:
+        DocumentIngestionResponse: 导入结果
     """
-    try:
-        # 构建报告内容
-        report_content = f"""# AI测试分析报告
+    if generation_type not in (None, "", "test_data", "script"):
+        raise ValueError(f"不支持的生成类型: {generation_type}")
+    
+    extractions = await document_ingestion_service.extract_files([f["path"] for f in saved_files])
+    files = []
+    separated_points = []
+    for saved_file, extraction in zip(saved_files, extractions):
+        files.append({
+            "name": saved_file["name"],
+            "size": saved_file["size"],
+            "sha256": saved_file["sha256"],
+            "test_point_count": len(extraction["test_points"]),
+            "error": extraction["error"]
+        })
+        separated_points.extend(extraction["test_points"])
+    
+    # 分组及生成在线程中执行，不阻塞事件循环
+    execution_groups = await asyncio.to_thread(
+        test_case_management_service.build_execution_groups, separated_points, num_groups=num_groups
+    )
+    
+    generation = None
+    # 含子要点的分组标题不单独生成，作为上下文并入各子要点
+    contents = generation_points(separated_points)
+    if generation_type == "test_data" and contents:
+        generation = await asyncio.to_thread(test_case_service.generate_test_data_files, contents)
+    elif generation_type == "script" and contents:
+        generation = await asyncio.to_thread(test_case_service.convert_batch_cases, contents)
+    
+    return DocumentIngestionResponse(
+        success=True,
+        files=files,
+        separated_test_points=separated_points,
+        grouped_test_points={name: group["points"] for name, group in execution_groups.items()},
+        group_estimates={
+            name: {
+                "estimated_duration": group["estimated_duration"],
+                "preconditions": group["preconditions"]
+            }
+            for name, group in execution_groups.items()
+        },
+        total_points=len(separated_points),
+        generation=generation
+    )
 
-## 第一部分：测试案例分析
+def prepare_analysis_report(request: AIAnalysisRequest) -> tuple:
+    """
+    读取测试报告并生成用于AI分析的报告内容
+    
+    启用失败聚类时，相同签名的失败步骤只保留一个代表样本并附带数量
+    
+    Args:
+        request: AI分析请求
+        
+    Returns:
+        tuple: (用于分析的报告内容, 失败分组列表, 结构化报告)
+    """
+    report = extract_report(request.test_report_path)
+    if not request.cluster_failures:
+        return report["raw_content"], [], report
+    
+    with tracer.span("analyze.cluster_failures", failed_steps=len(report.get("failed_steps", []))):
+        report_content, clusters = failure_clustering_service.condense_report(report)
+    if clusters:
+        logger.info(f"失败步骤 {len(report['failed_steps'])} 个，聚类为 {len(clusters)} 组")
+    return report_content, clusters, report
 
-{parsed_result.get('first_part', '').replace('：测试案例分析', '').replace(':测试案例分析', '').lstrip()}
+def use_chunked_analysis(request: AIAnalysisRequest, test_report_content: str) -> bool:
+    """根据分析模式判断是否使用分片并行分析"""
+    mode = request.analysis_mode or "auto"
+    if mode == "auto":
+        return langchain_service.needs_chunked_analysis(test_report_content, request.token_budget)
+    return mode == "chunked"
 
-## 第二部分：测试结果分析
+def run_ai_analysis(request: AIAnalysisRequest, test_report_content: str) -> str:
+    """
+    根据分析模式调用LangChain服务分析测试报告
+    
+    Args:
+        request: AI分析请求
+        test_report_content: 用于分析的报告内容
+        
+    Returns:
+        str: AI分析结果文本
+    """
+    if not use_chunked_analysis(request, test_report_content):
+        return langchain_service.analyze_test_results(
+            test_report=test_report_content,
+            execution_result=request.execution_result
+        )
+    
+    logger.info("使用分片并行分析模式")
+    return langchain_service.analyze_test_results_chunked(
+        test_report=TestReportExtractor.html_to_text(test_report_content),
+        execution_result=request.execution_result,
+        chunk_tokens=request.chunk_tokens,
+        max_concurrency=request.max_concurrency,
+        token_budget=request.token_budget
+    )
 
-{parsed_result.get('second_part', '').replace('：测试结果分析', '').replace(':测试结果分析', '').lstrip()}
+def stream_ai_analysis(request: AIAnalysisRequest, test_report_content: str):
+    """
+    根据分析模式流式调用LangChain服务分析测试报告
+    
+    Args:
+        request: AI分析请求
+        test_report_content: 用于分析的报告内容
+        
+    Returns:
+        Iterator[str]: 大模型输出的文本片段
+    """
+    if not use_chunked_analysis(request, test_report_content):
+        return langchain_service.stream_analyze_test_results(
+            test_report=test_report_content,
+            execution_result=request.execution_result
+        )
+    
+    logger.info("使用分片并行分析模式")
+    return langchain_service.stream_analyze_test_results_chunked(
+        test_report=TestReportExtractor.html_to_text(test_report_content),
+        execution_result=request.execution_result,
+        chunk_tokens=request.chunk_tokens,
+        max_concurrency=request.max_concurrency,
+        token_budget=request.token_budget
+    )
 
-## 第三部分：指导建议
+def format_sse_event(event: str, data: dict) -> str:
+    """格式化Server-Sent Events事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-{parsed_result.get('third_part', '').replace('：指导建议', '').replace(':指导建议', '').lstrip()}
+def resolve_analysis_key(request: AIAnalysisRequest, test_report_content: str) -> tuple:
+    """
+    计算分析结果在存储中的键
+    
+    键由运行ID、分析内容哈希及提示词版本组成，分片模式使用分片提示词的版本
+    
+    Args:
+        request: AI分析请求
+        test_report_content: 用于分析的报告内容
+        
+    Returns:
+        tuple: (运行ID, 分析结果ID, 提示词版本)
+    """
+    run_id = request.run_id or AnalysisStore.run_id_from_report_path(request.test_report_path)
+    if use_chunked_analysis(request, test_report_content):
+        prompt_version = langchain_service.get_prompt_version("ai_analysis_map", "ai_analysis_reduce")
+    else:
+        prompt_version = langchain_service.get_prompt_version("ai_analysis")
+    analysis_id = AnalysisStore.compute_key(run_id, test_report_content, prompt_version)
+    return run_id, analysis_id, prompt_version
 
-## 总结
+def analyze_with_store(request: AIAnalysisRequest) -> tuple:
+    """
+    分析测试报告并保存到分析结果存储
+    
+    相同运行、相同内容和相同提示词版本已分析过时直接返回存储的结果
+    
+    Args:
+        request: AI分析请求
+        
+    Returns:
+        tuple: (分析记录, 是否命中存储)
+    """
+    # 读取测试报告内容，并对失败步骤进行签名聚类
+    test_report_content, failure_clusters, report = prepare_analysis_report(request)
+    
+    run_id, analysis_id, prompt_version = resolve_analysis_key(request, test_report_content)
+    if request.use_cache:
+        record = analysis_store.get(run_id, analysis_id)
+        if record is not None:
+            logger.info(f"命中已存储的分析结果: {run_id}/{analysis_id}")
+            return record, True
+    
+    # 调用LangChain服务进行分析
+    with tracer.span("analyze.llm", mode=request.analysis_mode or "auto"):
+        analysis = run_ai_analysis(request, test_report_content)
+    
+    # 解析分析结果并存储
+    with tracer.span("analyze.store"):
+        parsed_result = parse_ai_analysis_result(analysis)
+        record = analysis_store.save(
+            run_id, analysis_id, prompt_version,
+            analysis=analysis,
+            parsed_result=parsed_result,
+            failure_clusters=failure_clusters,
+            case_results=delta_analysis_service.build_case_digest(report)
+        )
+    return record, False
 
-{parsed_result.get('summary', '').replace('：总结', '').replace(':总结', '').lstrip()}
-"""
+def analyze_delta_with_store(request: DeltaAIAnalysisRequest) -> dict:
+    """
+    与基线运行对比后增量分析测试报告并保存到分析结果存储
+    
+    Args:
+        request: 增量AI分析请求
         
-        # 写入到根路径的analysis_report.md文件
-        with open("analysis_report.md", "w", encoding="utf-8") as f:
-            f.write(report_content)
-            
-    except Exception as e:
-        # 记录错误但不中断主流程
-        logger.error(f"缓存AI分析报告时出错: {e}")
+    Returns:
+        dict: build_delta_response的参数，包括record、cached、baseline_run_id、delta和reused_baseline
+    """
+    test_report_content, failure_clusters, report = prepare_analysis_report(request)
+    run_id = request.run_id or AnalysisStore.run_id_from_report_path(request.test_report_path)
+    baseline_run_id = request.baseline_run_id or find_previous_run_id(run_id)
+    baseline_record = analysis_store.latest(baseline_run_id) if baseline_run_id else None
+    
+    if baseline_record is None or not baseline_record.get("case_results") or not report["cases"]:
+        # 没有可对比的基线，执行完整分析
+        logger.info("未找到可用的基线分析结果，执行完整分析")
+        record, cached = analyze_with_store(request)
+        return {"record": record, "cached": cached, "baseline_run_id": baseline_run_id, "delta": {},
+                "reused_baseline": False}
+    
+    current_digest = delta_analysis_service.build_case_digest(report)
+    delta = delta_analysis_service.diff_runs(current_digest, baseline_record["case_results"])
+    
+    if delta_analysis_service.is_empty(delta):
+        # 与基线完全一致，直接复用基线分析结果
+        # 同时保存到当前运行下，供下一次运行作为基线
+        logger.info(f"当前运行与基线运行 {baseline_run_id} 无变化，复用基线分析结果")
+        record = analysis_store.save(
+            run_id,
+            AnalysisStore.compute_key(run_id, baseline_record["analysis_id"], baseline_record["prompt_version"]),
+            baseline_record["prompt_version"],
+            analysis=baseline_record["analysis"],
+            parsed_result=baseline_record,
+            failure_clusters=failure_clusters,
+            case_results=current_digest,
+            baseline_run_id=baseline_run_id,
+            baseline_analysis_id=baseline_record["analysis_id"]
+        )
+        return {"record": record, "cached": True, "baseline_run_id": baseline_run_id, "delta": delta,
+                "reused_baseline": True}
+    
+    delta_report = delta_analysis_service.format_delta_for_prompt(delta)
+    prompt_version = langchain_service.get_prompt_version("ai_analysis_delta")
+    analysis_id = AnalysisStore.compute_key(
+        run_id, f"{baseline_record['analysis_id']}\n{delta_report}", prompt_version)
+    record = analysis_store.get(run_id, analysis_id) if request.use_cache else None
+    cached = record is not None
+    
+    if not cached:
+        logger.info(f"增量分析：{len(current_digest) - delta['unchanged_count']} 个用例有变化，"
+                    f"{delta['unchanged_count']} 个用例复用基线结论")
+        with tracer.span("analyze.llm", mode="delta"):
+            analysis = langchain_service.analyze_test_results_delta(
+                delta_report=delta_report,
+                baseline_analysis=AnalysisStore.render_markdown(baseline_record),
+                execution_result=request.execution_result
+            )
+        record = analysis_store.save(
+            run_id, analysis_id, prompt_version,
+            analysis=analysis,
+            parsed_result=parse_ai_analysis_result(analysis),
+            failure_clusters=failure_clusters,
+            case_results=current_digest,
+            baseline_run_id=baseline_run_id,
+            baseline_analysis_id=baseline_record["analysis_id"]
+        )
+    
+    return {"record": record, "cached": cached, "baseline_run_id": baseline_run_id, "delta": delta,
+            "reused_baseline": False}
+
+async def analyze_coalesced(request: AIAnalysisRequest) -> tuple:
+    """
+    分析测试报告，参数相同的并发分析请求共享同一次分析
+    
+    Args:
+        request: AI分析请求
+        
+    Returns:
+        tuple: (分析记录, 是否命中存储)
+    """
+    def analyze():
+        record, cached = analyze_with_store(request)
+        return {"record": record, "cached": cached}
+    
+    result, _ = await single_flight.run("analyze", make_cache_key("analyze", request.model_dump()), analyze)
+    return result["record"], result["cached"]
+
+def find_previous_run_id(run_id: str) -> Optional[str]:
+    """
+    查找当前运行之前最近的一次运行ID
+    
+    优先在results目录中按修改时间查找，找不到时从分析结果存储中查找
+    
+    Args:
+        run_id: 当前运行ID
+        
+    Returns:
+        Optional[str]: 上一次运行的ID，不存在时返回None
+    """
+    results_dir = Config.RESULTS_DIR
+    if os.path.exists(results_dir):
+        with metrics.timer("report_scan_duration_seconds", {"operation": "previous_run"}):
+            subdirs = [d for d in os.listdir(results_dir) if os.path.isdir(os.path.join(results_dir, d))]
+            ordered = sorted(subdirs, key=lambda x: os.path.getmtime(os.path.join(results_dir, x)))
+        if run_id in ordered:
+            index = ordered.index(run_id)
+            return ordered[index - 1] if index > 0 else None
+    
+    for entry in analysis_store.list_analyses(limit=1000):
+        if entry["run_id"] != run_id:
+            return entry["run_id"]
+    return None
+
+def build_delta_response(record: dict, cached: bool, baseline_run_id: Optional[str],
+                         delta: dict, reused_baseline: bool) -> DeltaAIAnalysisResponse:
+    """根据分析记录构建增量分析响应"""
+    return DeltaAIAnalysisResponse(
+        success=True,
+        first_part=record["first_part"],
+        second_part=record["second_part"],
+        third_part=record["third_part"],
+        summary=record["summary"],
+        failure_clusters=record.get("failure_clusters", []),
+        run_id=record["run_id"],
+        analysis_id=record["analysis_id"],
+        cached=cached,
+        baseline_run_id=baseline_run_id,
+        delta=delta,
+        reused_baseline=reused_baseline
+    )
 
 def parse_ai_analysis_result(analysis_text: str) -> dict:
     """
@@ -614,6 +1810,12 @@ def parse_ai_analysis_result(analysis_text: str) -> dict:
     return result
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        # 只创建数据目录、初始化数据库并迁移旧版数据，不启动服务
+        init_services()
+        print(f"数据目录 {Config.DATA_DIR} 初始化完成")
+        sys.exit(0)
+    
     import uvicorn
     
     # 从配置文件中获取主机和端口信息
@@ -622,4 +1824,5 @@ if __name__ == "__main__":
         host=Config.HOST,
         port=Config.PORT,
         reload=False,
+        workers=Config.WORKERS,
     )
\ No newline at end of file
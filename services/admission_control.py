@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+准入控制模块
+按优先级类别（交互、分析、批量）分别限制并发数和排队长度，批量请求不会占满大模型和CPU资源；
+排队已满或等待超时的请求立即拒绝并给出建议的重试间隔
+"""
+import json
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Callable, Optional
+
+from services.tracing import tracer
+
+# 默认优先级类别，priority越小越优先获得总并发名额
+DEFAULT_ADMISSION_CLASSES: Dict[str, Dict[str, Any]] = {
+    "interactive": {"priority": 0, "max_concurrency": 8, "max_queue": 32, "queue_timeout": 30},
+    "analysis": {"priority": 1, "max_concurrency": 4, "max_queue": 16, "queue_timeout": 60},
+    "batch": {"priority": 2, "max_concurrency": 2, "max_queue": 4, "queue_timeout": 120}
+}
+
+
+class AdmissionRejected(Exception):
+    """请求未被准入"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """按优先级类别的准入控制，只在当前worker内生效"""
+
+    def __init__(self, classes: Optional[Dict[str, Dict[str, Any]]] = None,
+                 total_concurrency: Optional[int] = None):
+        """
+        初始化准入控制
+
+        Args:
+            classes: 类别名到配置的映射，配置包括priority、max_concurrency、max_queue和queue_timeout（秒）
+            total_concurrency: 所有类别合计的最大并发数，名额空出时按优先级分配，为空时只按类别限制
+        """
+        self.classes = classes if classes is not None else DEFAULT_ADMISSION_CLASSES
+        self.total_concurrency = total_concurrency
+        self._order = sorted(self.classes, key=lambda name: self.classes[name].get("priority", 0))
+        self._running = {name: 0 for name in self.classes}
+        self._waiters: Dict[str, deque] = {name: deque() for name in self.classes}
+        self._service_time = {name: None for name in self.classes}  # 处理耗时的指数加权平均（秒）
+        self._stats = {name: {"admitted": 0, "rejected": 0, "timed_out": 0, "wait_seconds_sum": 0.0,
+                              "wait_seconds_max": 0.0} for name in self.classes}
+        self._stats_lock = threading.Lock()
+
+    @asynccontextmanager
+    async def admit(self, name: str) -> AsyncIterator[None]:
+        """
+        在准入名额内执行
+
+        Args:
+            name: 优先级类别
+
+        Raises:
+            AdmissionRejected: 排队已满或等待超时
+        """
+        await self.acquire(name)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(name, time.monotonic() - started)
+
+    async def acquire(self, name: str) -> None:
+        """
+        获取准入名额，名额不足时排队等待
+
+        Args:
+            name: 优先级类别
+
+        Raises:
+            AdmissionRejected: 排队已满或等待超时
+        """
+        config = self.classes[name]
+        if self._queue_depth(name) >= config.get("max_queue", 0) and not self._can_run(name):
+            self._count(name, "rejected")
+            raise AdmissionRejected(f"{name}类请求排队已满，请稍后重试", self.retry_after(name))
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[name].append(future)
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await asyncio.wait_for(future, timeout=config.get("queue_timeout"))
+        except asyncio.TimeoutError:
+            self._count(name, "timed_out")
+            raise AdmissionRejected(f"{name}类请求排队超时，请稍后重试", self.retry_after(name))
+        except asyncio.CancelledError:
+            # 名额已分配但请求被取消时归还名额
+            if future.done() and not future.cancelled():
+                self.release(name)
+            raise
+        waited = time.monotonic() - started
+        with self._stats_lock:
+            stats = self._stats[name]
+            stats["admitted"] += 1
+            stats["wait_seconds_sum"] += waited
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+
+    def release(self, name: str, duration: Optional[float] = None) -> None:
+        """
+        归还准入名额，并将名额分配给排队中优先级最高的请求
+
+        Args:
+            name: 优先级类别
+            duration: 请求处理耗时（秒），用于估算重试间隔
+        """
+        self._running[name] -= 1
+        if duration is not None:
+            previous = self._service_time[name]
+            self._service_time[name] = duration if previous is None else previous * 0.8 + duration * 0.2
+        self._dispatch()
+
+    def retry_after(self, name: str) -> int:
+        """按排队长度和平均处理耗时估算建议的重试间隔（秒）"""
+        config = self.classes[name]
+        service_time = self._service_time[name] or 1.0
+        rounds = (self._queue_depth(name) + 1) / max(config.get("max_concurrency", 1), 1)
+        return max(1, min(math.ceil(service_time * rounds), int(config.get("queue_timeout") or 60)))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各类别的准入统计
+
+        Returns:
+            Dict[str, Dict[str, Any]]: running为执行中的请求数，queued为排队中的请求数，admitted、rejected、
+            timed_out为累计准入、拒绝及排队超时次数，wait_seconds_sum和wait_seconds_max为排队耗时
+        """
+        with self._stats_lock:
+            stats = {name: dict(counts) for name, counts in self._stats.items()}
+        for name, counts in stats.items():
+            counts.update(
+                running=self._running[name],
+                queued=self._queue_depth(name),
+                max_concurrency=self.classes[name].get("max_concurrency"),
+                max_queue=self.classes[name].get("max_queue")
+            )
+        return stats
+
+    def _queue_depth(self, name: str) -> int:
+        """获取类别中仍在排队的请求数，已分配名额、超时或取消的请求不计入"""
+        return sum(1 for future in self._waiters[name] if not future.done())
+
+    def _can_run(self, name: str) -> bool:
+        """判断类别是否还有并发名额"""
+        if self._running[name] >= self.classes[name].get("max_concurrency", 1):
+            return False
+        return self.total_concurrency is None or sum(self._running.values()) < self.total_concurrency
+
+    def _dispatch(self) -> None:
+        """按优先级将空闲名额分配给排队中的请求"""
+        for name in self._order:
+            waiters = self._waiters[name]
+            while waiters and self._can_run(name):
+                future = waiters.popleft()
+                if future.done():
+                    continue
+                self._running[name] += 1
+                future.set_result(None)
+
+    def _count(self, name: str, key: str) -> None:
+        """累加类别统计"""
+        with self._stats_lock:
+            self._stats[name][key] += 1
+
+
+class AdmissionMiddleware:
+    """按接口优先级类别准入请求的ASGI中间件，响应（包括流式响应）发送完毕后才归还名额"""
+
+    def __init__(self, app, controller: AdmissionController, classify: Callable[[str, str], Optional[str]]):
+        """
+        初始化准入中间件
+
+        Args:
+            app: 下游ASGI应用
+            controller: 准入控制
+            classify: 根据请求方法和路径返回优先级类别的函数，返回None时不做准入控制
+        """
+        self.app = app
+        self.controller = controller
+        self.classify = classify
+
+    async def __call__(self, scope, receive, send):
+        name = self.classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            with tracer.span("admission.wait", priority_class=name):
+                await self.controller.acquire(name)
+        except AdmissionRejected as e:
+            # 排队已满或等待超时时立即返回429
+            body = json.dumps({"success": False, "error": str(e)}, ensure_ascii=False).encode('utf-8')
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(e.retry_after).encode())
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name, time.monotonic() - started)
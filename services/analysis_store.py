@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI分析结果存储模块
+按运行ID及分析内容、提示词版本的哈希存储分析结果，
+相同报告再次分析时直接返回已存储的结果，并按保留策略清理历史
+"""
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from typing import Dict, List, Any, Optional
+
+from services.process_lock import ProcessLock
+
+
+class AnalysisStore:
+    """AI分析结果存储"""
+
+    def __init__(self, base_dir: str = "analysis_store", max_runs: int = 200, max_per_run: int = 10):
+        """
+        初始化分析结果存储
+
+        Args:
+            base_dir: 存储根目录
+            max_runs: 最多保留的运行数量，超出时删除最早的运行
+            max_per_run: 每个运行最多保留的分析数量
+        """
+        self.base_dir = base_dir
+        self.max_runs = max_runs
+        self.max_per_run = max_per_run
+        # 多个worker共享存储目录，写入及保留策略清理需要跨进程互斥
+        self._lock = ProcessLock(os.path.join(base_dir, ".lock"))
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    @staticmethod
+    def run_id_from_report_path(report_path: str) -> str:
+        """
+        根据报告路径推导运行ID
+
+        hrp报告位于results/<时间戳>/report.html，取报告所在目录名作为运行ID
+
+        Args:
+            report_path: 测试报告路径
+
+        Returns:
+            str: 运行ID，无法推导时返回adhoc
+        """
+        if not report_path:
+            return "adhoc"
+        run_dir = os.path.basename(os.path.dirname(os.path.normpath(report_path)))
+        return AnalysisStore._safe_name(run_dir) or "adhoc"
+
+    @staticmethod
+    def compute_key(run_id: str, content: str, prompt_version: str) -> str:
+        """
+        计算分析结果的内容哈希键
+
+        Args:
+            run_id: 运行ID
+            content: 用于分析的报告内容
+            prompt_version: 提示词版本
+
+        Returns:
+            str: 内容哈希键
+        """
+        digest = hashlib.sha256()
+        for part in (run_id, prompt_version, content):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()[:24]
+
+    def get(self, run_id: str, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取已存储的分析结果
+
+        Args:
+            run_id: 运行ID
+            analysis_id: 分析结果ID（内容哈希键）
+
+        Returns:
+            Optional[Dict[str, Any]]: 分析记录，不存在时返回None
+        """
+        path = self._entry_path(run_id, analysis_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def save(self, run_id: str, analysis_id: str, prompt_version: str,
+             analysis: str, parsed_result: Dict[str, str], **extra: Any) -> Dict[str, Any]:
+        """
+        保存分析结果并执行保留策略
+
+        Args:
+            run_id: 运行ID
+            analysis_id: 分析结果ID（内容哈希键）
+            prompt_version: 提示词版本
+            analysis: 大模型返回的原始分析文本
+            parsed_result: 解析后的四部分结果
+            **extra: 需要一并保存的附加数据
+
+        Returns:
+            Dict[str, Any]: 保存的分析记录
+        """
+        record = {
+            "analysis_id": analysis_id,
+            "run_id": self._safe_name(run_id) or "adhoc",
+            "prompt_version": prompt_version,
+            "created_at": time.time(),
+            "analysis": analysis,
+            "first_part": parsed_result.get("first_part", ""),
+            "second_part": parsed_result.get("second_part", ""),
+            "third_part": parsed_result.get("third_part", ""),
+            "summary": parsed_result.get("summary", ""),
+        }
+        record.update(extra)
+
+        path = self._entry_path(run_id, analysis_id)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._atomic_write(path, record)
+            self._apply_retention(os.path.dirname(path))
+        return record
+
+    def list_analyses(self, run_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        列出分析记录摘要，按创建时间降序排列
+
+        Args:
+            run_id: 只列出指定运行的分析，为空时列出所有运行
+            limit: 最多返回的数量
+
+        Returns:
+            List[Dict[str, Any]]: 分析记录摘要列表
+        """
+        run_ids = [self._safe_name(run_id)] if run_id else self._list_runs()
+        entries = []
+        for rid in run_ids:
+            run_dir = os.path.join(self.base_dir, rid)
+            for path in self._list_entry_files(run_dir):
+                entries.append({
+                    "run_id": rid,
+                    "analysis_id": os.path.splitext(os.path.basename(path))[0],
+                    "created_at": os.path.getmtime(path)
+                })
+        entries.sort(key=lambda e: e["created_at"], reverse=True)
+        return entries[:limit]
+
+    def latest(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取指定运行最新的分析结果
+
+        Args:
+            run_id: 运行ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 分析记录，不存在时返回None
+        """
+        entries = self.list_analyses(run_id=run_id, limit=1)
+        if not entries:
+            return None
+        return self.get(run_id, entries[0]["analysis_id"])
+
+    @staticmethod
+    def render_markdown(record: Dict[str, Any]) -> str:
+        """
+        将分析记录渲染为Markdown报告
+
+        Args:
+            record: 分析记录
+
+        Returns:
+            str: Markdown格式的分析报告
+        """
+        return f"""# AI测试分析报告
+
+## 第一部分：测试案例分析
+
+{record.get('first_part', '').replace('：测试案例分析', '').replace(':测试案例分析', '').lstrip()}
+
+## 第二部分：测试结果分析
+
+{record.get('second_part', '').replace('：测试结果分析', '').replace(':测试结果分析', '').lstrip()}
+
+## 第三部分：指导建议
+
+{record.get('third_part', '').replace('：指导建议', '').replace(':指导建议', '').lstrip()}
+
+## 总结
+
+{record.get('summary', '').replace('：总结', '').replace(':总结', '').lstrip()}
+"""
+
+    def _entry_path(self, run_id: str, analysis_id: str) -> str:
+        """获取分析记录文件路径"""
+        return os.path.join(self.base_dir, self._safe_name(run_id) or "adhoc",
+                            f"{self._safe_name(analysis_id)}.json")
+
+    def _list_runs(self) -> List[str]:
+        """列出所有运行目录名"""
+        if not os.path.exists(self.base_dir):
+            return []
+        return [d for d in os.listdir(self.base_dir) if os.path.isdir(os.path.join(self.base_dir, d))]
+
+    @staticmethod
+    def _list_entry_files(run_dir: str) -> List[str]:
+        """列出运行目录下的分析记录文件"""
+        if not os.path.isdir(run_dir):
+            return []
+        return [os.path.join(run_dir, name) for name in os.listdir(run_dir) if name.endswith('.json')]
+
+    def _apply_retention(self, run_dir: str) -> None:
+        """执行保留策略：限制每个运行的分析数量及运行总数"""
+        files = sorted(self._list_entry_files(run_dir), key=os.path.getmtime, reverse=True)
+        for path in files[self.max_per_run:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        runs = sorted(
+            (os.path.join(self.base_dir, d) for d in self._list_runs()),
+            key=os.path.getmtime,
+            reverse=True
+        )
+        for path in runs[self.max_runs:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _atomic_write(path: str, data: Dict[str, Any]) -> None:
+        """先写临时文件再替换，避免并发读到不完整的文件"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _safe_name(name: str) -> str:
+        """将名称转换为安全的文件名"""
+        return re.sub(r'[^\w.\-]+', '_', name or "").strip('._')
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI分析结果增量解析模块
+在大模型流式输出的过程中识别"第一部分/第二部分/第三部分/总结"标识，
+每个部分一结束就立即产出，无需等待完整回答
+"""
+from typing import Dict, List, Optional, Tuple
+
+
+# 分割标识及其对应的结果字段
+SECTION_MARKERS: List[Tuple[str, str]] = [
+    ("第一部分", "first_part"),
+    ("第二部分", "second_part"),
+    ("第三部分", "third_part"),
+    ("总结", "summary"),
+]
+
+
+class IncrementalSectionParser:
+    """
+    增量分段解析器
+
+    与parse_ai_analysis_result的切分规则一致：每个标识取首次出现的位置，
+    标识之前的内容丢弃，各部分内容去掉标识本身并去除首尾空白
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._scan_pos = 0
+        self._current: Optional[Tuple[str, int]] = None  # (字段名, 内容起始位置)
+        self._pending = dict(SECTION_MARKERS)
+        self._max_marker_len = max(len(marker) for marker, _ in SECTION_MARKERS)
+        self.result: Dict[str, str] = {key: "" for _, key in SECTION_MARKERS}
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """
+        输入一段新的流式文本
+
+        Args:
+            text: 新增的文本片段
+
+        Returns:
+            List[Tuple[str, str]]: 本次输入后完成的部分列表 (字段名, 内容)
+        """
+        if not text:
+            return []
+        self._buffer += text
+        completed = []
+
+        while self._pending:
+            found = self._find_next_marker()
+            if found is None:
+                break
+            marker, pos = found
+            if self._current is not None:
+                completed.append(self._finish_current(pos))
+            self._current = (self._pending.pop(marker), pos + len(marker))
+            self._scan_pos = pos + len(marker)
+
+        # 标识可能被拆分在两次输入之间，保留末尾不足一个标识长度的内容待下次扫描
+        self._scan_pos = max(self._scan_pos, len(self._buffer) - self._max_marker_len + 1)
+        return completed
+
+    def close(self) -> List[Tuple[str, str]]:
+        """
+        结束输入，产出最后一个未完成的部分
+
+        Returns:
+            List[Tuple[str, str]]: 最后完成的部分列表 (字段名, 内容)
+        """
+        if self._current is None:
+            return []
+        completed = [self._finish_current(len(self._buffer))]
+        self._current = None
+        return completed
+
+    def _find_next_marker(self) -> Optional[Tuple[str, int]]:
+        """从扫描位置开始查找最早出现的未使用标识"""
+        earliest = None
+        for marker in self._pending:
+            pos = self._buffer.find(marker, self._scan_pos)
+            if pos != -1 and (earliest is None or pos < earliest[1]):
+                earliest = (marker, pos)
+        return earliest
+
+    def _finish_current(self, end_pos: int) -> Tuple[str, str]:
+        """结束当前部分并记录其内容"""
+        key, start_pos = self._current
+        content = self._buffer[start_pos:end_pos].strip()
+        self.result[key] = content
+        return key, content
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成产物复用索引模块
+对历史测试要点建立持久化的MinHash/LSH索引，新要点与历史要点归一化后相同，
+或启用模糊复用且足够相似时，直接复用（数字取值不同时替换后复用）已生成的测试数据或测试用例，无需调用大模型
+"""
+import os
+import re
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterator
+
+import numpy as np
+
+from services.test_point_dedup import TestPointDeduplicator
+from services.test_point_separator import normalize_point_content
+
+
+class ArtefactReuseIndex:
+    """
+    生成产物复用索引
+
+    索引数据保存在SQLite中，LSH分桶在首次查询时从数据库载入内存，
+    之后每次查询只增量载入其他进程新写入的记录
+    """
+
+    def __init__(self, db_path: str = "file_store/artefact_reuse_index.db", threshold: float = 0.9,
+                 deduplicator: Optional[TestPointDeduplicator] = None, fuzzy: bool = False):
+        """
+        初始化复用索引
+
+        Args:
+            db_path: SQLite数据库文件路径
+            threshold: 模糊复用历史产物的最小相似度
+            deduplicator: 用于计算shingle和MinHash签名的去重器，默认每个LSH分段8行，
+                只召回高相似度的候选，避免大索引中候选集过大
+            fuzzy: 查询时的默认匹配方式，为False时只复用归一化后内容相同的历史要点的产物
+        """
+        self.db_path = db_path
+        self.threshold = threshold
+        self.fuzzy = fuzzy
+        self.deduplicator = deduplicator or TestPointDeduplicator(bands=8)
+        self._lock = threading.Lock()
+        self._loaded_rowid = 0
+        self._rowids: List[int] = []  # 签名矩阵行号 -> 数据库rowid
+        self._numbers: List[List[str]] = []  # 签名矩阵行号 -> 数字列表
+        self._guards: List[List[str]] = []  # 签名矩阵行号 -> 否定词、HTTP方法和接口路径列表
+        self._signatures = np.empty((0, self.deduplicator.num_perm), dtype=np.uint64)
+        self._buckets: Dict[tuple, List[int]] = {}  # 分桶键 -> 签名矩阵行号列表
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """创建数据库连接，每次操作使用独立连接以支持多线程"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        """创建数据表"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS reuse_index (
+                    point_id TEXT NOT NULL,
+                    artefact_type TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    artefact TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    UNIQUE (point_id, artefact_type, prompt_version)
+                )
+                """
+            )
+
+    def add(self, point_id: str, artefact_type: str, prompt_version: str,
+            content: str, artefact: str) -> None:
+        """
+        将测试要点及其生成产物加入索引
+
+        Args:
+            point_id: 测试要点ID
+            artefact_type: 产物类型，如test_data、test_cases
+            prompt_version: 生成时使用的提示词版本
+            content: 测试要点内容
+            artefact: 生成产物
+        """
+        self.add_many([(point_id, artefact_type, prompt_version, content, artefact)])
+
+    def add_many(self, entries: List[tuple]) -> None:
+        """
+        批量将测试要点及其生成产物加入索引，在同一个事务中写入
+
+        Args:
+            entries: (point_id, artefact_type, prompt_version, content, artefact) 元组列表
+        """
+        now = time.time()
+        rows = [
+            (point_id, artefact_type, prompt_version, content, artefact,
+             self.deduplicator.signature(content).tobytes(), now)
+            for point_id, artefact_type, prompt_version, content, artefact in entries
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO reuse_index "
+                "(point_id, artefact_type, prompt_version, content, artefact, signature, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def lookup(self, content: str, artefact_type: str, prompt_version: str,
+               fuzzy: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """
+        查找与测试要点内容相同或足够相似的历史产物
+
+        模糊匹配时相似度按MinHash签名估计，否定词、HTTP方法或接口路径不同的历史要点不复用；
+        历史要点与新要点的数字取值不同但数量一致时，
+        只替换产物中与要点上下文（数字前后的单位或词语）一致的取值，无法确定所有取值位置时不复用
+
+        Args:
+            content: 新测试要点内容
+            artefact_type: 产物类型
+            prompt_version: 提示词版本，只复用相同提示词生成的产物
+            fuzzy: 是否复用相似而非相同的历史要点的产物，默认使用初始化时的设置
+
+        Returns:
+            Optional[Dict[str, Any]]: 包含artefact、similarity、source_point_id、source_content
+            和adapted的字典，没有足够相似的历史产物时返回None
+        """
+        self._refresh()
+        fuzzy = self.fuzzy if fuzzy is None else fuzzy
+        threshold = self.threshold if fuzzy else 1.0
+        normalized = normalize_point_content(content)
+        group = (artefact_type, prompt_version)
+        signature = self.deduplicator.signature(content)
+        numbers = self.deduplicator.extract_numbers(content)
+        guards = self.deduplicator.extract_guard_tokens(content)
+
+        candidates = set()
+        for key in self._band_keys(group, signature):
+            candidates.update(self._buckets.get(key, ()))
+        if not candidates:
+            return None
+
+        # 向量化计算候选签名与查询签名的一致比例
+        positions = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarities = np.mean(self._signatures[positions] == signature, axis=1)
+        order = np.argsort(-similarities)
+
+        for i in order:
+            similarity = float(similarities[i])
+            if similarity < threshold:
+                break
+            position = int(positions[i])
+            stored_numbers = self._numbers[position]
+            if len(stored_numbers) != len(numbers) or self._guards[position] != guards:
+                continue
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT point_id, content, artefact FROM reuse_index WHERE rowid = ?",
+                    (self._rowids[position],)
+                ).fetchone()
+            if row is None or (not fuzzy and normalize_point_content(row["content"]) != normalized):
+                continue
+            artefact = row["artefact"]
+            adapted = stored_numbers != numbers
+            if adapted:
+                artefact = self._substitute_numbers(artefact, row["content"], stored_numbers, numbers)
+                if artefact is None:
+                    continue
+            return {
+                "artefact": artefact,
+                "similarity": round(similarity, 4),
+                "source_point_id": row["point_id"],
+                "source_content": row["content"],
+                "adapted": adapted
+            }
+        return None
+
+    def size(self) -> int:
+        """获取索引中的记录数量"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM reuse_index").fetchone()[0]
+
+    def _refresh(self) -> None:
+        """增量载入自上次载入后新写入的索引记录"""
+        with self._lock:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT rowid, artefact_type, prompt_version, content, signature FROM reuse_index "
+                    "WHERE rowid > ? ORDER BY rowid",
+                    (self._loaded_rowid,)
+                ).fetchall()
+            if not rows:
+                return
+            offset = len(self._signatures)
+            signatures = np.frombuffer(b''.join(row["signature"] for row in rows), dtype=np.uint64)
+            self._signatures = np.concatenate([
+                self._signatures, signatures.reshape(len(rows), self.deduplicator.num_perm)
+            ])
+            for position, row in enumerate(rows, offset):
+                group = (row["artefact_type"], row["prompt_version"])
+                signature = self._signatures[position]
+                self._rowids.append(row["rowid"])
+                self._numbers.append(self.deduplicator.extract_numbers(row["content"]))
+                self._guards.append(self.deduplicator.extract_guard_tokens(row["content"]))
+                for key in self._band_keys(group, signature):
+                    self._buckets.setdefault(key, []).append(position)
+                self._loaded_rowid = row["rowid"]
+
+    def _band_keys(self, group: tuple, signature: np.ndarray) -> List[tuple]:
+        """计算签名在各LSH分段上的分桶键"""
+        rows = self.deduplicator.rows
+        return [
+            (group, band, hash(signature[band * rows:(band + 1) * rows].tobytes()))
+            for band in range(self.deduplicator.bands)
+        ]
+
+    @staticmethod
+    def _substitute_numbers(artefact: str, source_content: str, old_numbers: List[str],
+                            new_numbers: List[str]) -> Optional[str]:
+        """
+        将产物中与历史要点对应的旧数字取值替换为新取值
+
+        只替换与历史要点中上下文一致的位置，例如要点“借款1个月”只替换产物中的“1个月”，
+        不会改动接口路径、步骤编号、断言等位置上碰巧相同的数字；
+        同一个旧取值对应多个新取值、产物中找不到与要点对应的位置、
+        或替换后仍有独立的旧取值（如变量、请求字段、断言中的值，无法判断是否与要点对应）时返回None
+
+        Args:
+            artefact: 历史产物
+            source_content: 历史要点内容
+            old_numbers: 历史要点中的数字
+            new_numbers: 新要点中的数字
+
+        Returns:
+            Optional[str]: 替换后的产物，无法可靠替换时返回None
+        """
+        mapping: Dict[str, str] = {}
+        for old, new in zip(old_numbers, new_numbers):
+            if mapping.setdefault(old, new) != new:
+                return None
+        mapping = {old: new for old, new in mapping.items() if old != new}
+        source = normalize_point_content(source_content)
+
+        for old, new in mapping.items():
+            patterns = _number_context_patterns(source, old)
+            if not patterns:
+                return None
+            replaced = 0
+            for pattern in patterns:
+                artefact, count = pattern.subn(lambda match: match.group(1) + new + match.group(2), artefact)
+                replaced += count
+            if not replaced:
+                return None
+            if re.search(_STANDALONE_VALUE_TEMPLATE.format(number=re.escape(old)), artefact, re.MULTILINE):
+                return None
+        return artefact
+
+
+# 数字前后作为上下文的字符：中文、字母及常见单位符号，最多取两个
+_CONTEXT_CHARS = r'[^\W\d_%]{1,2}|%'
+# YAML或文本中单独作为取值出现的数字，如“term: 1”“- 1”“[body.code, 1]”
+_STANDALONE_VALUE_TEMPLATE = r'(?:^|[:\[,=]|^\s*-)\s*["\']?(?<![\d.]){number}(?![\d.]*\d)["\']?\s*(?:$|[,\]}}#])'
+
+
+def _number_context_patterns(source: str, number: str) -> List["re.Pattern"]:
+    """
+    根据历史要点中数字前后的单位或词语构建在产物中定位该数字的正则
+
+    Args:
+        source: 归一化后的历史要点内容
+        number: 数字取值
+
+    Returns:
+        List[re.Pattern]: 每个正则的分组1为前缀、分组2为后缀，要点中该数字前后都没有上下文时为空列表
+    """
+    escaped = re.escape(number)
+    patterns = []
+    for match in re.finditer(rf'(?<![\d.]){escaped}(?![\d.]*\d)', source):
+        suffix = re.match(rf'\s?({_CONTEXT_CHARS})', source[match.end():])
+        prefix = re.search(rf'({_CONTEXT_CHARS})\s?$', source[:match.start()])
+        if suffix:
+            patterns.append(re.compile(
+                rf'()(?<![\d.]){escaped}(\s?{re.escape(suffix.group(1))})', re.IGNORECASE))
+        elif prefix:
+            patterns.append(re.compile(
+                rf'({re.escape(prefix.group(1))}\s?){escaped}()(?![\d.]*\d)', re.IGNORECASE))
+    return patterns
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量生成输出拆分模块
+将多个测试要点打包为一次大模型请求的输入，并把带分隔行的响应拆分回各要点的产物，
+缺失或格式错误的要点可单独重新请求
+"""
+import re
+from typing import Callable, Dict, List, Tuple
+
+from services.token_budget import estimate_tokens
+
+
+# 分隔行，允许大模型在等号数量、空格和大小写上有细微偏差
+_SECTION_PATTERN = re.compile(
+    r'^[ \t]*=+[ \t]*TEST_POINT[ \t]+(?P<key>P\d+)[ \t]+BEGIN[ \t]*=+[ \t]*$'
+    r'(?P<body>.*?)'
+    r'^[ \t]*=+[ \t]*TEST_POINT[ \t]+(?P=key)[ \t]+END[ \t]*=+[ \t]*$',
+    re.S | re.M | re.I
+)
+_FENCE_PATTERN = re.compile(r'^\s*```[\w-]*\s*\n|\n\s*```\s*$')
+
+
+def point_key(index: int) -> str:
+    """获取批次内第index个测试要点（从1开始）的编号"""
+    return f"P{index}"
+
+
+def format_batch_points(points: List[str]) -> str:
+    """
+    将一批测试要点格式化为带编号的输入文本
+
+    Args:
+        points: 测试要点内容列表
+
+    Returns:
+        str: 每行一个 [编号] 内容 的文本
+    """
+    return '\n'.join(f"[{point_key(i)}] {point}" for i, point in enumerate(points, 1))
+
+
+def strip_code_fence(text: str) -> str:
+    """
+    去掉大模型输出首尾的Markdown代码块标记，批量和单要点生成的产物统一按此处理
+
+    Args:
+        text: 大模型输出的产物
+
+    Returns:
+        str: 去掉代码块标记及首尾空行后的产物
+    """
+    return _FENCE_PATTERN.sub('', (text or "").strip('\n')).strip('\n')
+
+
+def is_valid_script(section: str) -> bool:
+    """判断拆分出的内容是否为完整的HttpRunner YAML测试用例"""
+    return bool(re.search(r'^config\s*:', section, re.M)) and bool(re.search(r'^teststeps\s*:', section, re.M))
+
+
+def split_batch_response(response: str, point_count: int,
+                         validator: Callable[[str], bool] = is_valid_script) -> Dict[int, str]:
+    """
+    按分隔行拆分批量生成的响应
+
+    Args:
+        response: 大模型响应文本
+        point_count: 本批次的测试要点数量
+        validator: 校验拆分出的内容是否完整，默认校验HttpRunner YAML测试用例
+
+    Returns:
+        Dict[int, str]: 要点序号（从1开始）到产物的映射，缺失或格式错误的要点不包含在内
+    """
+    sections = {}
+    for match in _SECTION_PATTERN.finditer(response or ""):
+        index = int(match.group('key')[1:])
+        if not 1 <= index <= point_count or index in sections:
+            continue
+        body = strip_code_fence(match.group('body'))
+        if validator(body):
+            sections[index] = body
+    return sections
+
+
+def pack_points(points: List[str], template_tokens: int, token_budget: int,
+                output_tokens_per_point: int, max_points: int) -> List[List[int]]:
+    """
+    按上下文预算将测试要点打包为若干批次
+
+    每个批次的提示词模板、要点内容和预计输出之和不超过预算，且要点数不超过max_points
+
+    Args:
+        points: 测试要点内容列表
+        template_tokens: 提示词模板的token数
+        token_budget: 单次请求的上下文token预算
+        output_tokens_per_point: 每个要点预计输出的token数
+        max_points: 每个批次最多包含的要点数
+
+    Returns:
+        List[List[int]]: 每个批次包含的要点下标
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = template_tokens
+    for i, point in enumerate(points):
+        cost = estimate_tokens(point) + output_tokens_per_point + 8
+        if current and (used + cost > token_budget or len(current) >= max_points):
+            batches.append(current)
+            current, used = [], template_tokens
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def missing_points(batch: List[int], sections: Dict[int, str]) -> List[int]:
+    """获取批次中未成功拆分出产物的要点下标"""
+    return [point for position, point in enumerate(batch, 1) if position not in sections]
+
+
+def merge_batch_results(batches: List[Tuple[List[int], Dict[int, str]]]) -> Dict[int, str]:
+    """将各批次按批内序号拆分的产物合并为要点下标到产物的映射"""
+    results = {}
+    for batch, sections in batches:
+        for position, section in sections.items():
+            results[batch[position - 1]] = section
+    return results
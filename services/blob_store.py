@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址存储模块
+按内容的sha256存储生成的YAML、脚本、报告等文件，相同内容只保存一份并压缩存储；
+安装zstandard时使用zstd压缩，否则使用gzip
+"""
+import os
+import gzip
+import hashlib
+import tempfile
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 压缩格式对应的文件后缀
+CODEC_SUFFIXES = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+
+
+class BlobStore:
+    """内容寻址存储"""
+
+    def __init__(self, base_dir: str = "file_store/blobs", codec: Optional[str] = None,
+                 compression_level: Optional[int] = None):
+        """
+        初始化内容寻址存储
+
+        Args:
+            base_dir: 存储根目录，内容按摘要前4位分两级目录存放
+            codec: 压缩格式，zstd、gzip或none，默认安装zstandard时使用zstd，否则使用gzip
+            compression_level: 压缩级别，默认zstd为10、gzip为6
+        """
+        if codec is None:
+            codec = "zstd" if zstandard is not None else "gzip"
+        if codec not in CODEC_SUFFIXES:
+            raise ValueError(f"不支持的压缩格式: {codec}")
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("使用zstd压缩需要安装zstandard")
+        self.base_dir = base_dir
+        self.codec = codec
+        self.compression_level = compression_level or (10 if codec == "zstd" else 6)
+        os.makedirs(base_dir, exist_ok=True)
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        """计算内容摘要"""
+        return hashlib.sha256(data).hexdigest()
+
+    def put(self, data: bytes) -> Dict[str, Any]:
+        """
+        存储内容，内容已存在时不重复写入
+
+        Args:
+            data: 文件内容
+
+        Returns:
+            Dict[str, Any]: 包含digest、size、stored_size、codec和created（是否新写入）的字典
+        """
+        digest = self.digest(data)
+        existing = self._find(digest)
+        if existing:
+            path, codec = existing
+            return {"digest": digest, "size": len(data), "stored_size": os.path.getsize(path),
+                    "codec": codec, "created": False}
+
+        compressed = self._compress(data)
+        path = self._path(digest, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换，并发写入相同内容时结果一致
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return {"digest": digest, "size": len(data), "stored_size": len(compressed),
+                "codec": self.codec, "created": True}
+
+    def get(self, digest: str) -> bytes:
+        """
+        读取内容并校验摘要
+
+        Args:
+            digest: 内容摘要
+
+        Returns:
+            bytes: 解压后的内容
+        """
+        existing = self._find(digest)
+        if existing is None:
+            raise KeyError(f"内容不存在: {digest}")
+        path, codec = existing
+        with open(path, 'rb') as f:
+            data = self._decompress(f.read(), codec)
+        if self.digest(data) != digest:
+            raise ValueError(f"内容摘要校验失败: {digest}")
+        return data
+
+    def exists(self, digest: str) -> bool:
+        """判断内容是否存在"""
+        return self._find(digest) is not None
+
+    def delete(self, digest: str) -> int:
+        """
+        删除内容
+
+        Args:
+            digest: 内容摘要
+
+        Returns:
+            int: 释放的磁盘字节数，内容不存在时为0
+        """
+        existing = self._find(digest)
+        if existing is None:
+            return 0
+        path = existing[0]
+        size = os.path.getsize(path)
+        os.remove(path)
+        # 删除空的分级目录
+        for directory in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+        return size
+
+    def iter_blobs(self) -> Iterator[Tuple[str, float]]:
+        """遍历存储中的全部内容，产出 (摘要, 最后修改时间)"""
+        for root, _, files in os.walk(self.base_dir):
+            for name in files:
+                digest = name.split('.', 1)[0]
+                if len(digest) == 64 and not name.endswith(".tmp"):
+                    yield digest, os.path.getmtime(os.path.join(root, name))
+
+    def _find(self, digest: str) -> Optional[tuple]:
+        """查找内容文件，返回 (路径, 压缩格式)，兼容切换压缩格式前写入的内容"""
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise KeyError(f"内容摘要无效: {digest}")
+        for codec in (self.codec,) + tuple(c for c in CODEC_SUFFIXES if c != self.codec):
+            path = self._path(digest, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None
+
+    def _path(self, digest: str, codec: str) -> str:
+        """获取内容文件路径"""
+        return os.path.join(self.base_dir, digest[:2], digest[2:4], digest + CODEC_SUFFIXES[codec])
+
+    def _compress(self, data: bytes) -> bytes:
+        """按当前压缩格式压缩内容"""
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.compression_level).compress(data)
+        if self.codec == "gzip":
+            return gzip.compress(data, compresslevel=self.compression_level, mtime=0)
+        return data
+
+    @staticmethod
+    def _decompress(data: bytes, codec: str) -> bytes:
+        """按内容文件的压缩格式解压"""
+        if codec == "zstd":
+            if zstandard is None:
+                raise ValueError("读取zstd压缩的内容需要安装zstandard")
+            return zstandard.ZstdDecompressor().decompress(data)
+        if codec == "gzip":
+            return gzip.decompress(data)
+        return data
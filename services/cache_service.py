@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享缓存模块
+为大模型响应、报告提取、分析及执行结果等缓存提供统一的键格式、TTL、容量限制、防击穿和按命名空间统计；
+后端可选进程内LRU、本地SQLite或Redis协议服务，后两者可在多个worker之间共享
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, Optional, Tuple
+
+from services.process_lock import ProcessLock
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# 缓存键前缀，区分同一Redis中其他应用的数据
+KEY_PREFIX = "testassistant"
+
+
+def make_cache_key(namespace: str, *parts: Any) -> str:
+    """
+    生成缓存键
+
+    键格式为 命名空间:内容哈希，参数按JSON序列化后计算sha256，参数相同则键相同
+
+    Args:
+        namespace: 缓存命名空间，如llm、report、analysis、execution
+        *parts: 参与计算键的参数，必须可以JSON序列化
+
+    Returns:
+        str: 缓存键
+    """
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]}"
+
+
+class MemoryCacheBackend:
+    """进程内LRU缓存后端，只在当前worker内有效"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 256 * 1024 * 1024):
+        """
+        初始化进程内缓存
+
+        Args:
+            max_entries: 最多缓存的条目数
+            max_bytes: 缓存内容的最大总字节数
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, list] = {}  # 键 -> [锁, 引用数]
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存内容，不存在或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> int:
+        """
+        写入缓存内容
+
+        Returns:
+            int: 因超出容量被淘汰的条目数
+        """
+        if len(value) > self.max_bytes:
+            return 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            self._bytes += len(value)
+            evicted = 0
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+            return evicted
+
+    def delete(self, key: str) -> None:
+        """删除缓存内容"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        """清空缓存，指定命名空间时只清空该命名空间，返回删除的条目数"""
+        with self._lock:
+            keys = [key for key in self._entries if namespace is None or key.startswith(namespace + ":")]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def usage(self) -> Dict[str, Dict[str, int]]:
+        """按命名空间统计条目数及字节数"""
+        usage: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            for key, (value, _) in self._entries.items():
+                item = usage.setdefault(key.split(":", 1)[0], {"entries": 0, "bytes": 0})
+                item["entries"] += 1
+                item["bytes"] += len(value)
+        return usage
+
+    @contextmanager
+    def lock(self, key: str, timeout: float) -> Iterator[bool]:
+        """按键加锁，同一键同时只有一个线程计算，产出是否获得锁"""
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        acquired = entry[0].acquire(timeout=timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                entry[0].release()
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._key_locks.pop(key, None)
+
+    def _remove(self, key: str) -> None:
+        """删除条目并更新字节数，调用方需持有锁"""
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+
+class SQLiteCacheBackend:
+    """本地SQLite缓存后端，同一主机的多个worker共享"""
+
+    # 防击穿锁按键哈希分片到固定数量的锁文件，避免锁文件无限增长
+    LOCK_STRIPES = 256
+
+    def __init__(self, db_path: str = "file_store/cache.db", max_bytes: int = 1024 * 1024 * 1024,
+                 lock_dir: Optional[str] = None):
+        """
+        初始化SQLite缓存
+
+        Args:
+            db_path: SQLite数据库文件路径
+            max_bytes: 缓存内容的最大总字节数，超出时淘汰最久未访问的条目
+            lock_dir: 防击穿锁文件目录，默认为数据库所在目录下的cache_locks
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock_dir = lock_dir or os.path.join(directory, "cache_locks")
+        self._init_db()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """创建数据库连接，每次操作使用独立连接以支持多线程"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        """创建缓存表"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_namespace ON cache_entries (namespace)")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存内容，不存在或已过期时返回None"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row["expires_at"] is not None and row["expires_at"] <= now:
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+            return bytes(row["value"])
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> int:
+        """
+        写入缓存内容，写入后总大小超出上限时淘汰过期及最久未访问的条目
+
+        Returns:
+            int: 被淘汰的条目数
+        """
+        if len(value) > self.max_bytes:
+            return 0
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, namespace, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, key.split(":", 1)[0], sqlite3.Binary(value), len(value), now + ttl if ttl else None, now)
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            evicted = conn.execute(
+                "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+            ).rowcount
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+            rows = conn.execute(
+                "SELECT key, size FROM cache_entries WHERE key != ? ORDER BY accessed_at", (key,)
+            ).fetchall()
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (row["key"],))
+                total -= row["size"]
+                evicted += 1
+            return evicted
+
+    def delete(self, key: str) -> None:
+        """删除缓存内容"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        """清空缓存，指定命名空间时只清空该命名空间，返回删除的条目数"""
+        with self._connect() as conn:
+            if namespace is None:
+                return conn.execute("DELETE FROM cache_entries").rowcount
+            return conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,)).rowcount
+
+    def usage(self) -> Dict[str, Dict[str, int]]:
+        """按命名空间统计条目数及字节数"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT namespace, COUNT(*) AS entries, SUM(size) AS bytes FROM cache_entries GROUP BY namespace"
+            ).fetchall()
+        return {row["namespace"]: {"entries": row["entries"], "bytes": row["bytes"]} for row in rows}
+
+    @contextmanager
+    def lock(self, key: str, timeout: float) -> Iterator[bool]:
+        """按键加跨进程锁，同一键同时只有一个worker计算，产出是否获得锁"""
+        stripe = int(hashlib.sha256(key.encode('utf-8')).hexdigest()[:8], 16) % self.LOCK_STRIPES
+        lock = ProcessLock(os.path.join(self.lock_dir, f"{stripe:03d}.lock"))
+        acquired = lock.acquire(timeout=timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+
+
+class RedisCacheBackend:
+    """Redis协议缓存后端，可由Redis或任何兼容Redis协议的本地服务提供，多个主机之间共享"""
+
+    # 只删除自己持有的锁
+    _RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url: str = "redis://localhost:6379/0", poll_interval: float = 0.05):
+        """
+        初始化Redis缓存
+
+        容量限制由服务端的maxmemory及淘汰策略负责
+
+        Args:
+            url: Redis连接地址
+            poll_interval: 等待其他worker计算时的轮询间隔（秒）
+        """
+        if redis is None:
+            raise ValueError("使用Redis缓存需要安装redis")
+        self.client = redis.Redis.from_url(url)
+        self.poll_interval = poll_interval
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存内容，不存在或已过期时返回None"""
+        return self.client.get(f"{KEY_PREFIX}:{key}")
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> int:
+        """写入缓存内容，淘汰由服务端负责，返回0"""
+        self.client.set(f"{KEY_PREFIX}:{key}", value, px=int(ttl * 1000) if ttl else None)
+        return 0
+
+    def delete(self, key: str) -> None:
+        """删除缓存内容"""
+        self.client.delete(f"{KEY_PREFIX}:{key}")
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        """清空缓存，指定命名空间时只清空该命名空间，返回删除的条目数"""
+        pattern = f"{KEY_PREFIX}:{namespace}:*" if namespace else f"{KEY_PREFIX}:*"
+        deleted = 0
+        for key in self.client.scan_iter(match=pattern, count=500):
+            deleted += self.client.delete(key)
+        return deleted
+
+    def usage(self) -> Dict[str, Dict[str, int]]:
+        """按命名空间统计条目数，Redis中不统计字节数"""
+        usage: Dict[str, Dict[str, int]] = {}
+        for key in self.client.scan_iter(match=f"{KEY_PREFIX}:*", count=500):
+            parts = key.decode('utf-8').split(":")
+            if len(parts) >= 3 and parts[1] != "lock":
+                usage.setdefault(parts[1], {"entries": 0})["entries"] += 1
+        return usage
+
+    @contextmanager
+    def lock(self, key: str, timeout: float) -> Iterator[bool]:
+        """以SET NX实现的分布式锁，锁在timeout秒后自动过期，产出是否获得锁"""
+        lock_key = f"{KEY_PREFIX}:lock:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        acquired = False
+        while True:
+            acquired = bool(self.client.set(lock_key, token, nx=True, px=int(timeout * 1000)))
+            if acquired or time.monotonic() >= deadline or self.get(key) is not None:
+                break
+            time.sleep(self.poll_interval)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.client.eval(self._RELEASE_SCRIPT, 1, lock_key, token)
+
+
+def create_cache_backend(kind: str = "sqlite", db_path: str = "file_store/cache.db",
+                         redis_url: Optional[str] = None, max_entries: int = 10000,
+                         max_bytes: int = 256 * 1024 * 1024, lock_dir: Optional[str] = None):
+    """
+    按配置创建缓存后端
+
+    Args:
+        kind: memory、sqlite或redis
+        db_path: SQLite缓存数据库路径
+        redis_url: Redis连接地址
+        max_entries: 进程内缓存最多缓存的条目数
+        max_bytes: 进程内及SQLite缓存的最大总字节数
+        lock_dir: SQLite缓存防击穿锁文件目录
+
+    Returns:
+        缓存后端实例
+    """
+    if kind == "memory":
+        return MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
+    if kind == "sqlite":
+        return SQLiteCacheBackend(db_path, max_bytes=max_bytes, lock_dir=lock_dir)
+    if kind == "redis":
+        return RedisCacheBackend(redis_url or "redis://localhost:6379/0")
+    raise ValueError(f"不支持的缓存后端: {kind}")
+
+
+class CacheService:
+    """缓存服务，值按JSON序列化保存"""
+
+    def __init__(self, backend, default_ttl: Optional[float] = None,
+                 namespace_ttls: Optional[Dict[str, float]] = None, lock_timeout: float = 300):
+        """
+        初始化缓存服务
+
+        Args:
+            backend: 缓存后端
+            default_ttl: 默认过期秒数，为空时不过期
+            namespace_ttls: 命名空间到过期秒数的映射，覆盖默认值
+            lock_timeout: 等待其他请求计算同一个键的最长秒数，超时后自行计算
+        """
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.namespace_ttls = namespace_ttls or {}
+        self.lock_timeout = lock_timeout
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """
+        读取缓存
+
+        Args:
+            namespace: 缓存命名空间
+            key: make_cache_key生成的键，或命名空间内的任意字符串
+            default: 未命中时返回的值
+
+        Returns:
+            Any: 缓存的值
+        """
+        found, value = self._lookup(namespace, key)
+        return value if found else default
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        写入缓存
+
+        Args:
+            namespace: 缓存命名空间
+            key: 缓存键
+            value: 可以JSON序列化的值
+            ttl: 过期秒数，默认使用命名空间或全局配置
+        """
+        data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        evicted = self.backend.set(self._full_key(namespace, key), data, self._ttl(namespace, ttl))
+        self._count(namespace, "sets")
+        if evicted:
+            self._count(namespace, "evictions", evicted)
+
+    def delete(self, namespace: str, key: str) -> None:
+        """删除缓存"""
+        self.backend.delete(self._full_key(namespace, key))
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        """清空缓存，返回删除的条目数"""
+        return self.backend.clear(namespace)
+
+    def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Any],
+                       ttl: Optional[float] = None) -> Any:
+        """
+        读取缓存，未命中时计算并写入
+
+        同一个键同时只有一个请求（包括其他worker）调用compute，其余请求等待其结果，避免缓存击穿
+
+        Args:
+            namespace: 缓存命名空间
+            key: 缓存键
+            compute: 计算值的函数
+            ttl: 过期秒数
+
+        Returns:
+            Any: 缓存或计算得到的值
+        """
+        found, value = self._lookup(namespace, key)
+        if found:
+            return value
+        full_key = self._full_key(namespace, key)
+        with self.backend.lock(full_key, self.lock_timeout):
+            # 等待期间其他请求可能已完成计算
+            data = self.backend.get(full_key)
+            if data is not None:
+                self._count(namespace, "coalesced")
+                return json.loads(data)
+            started = time.perf_counter()
+            value = compute()
+            self._count(namespace, "computes")
+            self._count(namespace, "compute_ms", int((time.perf_counter() - started) * 1000))
+            self.set(namespace, key, value, ttl)
+            return value
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取按命名空间的缓存统计
+
+        Returns:
+            Dict[str, Any]: backend为后端类型，namespaces为各命名空间在当前进程中的命中、未命中、写入、淘汰、
+            合并等待及计算次数，以及后端中的条目数和字节数
+        """
+        with self._stats_lock:
+            namespaces = {namespace: dict(counts) for namespace, counts in self._stats.items()}
+        for namespace, usage in self.backend.usage().items():
+            namespaces.setdefault(namespace, {}).update(usage)
+        for counts in namespaces.values():
+            lookups = counts.get("hits", 0) + counts.get("misses", 0)
+            counts["hit_rate"] = round(counts.get("hits", 0) / lookups, 4) if lookups else None
+        return {"backend": type(self.backend).__name__, "pid": os.getpid(), "namespaces": namespaces}
+
+    def _lookup(self, namespace: str, key: str) -> Tuple[bool, Any]:
+        """读取缓存并记录命中统计"""
+        data = self.backend.get(self._full_key(namespace, key))
+        if data is None:
+            self._count(namespace, "misses")
+            return False, None
+        self._count(namespace, "hits")
+        return True, json.loads(data)
+
+    def _ttl(self, namespace: str, ttl: Optional[float]) -> Optional[float]:
+        """获取写入时使用的过期秒数"""
+        if ttl is not None:
+            return ttl
+        return self.namespace_ttls.get(namespace, self.default_ttl)
+
+    @staticmethod
+    def _full_key(namespace: str, key: str) -> str:
+        """键已包含命名空间前缀时直接使用，否则加上前缀"""
+        return key if key.startswith(namespace + ":") else f"{namespace}:{key}"
+
+    def _count(self, namespace: str, name: str, amount: int = 1) -> None:
+        """累加命名空间统计"""
+        with self._stats_lock:
+            counts = self._stats.setdefault(namespace, {})
+            counts[name] = counts.get(name, 0) + amount
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量分析服务
+将当前运行与基线运行逐用例对比，只把变化部分（新增失败、已修复、失败签名变化、耗时变化）
+交给大模型分析，未变化的结论直接复用基线运行的分析结果
+"""
+from typing import Dict, List, Any
+
+from services.failure_clustering_service import FailureClusteringService
+
+
+class DeltaAnalysisService:
+    """增量分析服务"""
+
+    def __init__(self, clustering_service: FailureClusteringService = None,
+                 latency_threshold: float = 0.5, min_latency_delta_ms: int = 100):
+        """
+        初始化增量分析服务
+
+        Args:
+            clustering_service: 用于计算失败签名的聚类服务
+            latency_threshold: 耗时变化比例阈值，超过该比例视为耗时变化
+            min_latency_delta_ms: 耗时变化的最小绝对值（毫秒），避免短耗时用例的抖动
+        """
+        self.clustering_service = clustering_service or FailureClusteringService()
+        self.latency_threshold = latency_threshold
+        self.min_latency_delta_ms = min_latency_delta_ms
+
+    def build_case_digest(self, report: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        将结构化报告压缩为逐用例摘要，用于与后续运行对比
+
+        Args:
+            report: TestReportExtractor提取的结构化报告
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 用例键到摘要（是否成功、失败签名、耗时）的映射，
+            用例键为用例名称，同名用例从第二个起按出现次序追加“ #序号”，不会互相覆盖
+        """
+        digest = {}
+        occurrences: Dict[str, int] = {}
+        for case in report.get("cases") or []:
+            name = case["name"]
+            occurrences[name] = occurrences.get(name, 0) + 1
+            key = name if occurrences[name] == 1 else f"{name} #{occurrences[name]}"
+            signatures = sorted({
+                self.clustering_service.build_signature(step)
+                for step in case["steps"] if not step["success"]
+            })
+            digest[key] = {
+                "success": case["success"],
+                "signatures": signatures,
+                "elapsed_ms": case["elapsed_ms"]
+            }
+        return digest
+
+    def diff_runs(self, current: Dict[str, Dict[str, Any]],
+                  baseline: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        对比当前运行与基线运行的用例摘要
+
+        Args:
+            current: 当前运行的用例摘要
+            baseline: 基线运行的用例摘要
+
+        Returns:
+            Dict[str, Any]: 变化明细及未变化用例数量
+        """
+        delta = {
+            "new_failures": [],
+            "fixed_cases": [],
+            "changed_signatures": [],
+            "latency_shifts": [],
+            "added_cases": [],
+            "removed_cases": sorted(name for name in baseline if name not in current),
+            "unchanged_count": 0
+        }
+
+        for name, case in current.items():
+            base = baseline.get(name)
+            if base is None:
+                delta["added_cases"].append({"name": name, **case})
+                continue
+
+            changed = False
+            if base["success"] and not case["success"]:
+                delta["new_failures"].append({"name": name, "signatures": case["signatures"]})
+                changed = True
+            elif not base["success"] and case["success"]:
+                delta["fixed_cases"].append({"name": name, "previous_signatures": base["signatures"]})
+                changed = True
+            elif not case["success"] and case["signatures"] != base["signatures"]:
+                delta["changed_signatures"].append({
+                    "name": name,
+                    "previous_signatures": base["signatures"],
+                    "signatures": case["signatures"]
+                })
+                changed = True
+
+            shift = case["elapsed_ms"] - base["elapsed_ms"]
+            if abs(shift) >= self.min_latency_delta_ms and \
+                    abs(shift) > self.latency_threshold * max(base["elapsed_ms"], 1):
+                delta["latency_shifts"].append({
+                    "name": name,
+                    "previous_elapsed_ms": base["elapsed_ms"],
+                    "elapsed_ms": case["elapsed_ms"]
+                })
+                changed = True
+
+            if not changed:
+                delta["unchanged_count"] += 1
+
+        return delta
+
+    @staticmethod
+    def is_empty(delta: Dict[str, Any]) -> bool:
+        """判断两次运行之间是否没有任何变化"""
+        return not any(
+            delta[key] for key in
+            ("new_failures", "fixed_cases", "changed_signatures", "latency_shifts", "added_cases", "removed_cases")
+        )
+
+    def format_delta_for_prompt(self, delta: Dict[str, Any]) -> str:
+        """
+        将变化明细格式化为分析提示词输入
+
+        相同失败签名的新增失败合并展示，只附带数量和示例用例
+
+        Args:
+            delta: diff_runs返回的变化明细
+
+        Returns:
+            str: 变化明细文本
+        """
+        lines = [f"未变化的用例数: {delta['unchanged_count']}"]
+
+        if delta["new_failures"]:
+            lines.append("")
+            lines.append(f"## 新增失败（共 {len(delta['new_failures'])} 个）")
+            lines.extend(self._format_grouped_by_signature(delta["new_failures"], "signatures"))
+
+        if delta["fixed_cases"]:
+            lines.append("")
+            lines.append(f"## 已修复（共 {len(delta['fixed_cases'])} 个）")
+            lines.extend(self._format_grouped_by_signature(delta["fixed_cases"], "previous_signatures"))
+
+        if delta["changed_signatures"]:
+            lines.append("")
+            lines.append(f"## 失败原因变化（共 {len(delta['changed_signatures'])} 个）")
+            for item in delta["changed_signatures"]:
+                lines.append(f"- {item['name']}: {'; '.join(item['previous_signatures'])} -> "
+                             f"{'; '.join(item['signatures'])}")
+
+        if delta["latency_shifts"]:
+            lines.append("")
+            lines.append(f"## 耗时变化（共 {len(delta['latency_shifts'])} 个）")
+            for item in delta["latency_shifts"]:
+                lines.append(f"- {item['name']}: {item['previous_elapsed_ms']}ms -> {item['elapsed_ms']}ms")
+
+        if delta["added_cases"]:
+            lines.append("")
+            lines.append(f"## 新增用例（共 {len(delta['added_cases'])} 个）")
+            for item in delta["added_cases"]:
+                status = "通过" if item["success"] else f"失败: {'; '.join(item['signatures'])}"
+                lines.append(f"- {item['name']}: {status}")
+
+        if delta["removed_cases"]:
+            lines.append("")
+            lines.append(f"## 已移除用例（共 {len(delta['removed_cases'])} 个）")
+            lines.extend(f"- {name}" for name in delta["removed_cases"])
+
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _format_grouped_by_signature(items: List[Dict[str, Any]], signature_key: str,
+                                     max_examples: int = 5) -> List[str]:
+        """按失败签名合并用例，每组列出数量和示例用例"""
+        groups: Dict[str, List[str]] = {}
+        for item in items:
+            signature = '; '.join(item[signature_key]) or "（无失败签名）"
+            groups.setdefault(signature, []).append(item["name"])
+
+        lines = []
+        for signature, names in sorted(groups.items(), key=lambda g: len(g[1]), reverse=True):
+            examples = ', '.join(names[:max_examples])
+            more = f" 等 {len(names)} 个" if len(names) > max_examples else ""
+            lines.append(f"- [{len(names)}] {signature}（用例: {examples}{more}）")
+        return lines
@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文档导入服务
+将上传的需求文档（.xlsx/.docx/.txt）分块流式写入磁盘，支持断点续传的分片上传，
+并在进程池中并行提取多个文件的测试要点
+"""
+import os
+import re
+import json
+import uuid
+import asyncio
+import time
+import hashlib
+import threading
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import docx
+try:
+    from python_multipart import MultipartParser
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart 0.0.13之前的版本
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from services.excel_processor import ExcelProcessor
+from services.file_store import FileStore
+from services.metrics import metrics
+from services.process_lock import ProcessLock
+from services.test_point_separator import TestPointSeparator
+
+# 支持导入的文件类型
+EXCEL_SUFFIXES = ('.xlsx', '.xlsm', '.xls')
+TEXT_SUFFIXES = ('.txt', '.md')
+SUPPORTED_SUFFIXES = EXCEL_SUFFIXES + ('.docx',) + TEXT_SUFFIXES
+
+# multipart请求体中除文件内容外的分隔符、头部和普通字段的预留字节数
+MULTIPART_OVERHEAD_SIZE = 64 * 1024
+# 普通表单字段的最大字节数
+MAX_FORM_FIELD_SIZE = 64 * 1024
+
+
+class UploadOffsetError(ValueError):
+    """分片上传的偏移量与服务端已接收的字节数不一致"""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+
+def iter_docx_units(file_path: str) -> Iterator[Dict[str, str]]:
+    """
+    逐个产出DOCX文件中的非空段落和表格行
+
+    Args:
+        file_path: DOCX文件路径
+
+    Returns:
+        Iterator[Dict[str, str]]: 需求单元生成器，每个单元包含kind、location和content
+    """
+    doc = docx.Document(file_path)
+
+    # 提取段落文本
+    for index, paragraph in enumerate(doc.paragraphs, 1):
+        if paragraph.text.strip():
+            yield {"kind": "paragraph", "location": f"段落{index}", "content": paragraph.text.strip()}
+
+    # 提取表格内容
+    for table_index, table in enumerate(doc.tables, 1):
+        for row_index, row in enumerate(table.rows, 1):
+            row_text = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+            if row_text:
+                yield {"kind": "table_row", "location": f"表格{table_index}第{row_index}行",
+                       "content": '\t'.join(row_text)}
+
+
+def extract_text_from_docx(file_path: str) -> str:
+    """
+    从DOCX文件中提取文本内容
+
+    Args:
+        file_path: DOCX文件路径
+
+    Returns:
+        str: 段落文本及表格各行以制表符连接的文本
+    """
+    return '\n'.join(unit["content"] for unit in iter_docx_units(file_path))
+
+
+def extract_requirement_units(file_path: str) -> List[Dict[str, str]]:
+    """
+    将需求文档拆分为可单独比对版本的需求单元，可在进程池的工作进程中执行
+
+    DOCX按段落和表格行拆分，Excel按数据行拆分（单元格以“列名: 值”形式拼接），文本文件按非空行拆分
+
+    Args:
+        file_path: 文档路径
+
+    Returns:
+        List[Dict[str, str]]: 按文档顺序排列的需求单元，每个单元包含kind、location和content
+    """
+    suffix = os.path.splitext(file_path)[1].lower()
+    if suffix == '.docx':
+        return list(iter_docx_units(file_path))
+    if suffix in EXCEL_SUFFIXES:
+        units = []
+        for case in ExcelProcessor.iter_test_cases_from_excel(file_path):
+            content = '\t'.join(f"{header}: {value}" for header, value in case["values"].items() if value)
+            if content:
+                units.append({"kind": "excel_row", "location": f"{case['sheet']}!{case['row']}",
+                              "content": content})
+        return units
+    if suffix in TEXT_SUFFIXES:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return [
+                {"kind": "line", "location": f"第{line_number}行", "content": line.strip()}
+                for line_number, line in enumerate(f, 1) if line.strip()
+            ]
+    raise ValueError(f"不支持的文件类型: {suffix}")
+
+
+def extract_document(file_path: str) -> Dict[str, Any]:
+    """
+    提取单个文档中的测试要点，在进程池的工作进程中执行
+
+    Excel每个数据行作为一个测试要点；Word和文本文件提取文本后按编号分离测试要点
+
+    Args:
+        file_path: 文档路径
+
+    Returns:
+        Dict[str, Any]: 包含file、test_points和error的字典
+    """
+    name = os.path.basename(file_path)
+    try:
+        suffix = os.path.splitext(name)[1].lower()
+        if suffix in EXCEL_SUFFIXES:
+            test_points = [point for point in ExcelProcessor.iter_test_points_from_excel(file_path)
+                           if point["content"]]
+        elif suffix == '.docx':
+            text = extract_text_from_docx(file_path)
+            test_points = list(TestPointSeparator().iter_points_from_text(text))
+        elif suffix in TEXT_SUFFIXES:
+            test_points = list(TestPointSeparator().iter_points_from_file(file_path))
+        else:
+            raise ValueError(f"不支持的文件类型: {suffix}")
+        for point in test_points:
+            point["source_file"] = name
+        return {"file": name, "test_points": test_points, "error": None}
+    except Exception as e:
+        return {"file": name, "test_points": [], "error": str(e)}
+
+
+def _run_timed(func, file_path: str):
+    """在工作进程中执行提取函数并返回 (结果, 耗时秒数)，耗时不含进程池排队时间"""
+    started = time.perf_counter()
+    result = func(file_path)
+    return result, time.perf_counter() - started
+
+
+class DocumentIngestionService:
+    """文档导入服务"""
+
+    def __init__(self, upload_dir: str = "file_store/uploads", chunk_size: int = 1024 * 1024,
+                 max_upload_size: int = 1024 * 1024 * 1024, max_workers: int = 4,
+                 file_store: Optional[FileStore] = None):
+        """
+        初始化文档导入服务
+
+        Args:
+            upload_dir: 上传文件的保存目录
+            chunk_size: 流式写入磁盘的分块大小（字节）
+            max_upload_size: 单个文件的最大字节数
+            max_workers: 并行提取文档的进程数
+            file_store: 记录上传任务元数据的文件存储
+        """
+        self.upload_dir = upload_dir
+        self.file_store = file_store
+        self.sessions_dir = os.path.join(upload_dir, "_sessions")
+        self.chunk_size = chunk_size
+        self.max_upload_size = max_upload_size
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        os.makedirs(self.sessions_dir, exist_ok=True)
+
+    async def save_multipart_upload(self, content_type: str, chunks: AsyncIterator[bytes],
+                                    content_length: Optional[int] = None, max_files: Optional[int] = None,
+                                    task_id: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """
+        边接收边解析multipart/form-data请求体，将文件分块写入磁盘，不经过框架的临时文件缓存
+
+        请求体大小（Content-Length）超过max_files个文件的上限时在读取前拒绝，
+        单个文件超过大小上限时立即中止接收并删除已写入的文件
+
+        Args:
+            content_type: 请求的Content-Type，须包含boundary
+            chunks: 请求体的异步字节流
+            content_length: 请求的Content-Length
+            max_files: 允许上传的最大文件数，为空时不限制
+            task_id: 记录到文件存储元数据中的任务ID
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Dict[str, str]]: 文件信息列表（包含name、path、size和sha256）
+            及表单中的普通字段
+        """
+        if max_files is not None and content_length is not None \
+                and content_length > max_files * self.max_upload_size + MULTIPART_OVERHEAD_SIZE:
+            raise ValueError(f"请求体 {content_length} 字节超过大小上限 {self.max_upload_size} 字节")
+        media_type, params = parse_options_header(content_type or "")
+        if media_type != b'multipart/form-data' or not params.get(b'boundary'):
+            raise ValueError("请求体必须为包含boundary的multipart/form-data")
+
+        files: List[Dict[str, Any]] = []
+        fields: Dict[str, str] = {}
+        headers: Dict[bytes, bytes] = {}
+        state: Dict[str, Any] = {"field": b"", "value": b"", "part": None}
+
+        def on_header_field(data: bytes, start: int, end: int) -> None:
+            state["field"] += data[start:end]
+
+        def on_header_value(data: bytes, start: int, end: int) -> None:
+            state["value"] += data[start:end]
+
+        def on_header_end() -> None:
+            headers[state["field"].lower()] = state["value"]
+            state["field"], state["value"] = b"", b""
+
+        def on_headers_finished() -> None:
+            _, options = parse_options_header(headers.get(b'content-disposition', b''))
+            headers.clear()
+            name = options.get(b'name', b'').decode('utf-8')
+            if b'filename' not in options:
+                state["part"] = {"field": name, "value": bytearray()}
+                return
+            if max_files is not None and len(files) >= max_files:
+                raise ValueError(f"最多上传 {max_files} 个文件")
+            filename = self._check_filename(options[b'filename'].decode('utf-8'))
+            path = os.path.join(self._new_batch_dir(), filename)
+            info = {"name": filename, "path": path, "size": 0, "sha256": ""}
+            files.append(info)
+            state["part"] = {"file": info, "handle": open(path, 'wb'), "digest": hashlib.sha256()}
+
+        def on_part_data(data: bytes, start: int, end: int) -> None:
+            part = state["part"]
+            chunk = data[start:end]
+            if "field" in part:
+                part["value"] += chunk
+                if len(part["value"]) > MAX_FORM_FIELD_SIZE:
+                    raise ValueError(f"表单字段 {part['field']} 超过 {MAX_FORM_FIELD_SIZE} 字节")
+                return
+            part["file"]["size"] += len(chunk)
+            if part["file"]["size"] > self.max_upload_size:
+                raise ValueError(f"文件 {part['file']['name']} 超过大小上限 {self.max_upload_size} 字节")
+            part["digest"].update(chunk)
+            part["handle"].write(chunk)
+
+        def on_part_end() -> None:
+            part, state["part"] = state["part"], None
+            if "field" in part:
+                fields[part["field"]] = part["value"].decode('utf-8')
+                return
+            part["handle"].close()
+            part["file"]["sha256"] = part["digest"].hexdigest()
+
+        parser = MultipartParser(params[b'boundary'], {
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end
+        })
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    parser.write(chunk)
+            parser.finalize()
+            if any(not info["sha256"] for info in files):
+                raise ValueError("请求体不完整")
+        except Exception:
+            part = state["part"]
+            if part and "handle" in part:
+                part["handle"].close()
+            for info in files:
+                if os.path.exists(info["path"]):
+                    os.remove(info["path"])
+                try:
+                    os.rmdir(os.path.dirname(info["path"]))
+                except OSError:
+                    pass
+            raise
+        for info in files:
+            self._register(info["path"], task_id)
+        return files, fields
+
+    def create_upload_session(self, filename: str, total_size: int) -> Dict[str, Any]:
+        """
+        创建分片上传会话
+
+        Args:
+            filename: 文件名
+            total_size: 文件总字节数
+
+        Returns:
+            Dict[str, Any]: 上传会话信息
+        """
+        name = self._check_filename(filename)
+        if total_size <= 0 or total_size > self.max_upload_size:
+            raise ValueError(f"文件大小必须在 1 到 {self.max_upload_size} 字节之间")
+        upload_id = uuid.uuid4().hex
+        session = {
+            "upload_id": upload_id,
+            "filename": name,
+            "total_size": total_size,
+            "created_at": datetime.now().isoformat()
+        }
+        with open(self._session_path(upload_id), 'w', encoding='utf-8') as f:
+            json.dump(session, f, ensure_ascii=False)
+        open(self._part_path(upload_id), 'wb').close()
+        return self.get_upload_session(upload_id)
+
+    def get_upload_session(self, upload_id: str) -> Dict[str, Any]:
+        """
+        获取分片上传会话，offset为服务端已接收的字节数，客户端据此续传
+
+        Args:
+            upload_id: 上传会话ID
+
+        Returns:
+            Dict[str, Any]: 上传会话信息
+        """
+        session_path = self._session_path(upload_id)
+        if not os.path.exists(session_path):
+            raise KeyError(f"上传会话不存在: {upload_id}")
+        with open(session_path, 'r', encoding='utf-8') as f:
+            session = json.load(f)
+        part_path = self._part_path(upload_id)
+        session["offset"] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        session["completed"] = session["offset"] >= session["total_size"]
+        return session
+
+    async def append_chunk(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes],
+                           content_length: Optional[int] = None) -> Dict[str, Any]:
+        """
+        向上传会话追加一个分片
+
+        分片起始偏移量必须等于已接收的字节数；不一致时抛出UploadOffsetError并携带正确的偏移量。
+        分片大小（Content-Length）超出文件剩余字节数时在读取前拒绝
+
+        Args:
+            upload_id: 上传会话ID
+            offset: 分片在文件中的起始偏移量
+            chunks: 分片内容的异步字节流
+            content_length: 分片请求的Content-Length
+
+        Returns:
+            Dict[str, Any]: 更新后的上传会话信息
+        """
+        lock = self._acquire_session_lock(upload_id)
+        try:
+            session = self.get_upload_session(upload_id)
+            if offset != session["offset"]:
+                raise UploadOffsetError(f"分片偏移量 {offset} 与已接收的字节数 {session['offset']} 不一致",
+                                        session["offset"])
+            if content_length is not None and offset + content_length > session["total_size"]:
+                raise ValueError(f"分片数据超出文件总大小 {session['total_size']} 字节")
+
+            received = offset
+            with open(self._part_path(upload_id), 'ab') as f:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if received + len(chunk) > session["total_size"]:
+                        # 截断到最后一次完整写入的位置，客户端可从该偏移量重新续传
+                        f.truncate(received)
+                        raise ValueError(f"分片数据超出文件总大小 {session['total_size']} 字节")
+                    f.write(chunk)
+                    received += len(chunk)
+            return self.get_upload_session(upload_id)
+        finally:
+            lock.release()
+
+    def complete_upload_session(self, upload_id: str, task_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        完成分片上传，将已接收的文件移入上传目录并删除会话
+
+        Args:
+            upload_id: 上传会话ID
+            task_id: 记录到文件存储元数据中的任务ID
+
+        Returns:
+            Dict[str, Any]: 包含name、path、size和sha256的文件信息
+        """
+        lock = self._acquire_session_lock(upload_id)
+        try:
+            session = self.get_upload_session(upload_id)
+            if not session["completed"]:
+                raise UploadOffsetError(f"文件尚未上传完成，已接收 {session['offset']}/{session['total_size']} 字节",
+                                        session["offset"])
+
+            path = os.path.join(self._new_batch_dir(), session["filename"])
+            digest = hashlib.sha256()
+            with open(self._part_path(upload_id), 'rb') as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    digest.update(chunk)
+            os.replace(self._part_path(upload_id), path)
+            os.remove(self._session_path(upload_id))
+        finally:
+            lock.release()
+        try:
+            os.remove(lock.path)
+        except OSError:
+            pass
+        self._register(path, task_id)
+        return {"name": session["filename"], "path": path, "size": session["total_size"],
+                "sha256": digest.hexdigest()}
+
+    async def extract_files(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """
+        在进程池中并行提取多个文档的测试要点
+
+        Args:
+            paths: 文档路径列表
+
+        Returns:
+            List[Dict[str, Any]]: 与paths顺序一致的提取结果
+        """
+        if not paths:
+            return []
+        return list(await asyncio.gather(
+            *(self._run_in_pool(extract_document, path, "test_points") for path in paths)
+        ))
+
+    async def extract_requirement_units(self, path: str) -> List[Dict[str, str]]:
+        """
+        在进程池中将需求文档拆分为需求单元
+
+        Args:
+            path: 文档路径
+
+        Returns:
+            List[Dict[str, str]]: 按文档顺序排列的需求单元
+        """
+        return await self._run_in_pool(extract_requirement_units, path, "requirement_units")
+
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    async def _run_in_pool(self, func, path: str, kind: str):
+        """在进程池中执行提取函数，并按文件类型记录提取耗时"""
+        loop = asyncio.get_running_loop()
+        result, duration = await loop.run_in_executor(self._get_executor(), _run_timed, func, path)
+        suffix = os.path.splitext(path)[1].lower().lstrip('.') or "unknown"
+        metrics.observe("document_ingestion_duration_seconds", duration, {"kind": kind, "suffix": suffix})
+        return result
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """首次使用时创建进程池"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _register(self, path: str, task_id: Optional[str]) -> None:
+        """将上传文件所在的目录作为一个任务记录到文件存储元数据"""
+        if self.file_store is None:
+            return
+        directory = os.path.dirname(path)
+        self.file_store.register_task(os.path.basename(directory), directory, [os.path.basename(path)],
+                                      task_id=task_id or str(uuid.uuid4()))
+
+    def _new_batch_dir(self) -> str:
+        """创建本次上传的目录，命名方式与file_store中的其他目录一致"""
+        batch_id = self.file_store.new_store_id() if self.file_store \
+            else f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        batch_dir = os.path.join(self.upload_dir, batch_id)
+        os.makedirs(batch_dir, exist_ok=True)
+        return batch_dir
+
+    def _acquire_session_lock(self, upload_id: str) -> ProcessLock:
+        """
+        获取上传会话的跨进程锁
+
+        同一会话的请求可能被分配到不同worker，写入分片和完成上传必须互斥；
+        锁被占用时不等待，抛出UploadOffsetError由客户端查询偏移量后重试
+        """
+        session = self.get_upload_session(upload_id)
+        lock = ProcessLock(os.path.join(self.sessions_dir, f"{self._check_upload_id(upload_id)}.lock"))
+        if not lock.acquire(blocking=False):
+            raise UploadOffsetError("上传会话正在被另一个请求写入", session["offset"])
+        return lock
+
+    def _session_path(self, upload_id: str) -> str:
+        """获取上传会话信息文件路径"""
+        return os.path.join(self.sessions_dir, f"{self._check_upload_id(upload_id)}.json")
+
+    def _part_path(self, upload_id: str) -> str:
+        """获取上传中文件的路径"""
+        return os.path.join(self.sessions_dir, f"{self._check_upload_id(upload_id)}.part")
+
+    @staticmethod
+    def _check_upload_id(upload_id: str) -> str:
+        """校验上传会话ID，防止路径穿越"""
+        if not re.fullmatch(r'[0-9a-f]{32}', upload_id or ""):
+            raise KeyError(f"上传会话不存在: {upload_id}")
+        return upload_id
+
+    @staticmethod
+    def _check_filename(filename: Optional[str]) -> str:
+        """去掉文件名中的目录部分并校验文件类型"""
+        name = os.path.basename((filename or "").replace('\\', '/')).strip()
+        if not name or name.startswith('.'):
+            raise ValueError("文件名无效")
+        if not name.lower().endswith(SUPPORTED_SUFFIXES):
+            raise ValueError(f"不支持的文件类型: {name}，支持的类型: {', '.join(SUPPORTED_SUFFIXES)}")
+        return name
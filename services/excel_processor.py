@@ -4,67 +4,210 @@
 Excel文件处理工具模块
 用于读取和解析Excel文件中的测试用例
 """
+import re
 import pandas as pd
-from typing import Dict, List
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Union
 import os
+from openpyxl import load_workbook
+
+from services.test_point_separator import compute_point_id
+
+# openpyxl可流式读取的文件格式，其他格式（如.xls）回退到pandas
+STREAMING_EXCEL_SUFFIXES = ('.xlsx', '.xlsm', '.xltx', '.xltm')
+
+# 映射为测试要点字段时自动识别的列名（归一化后比较）
+TEST_POINT_COLUMN_ALIASES = {
+    "id": ["id", "编号", "用例编号", "用例id", "测试用例编号", "序号"],
+    "title": ["title", "标题", "用例标题", "用例名称", "测试用例名称", "名称"],
+    "content": ["content", "内容", "测试要点", "测试步骤", "用例描述", "描述", "测试内容"],
+}
 
 class ExcelProcessor:
     """Excel文件处理器"""
     
     @staticmethod
-    def extract_test_cases_from_excel(file_path: str) -> str:
+    def extract_test_cases_from_excel(file_path: str, buf: Optional[TextIO] = None) -> Optional[str]:
         """
         从Excel文件中提取测试用例
         
+        内容为iter_excel_text_lines产出的文本：每个工作表以“工作表: 名称”和制表符分隔的表头开始，
+        每行一条记录，以分隔线结束。指定buf时逐行写入，不在内存中拼接完整内容
+        
         Args:
             file_path (str): Excel文件路径
+            buf (Optional[TextIO]): 写入内容的文本流，如打开的文件或sys.stdout
             
         Returns:
-            str: 提取的测试用例内容
+            Optional[str]: 未指定buf时返回提取的测试用例内容，否则返回None
             
         Raises:
             Exception: 文件读取或处理过程中出现的错误
         """
         try:
-            # 检查文件是否存在
-            if not os.path.exists(file_path):
-                raise Exception(f"文件不存在: {file_path}")
-            
-            # 读取Excel文件的所有工作表
-            excel_file = pd.ExcelFile(file_path)
-            all_test_cases = []
-            
-            # 遍历所有工作表
-            for sheet_name in excel_file.sheet_names:
-                # 读取每个工作表
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
-                
-                # 将DataFrame转换为文本格式
-                sheet_content = f"工作表: {sheet_name}\n"
-                
-                # 如果DataFrame不为空，转换为字符串
-                if not df.empty:
-                    sheet_content += df.to_string(index=False)
-                else:
-                    sheet_content += "（空工作表）"
-                
-                sheet_content += "\n" + "="*50 + "\n"
-                all_test_cases.append(sheet_content)
-                
-            return '\n'.join(all_test_cases)
+            lines = ExcelProcessor.iter_excel_text_lines(file_path)
+            if buf is None:
+                return '\n'.join(lines)
+            for line in lines:
+                buf.write(line + '\n')
+            return None
         except Exception as e:
             raise Exception(f"读取Excel文件时出错: {str(e)}")
     
     @staticmethod
-    def extract_structured_test_cases_from_excel(file_path: str) -> List[Dict]:
+    def iter_excel_text_lines(file_path: str) -> Iterator[str]:
+        """
+        逐行产出Excel文件的文本内容，每个工作表以表头开始、分隔线结束
+        
+        Args:
+            file_path (str): Excel文件路径
+            
+        Returns:
+            Iterator[str]: 文本行生成器
+        """
+        sheet_name = None
+        columns: List[str] = []
+        for case in ExcelProcessor.iter_test_cases_from_excel(file_path, include_empty_sheets=True):
+            if case["sheet"] != sheet_name:
+                if sheet_name is not None:
+                    yield "=" * 50
+                sheet_name = case["sheet"]
+                yield f"工作表: {sheet_name}"
+                if case["row"] is None:
+                    yield "（空工作表）"
+                    continue
+                columns = list(case["values"].keys())
+                yield '\t'.join(columns)
+            yield '\t'.join(case["values"].get(column, "") for column in columns)
+        if sheet_name is not None:
+            yield "=" * 50
+    
+    @staticmethod
+    def iter_test_cases_from_excel(file_path: str, sheet_names: Optional[List[str]] = None,
+                                   include_empty_sheets: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        单遍流式读取Excel文件，逐行产出测试用例
+        
+        xlsx文件以只读模式逐行解析，整个工作簿只解析一次，内存占用与行数无关；
+        每个工作表的第一个非空行作为表头，完全为空的行会被跳过
+        
+        Args:
+            file_path (str): Excel文件路径
+            sheet_names (Optional[List[str]]): 只读取指定的工作表，默认读取全部工作表
+            include_empty_sheets (bool): 是否为没有数据的工作表产出一条row为None的记录
+            
+        Returns:
+            Iterator[Dict[str, Any]]: 测试用例生成器，每条包含sheet、row（Excel行号）和values（表头到单元格文本的映射）
+            
+        Raises:
+            Exception: 文件不存在
+        """
+        if not os.path.exists(file_path):
+            raise Exception(f"文件不存在: {file_path}")
+        
+        if not file_path.lower().endswith(STREAMING_EXCEL_SUFFIXES):
+            yield from ExcelProcessor._iter_test_cases_with_pandas(file_path, sheet_names, include_empty_sheets)
+            return
+        
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for worksheet in workbook.worksheets:
+                if sheet_names is not None and worksheet.title not in sheet_names:
+                    continue
+                header = None
+                has_rows = False
+                for row_number, row in enumerate(worksheet.iter_rows(values_only=True), 1):
+                    values = [ExcelProcessor._cell_text(value) for value in row]
+                    if not any(values):
+                        continue
+                    if header is None:
+                        header = ExcelProcessor._build_header(values)
+                        continue
+                    if len(values) > len(header):
+                        header = header + [f"列{i}" for i in range(len(header) + 1, len(values) + 1)]
+                    has_rows = True
+                    yield {
+                        "sheet": worksheet.title,
+                        "row": row_number,
+                        "values": dict(zip(header, values + [""] * (len(header) - len(values))))
+                    }
+                if not has_rows and include_empty_sheets:
+                    yield {"sheet": worksheet.title, "row": None, "values": {}}
+        finally:
+            workbook.close()
+    
+    @staticmethod
+    def _iter_test_cases_with_pandas(file_path: str, sheet_names: Optional[List[str]],
+                                     include_empty_sheets: bool) -> Iterator[Dict[str, Any]]:
+        """非xlsx格式一次性读取全部工作表后逐行产出，格式与iter_test_cases_from_excel一致"""
+        sheets = pd.read_excel(file_path, sheet_name=sheet_names or None, dtype=str)
+        for sheet_name, df in sheets.items():
+            df = df.dropna(how='all')
+            if df.empty:
+                if include_empty_sheets:
+                    yield {"sheet": sheet_name, "row": None, "values": {}}
+                continue
+            header = ExcelProcessor._build_header([str(column) for column in df.columns])
+            records = df.fillna("").to_numpy()
+            for row_number, values in zip(df.index, records):
+                yield {
+                    "sheet": sheet_name,
+                    "row": int(row_number) + 2,
+                    "values": dict(zip(header, (ExcelProcessor._cell_text(value) for value in values)))
+                }
+    
+    @staticmethod
+    def _cell_text(value: Any) -> str:
+        """将单元格的值转换为文本，整数值的浮点数去掉小数部分"""
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value).strip()
+    
+    @staticmethod
+    def _build_header(values: List[str]) -> List[str]:
+        """根据表头行生成列名，空列名使用列序号，重复列名追加序号"""
+        header = []
+        seen: Dict[str, int] = {}
+        for i, value in enumerate(values, 1):
+            name = value or f"列{i}"
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}_{seen[name]}"
+            else:
+                seen[name] = 0
+            header.append(name)
+        return header
+    
+    @staticmethod
+    def extract_structured_test_cases_from_excel(file_path: str, sheet_name: Union[int, str, List, None] = 0,
+                                                 column_mapping: Optional[Dict[str, str]] = None,
+                                                 as_test_points: bool = False,
+                                                 output: str = "records",
+                                                 normalize_columns: bool = False,
+                                                 drop_empty_rows: bool = False,
+                                                 strip_values: bool = False) -> Any:
         """
         从Excel文件中提取结构化测试用例
         
+        空值填充和记录转换均按列批量完成；读取多个工作表时只解析一次工作簿。
+        默认保留pandas读取的原始列名、空行和单元格文本
+        
         Args:
             file_path (str): Excel文件路径
+            sheet_name (Union[int, str, List, None]): 工作表序号或名称，列表表示多个工作表，None表示全部工作表；
+                读取多个工作表时每条记录附带sheet字段
+            column_mapping (Optional[Dict[str, str]]): 列名映射，如 {"用例编号": "id"}
+            as_test_points (bool): 是否转换为separate_test_points输出的id/title/content结构，
+                未在column_mapping中指定的字段按常见列名自动识别
+            output (str): 输出格式，records返回字典列表，dataframe返回DataFrame，
+                numpy返回 (列名列表, 二维ndarray)，arrow返回pyarrow.Table
+            normalize_columns (bool): 是否规范化列名：合并空白，无名列（Unnamed:）使用列序号，重复列名追加序号
+            drop_empty_rows (bool): 是否去掉所有单元格均为空的行
+            strip_values (bool): 是否去除单元格文本的首尾空白
             
         Returns:
-            List[Dict]: 结构化的测试用例列表
+            Any: 按output指定格式返回的结构化测试用例
             
         Raises:
             Exception: 文件读取或处理过程中出现的错误
@@ -73,28 +216,134 @@ class ExcelProcessor:
             # 检查文件是否存在
             if not os.path.exists(file_path):
                 raise Exception(f"文件不存在: {file_path}")
+            if output not in ("records", "dataframe", "numpy", "arrow"):
+                raise Exception(f"不支持的输出格式: {output}")
             
-            # 读取Excel文件的第一个工作表
-            df = pd.read_excel(file_path)
+            # 一次解析读取所需的全部工作表，所有单元格按文本读取
+            sheets = pd.read_excel(file_path, sheet_name=sheet_name, dtype=str)
+            multiple = isinstance(sheets, dict)
+            frames = []
+            for name, df in (sheets.items() if multiple else [(None, sheets)]):
+                df = ExcelProcessor._normalize_frame(df, normalize_columns, drop_empty_rows, strip_values)
+                if column_mapping:
+                    df = df.rename(columns=column_mapping)
+                if as_test_points:
+                    df = ExcelProcessor._to_test_point_frame(df)
+                if multiple:
+                    df.insert(0, "sheet", name)
+                frames.append(df)
+            df = pd.concat(frames, ignore_index=True).fillna("") if len(frames) > 1 else frames[0]
             
-            # 转换为结构化数据
-            test_cases = []
-            
-            # 遍历每一行数据
-            for index, row in df.iterrows():
-                # 将行数据转换为字典
-                case_data = {}
-                for col_name in df.columns:
-                    # 处理NaN值
-                    value = row[col_name]
-                    case_data[col_name] = "" if pd.isna(value) else str(value)
-                
-                test_cases.append(case_data)
-                
-            return test_cases
+            if output == "dataframe":
+                return df
+            if output == "numpy":
+                return list(df.columns), df.to_numpy(dtype=object)
+            if output == "arrow":
+                try:
+                    import pyarrow as pa
+                except ImportError:
+                    raise Exception("输出arrow格式需要安装pyarrow")
+                return pa.Table.from_pandas(df, preserve_index=False)
+            return df.to_dict(orient="records")
         except Exception as e:
             raise Exception(f"读取Excel文件时出错: {str(e)}")
-
+    
+    @staticmethod
+    def _normalize_frame(df: pd.DataFrame, normalize_columns: bool, drop_empty_rows: bool,
+                         strip_values: bool) -> pd.DataFrame:
+        """按列批量填充空值，并按选项规范化列名、去掉全空行、去除首尾空白"""
+        if normalize_columns:
+            df.columns = ExcelProcessor._build_header([
+                "" if str(column).startswith("Unnamed:") else re.sub(r'\s+', ' ', str(column)).strip()
+                for column in df.columns
+            ])
+        if drop_empty_rows:
+            df = df.dropna(how="all")
+        df = df.fillna("")
+        if strip_values:
+            df = df.apply(lambda column: column.str.strip())
+        return df.reset_index(drop=True)
+    
+    @staticmethod
+    def _to_test_point_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """将用例表转换为id/title/content结构，其他列原样保留"""
+        selected = ExcelProcessor._test_point_columns([str(column) for column in df.columns])
+        others = [column for column in df.columns if column not in selected.values()]
+        if "content" in selected:
+            content = df[selected["content"]]
+        else:
+            # 没有内容列时用其余各列拼接为内容
+            content = pd.Series([""] * len(df), index=df.index)
+            for column in others:
+                content = content.str.cat(str(column) + ": " + df[column], sep="\n").where(
+                    df[column] != "", content)
+            content = content.str.lstrip("\n")
+        title = df[selected["title"]] if "title" in selected else content.str.slice(0, 50)
+        if "id" in selected:
+            ids = df[selected["id"]].where(df[selected["id"]] != "", content.map(compute_point_id))
+        else:
+            ids = content.map(compute_point_id)
+        
+        result = pd.DataFrame({"id": ids, "title": title, "content": content})
+        for column in others:
+            if column not in result.columns:
+                result[column] = df[column]
+        return result
+    
+    @staticmethod
+    def iter_test_points_from_excel(file_path: str, sheet_names: Optional[List[str]] = None,
+                                    column_mapping: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        流式读取Excel文件，逐行产出separate_test_points输出的id/title/content结构
+        
+        行的读取方式与iter_test_cases_from_excel一致，字段映射与
+        extract_structured_test_cases_from_excel(as_test_points=True)一致，每个工作表单独识别列名
+        
+        Args:
+            file_path (str): Excel文件路径
+            sheet_names (Optional[List[str]]): 只读取指定的工作表，默认读取全部工作表
+            column_mapping (Optional[Dict[str, str]]): 列名映射，如 {"用例编号": "id"}
+            
+        Returns:
+            Iterator[Dict[str, Any]]: 测试要点生成器，每条包含sheet、id、title、content及其余各列
+        """
+        sheet_name = None
+        selected: Dict[str, str] = {}
+        for case in ExcelProcessor.iter_test_cases_from_excel(file_path, sheet_names):
+            values = case["values"]
+            if column_mapping:
+                values = {column_mapping.get(column, column): value for column, value in values.items()}
+            if case["sheet"] != sheet_name:
+                sheet_name = case["sheet"]
+                selected = ExcelProcessor._test_point_columns(list(values))
+            others = [column for column in values if column not in selected.values()]
+            content = values[selected["content"]] if "content" in selected else \
+                "\n".join(f"{column}: {values[column]}" for column in others if values[column])
+            point = {
+                "sheet": sheet_name,
+                "id": values.get(selected.get("id"), "") or compute_point_id(content),
+                "title": values[selected["title"]] if "title" in selected else content[:50],
+                "content": content
+            }
+            for column in others:
+                point.setdefault(column, values[column])
+            yield point
+    
+    @staticmethod
+    def _test_point_columns(columns: List[str]) -> Dict[str, str]:
+        """按字段名或常见列名识别id/title/content对应的列"""
+        normalized = {re.sub(r'[\s_\-]+', '', column).lower(): column for column in columns}
+        selected = {}
+        for field, aliases in TEST_POINT_COLUMN_ALIASES.items():
+            if field in columns:
+                selected[field] = field
+                continue
+            for alias in aliases:
+                if alias in normalized:
+                    selected[field] = normalized[alias]
+                    break
+        return selected
+    
 # 使用示例
 if __name__ == "__main__":
     # 示例用法
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+失败签名聚类服务
+将失败步骤的错误信息、URL、ID和时间戳归一化为签名并分组，
+只把每组的代表样本交给大模型分析
+"""
+import re
+import hashlib
+from typing import Dict, List, Any, Tuple
+from urllib.parse import urlsplit
+
+
+# 归一化规则，按顺序应用
+_NORMALIZE_RULES: List[Tuple[re.Pattern, str]] = [
+    # ISO时间戳及常见日期时间格式
+    (re.compile(r'\d{4}[-/]\d{1,2}[-/]\d{1,2}(?:[ T]\d{1,2}:\d{2}(?::\d{2})?(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?)?'), '<ts>'),
+    (re.compile(r'\b\d{1,2}:\d{2}:\d{2}(?:\.\d+)?\b'), '<ts>'),
+    # UUID
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), '<uuid>'),
+    # IP地址及端口
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<ip>'),
+    # 耗时
+    (re.compile(r'\b\d+(?:\.\d+)?\s*(?:ms|s|秒|毫秒)\b'), '<duration>'),
+    # 十六进制ID（至少8位且包含数字）
+    (re.compile(r'\b(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{8,}\b'), '<hex>'),
+    # 长数字（订单号、时间戳等），保留三位以内的状态码和业务数值
+    (re.compile(r'\d{4,}'), '<num>'),
+]
+
+_URL_PATTERN = re.compile(r'https?://[^\s\'"<>,;]+')
+_PATH_ID_PATTERN = re.compile(r'^(?:\d+|[0-9a-fA-F-]{16,}|[0-9a-fA-F]{8,})$')
+
+
+class FailureClusteringService:
+    """失败签名聚类服务"""
+
+    def __init__(self, max_members_per_cluster: int = 10):
+        """
+        初始化聚类服务
+
+        Args:
+            max_members_per_cluster: 每个分组中保留的示例用例名称数量
+        """
+        self.max_members_per_cluster = max_members_per_cluster
+
+    def normalize_url(self, url: str) -> str:
+        """
+        归一化URL：去掉查询参数，并将路径中的ID段替换为{id}
+
+        Args:
+            url: 原始URL
+
+        Returns:
+            str: 归一化后的URL
+        """
+        if not url:
+            return ""
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return url
+        segments = [
+            "{id}" if _PATH_ID_PATTERN.match(segment) else segment
+            for segment in parts.path.split('/')
+        ]
+        host = parts.netloc or ""
+        prefix = f"{parts.scheme}://{host}" if parts.scheme else host
+        return prefix + '/'.join(segments)
+
+    def normalize_message(self, message: str) -> str:
+        """
+        归一化错误信息：替换URL、时间戳、UUID、长数字等易变部分
+
+        Args:
+            message: 原始错误信息
+
+        Returns:
+            str: 归一化后的错误信息
+        """
+        if not message:
+            return ""
+        text = _URL_PATTERN.sub(lambda m: self.normalize_url(m.group(0)), message)
+        for pattern, replacement in _NORMALIZE_RULES:
+            text = pattern.sub(replacement, text)
+        return re.sub(r'\s+', ' ', text).strip()
+
+    def build_signature(self, step: Dict[str, Any]) -> str:
+        """
+        为失败步骤构建签名
+
+        签名由请求方法、归一化URL、状态码和归一化错误信息组成，不包含用例名称
+
+        Args:
+            step: 失败步骤字典
+
+        Returns:
+            str: 失败签名
+        """
+        parts = [
+            str(step.get("method") or "").upper(),
+            self.normalize_url(step.get("url") or ""),
+            str(step.get("status_code") or ""),
+            self.normalize_message(step.get("error") or "")
+        ]
+        return " | ".join(part for part in parts if part)
+
+    def cluster_failures(self, failed_steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        按签名对失败步骤分组
+
+        Args:
+            failed_steps: 失败步骤列表
+
+        Returns:
+            List[Dict[str, Any]]: 按数量降序排列的分组列表
+        """
+        clusters: Dict[str, Dict[str, Any]] = {}
+        for step in failed_steps:
+            signature = self.build_signature(step)
+            cluster = clusters.get(signature)
+            if cluster is None:
+                cluster = {
+                    "signature_id": hashlib.sha1(signature.encode('utf-8')).hexdigest()[:12],
+                    "signature": signature,
+                    "count": 0,
+                    "representative": step,
+                    "case_names": []
+                }
+                clusters[signature] = cluster
+            cluster["count"] += 1
+            case_name = step.get("case_name") or step.get("name")
+            if case_name and len(cluster["case_names"]) < self.max_members_per_cluster:
+                cluster["case_names"].append(case_name)
+
+        return sorted(clusters.values(), key=lambda c: c["count"], reverse=True)
+
+    def format_clusters_for_prompt(self, report: Dict[str, Any],
+                                   clusters: List[Dict[str, Any]]) -> str:
+        """
+        将报告统计信息和失败分组格式化为分析提示词输入
+
+        每个分组只保留一个代表样本，并附带该分组的失败数量
+
+        Args:
+            report: TestReportExtractor提取的结构化报告
+            clusters: 失败分组列表
+
+        Returns:
+            str: 压缩后的报告内容
+        """
+        cases = report.get("cases") or []
+        failed_steps = report.get("failed_steps") or []
+        lines = ["# 测试报告摘要（失败已按签名聚类）"]
+
+        if cases:
+            passed = sum(1 for case in cases if case["success"])
+            lines.append(f"总测试用例数: {len(cases)}")
+            lines.append(f"通过用例数: {passed}")
+            lines.append(f"失败用例数: {len(cases) - passed}")
+        lines.append(f"失败步骤总数: {len(failed_steps)}")
+        lines.append(f"失败签名分组数: {len(clusters)}")
+
+        for i, cluster in enumerate(clusters, 1):
+            step = cluster["representative"]
+            lines.append("")
+            lines.append(f"## 失败分组 {i}（共 {cluster['count']} 个失败步骤）")
+            lines.append(f"签名: {cluster['signature']}")
+            if step.get("case_name"):
+                lines.append(f"代表用例: {step['case_name']}")
+            if step.get("name"):
+                lines.append(f"代表步骤: {step['name']}")
+            if step.get("url"):
+                lines.append(f"请求: {step.get('method', '')} {step['url']}".strip())
+            if step.get("status_code") is not None:
+                lines.append(f"状态码: {step['status_code']}")
+            lines.append(f"错误信息: {step.get('error', '')}")
+            if cluster["count"] > 1 and cluster["case_names"]:
+                lines.append(f"涉及用例示例: {', '.join(cluster['case_names'])}")
+
+        return '\n'.join(lines)
+
+    def condense_report(self, report: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        对结构化报告进行失败聚类，并生成用于分析的压缩报告
+
+        没有失败步骤时原样返回报告内容
+
+        Args:
+            report: TestReportExtractor提取的结构化报告
+
+        Returns:
+            Tuple[str, List[Dict[str, Any]]]: (用于分析的报告内容, 失败分组列表)
+        """
+        failed_steps = report.get("failed_steps") or []
+        if not failed_steps:
+            return report.get("raw_content", ""), []
+
+        clusters = self.cluster_failures(failed_steps)
+        if not report.get("cases") and report.get("text"):
+            # 只有报告文本时保留原文，仅折叠重复的失败行
+            return self._collapse_text(report["text"], clusters), clusters
+        return self.format_clusters_for_prompt(report, clusters), clusters
+
+    def _collapse_text(self, text: str, clusters: List[Dict[str, Any]]) -> str:
+        """保留报告文本，每个失败签名只保留首次出现的行并标注数量"""
+        counts = {cluster["signature"]: cluster["count"] for cluster in clusters}
+        seen = set()
+        lines = []
+        for line in text.split('\n'):
+            stripped = line.strip()
+            signature = self.build_signature({"error": stripped}) if stripped else ""
+            if signature in counts:
+                if signature in seen:
+                    continue
+                seen.add(signature)
+                if counts[signature] > 1:
+                    line = f"{line}（同类失败共 {counts[signature]} 次）"
+            lines.append(line)
+        return '\n'.join(lines)
@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件存储元数据模块
+以SQLite（WAL模式）记录file_store中每个上传或生成任务的目录及文件信息，
+支持按任务ID、日期和文件名索引查询，替代整体读写的metadata.json；
+配置内容寻址存储后，生成的文件按内容去重压缩保存，任务只记录内容摘要
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+from services.blob_store import BlobStore
+from services.process_lock import ProcessLock
+
+
+class FileStore:
+    """文件存储元数据"""
+
+    def __init__(self, base_dir: str = "file_store", db_path: Optional[str] = None,
+                 blob_store: Optional[BlobStore] = None):
+        """
+        初始化文件存储，首次使用时自动迁移base_dir下的metadata.json
+
+        Args:
+            base_dir: 文件存储根目录
+            db_path: SQLite数据库文件路径，默认为base_dir/metadata.db
+            blob_store: 内容寻址存储，为空时文件直接写入任务目录
+        """
+        self.base_dir = base_dir
+        self.db_path = db_path or os.path.join(base_dir, "metadata.db")
+        self.blob_store = blob_store
+        os.makedirs(base_dir, exist_ok=True)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_db()
+        self._migrate_legacy_metadata()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """创建数据库连接，每次操作使用独立连接以支持多线程"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        """创建数据表和索引"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS store_tasks (
+                    store_id TEXT PRIMARY KEY,
+                    task_id TEXT,
+                    directory TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    created_date TEXT NOT NULL,
+                    file_count INTEGER NOT NULL,
+                    total_size INTEGER NOT NULL,
+                    last_modified TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS store_files (
+                    store_id TEXT NOT NULL REFERENCES store_tasks (store_id) ON DELETE CASCADE,
+                    name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at TEXT NOT NULL,
+                    last_modified TEXT NOT NULL,
+                    blob_digest TEXT,
+                    PRIMARY KEY (store_id, name)
+                )
+                """
+            )
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(store_files)")}
+            if "blob_digest" not in columns:
+                conn.execute("ALTER TABLE store_files ADD COLUMN blob_digest TEXT")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS store_blobs (
+                    digest TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL,
+                    codec TEXT NOT NULL,
+                    touched_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_store_tasks_task_id ON store_tasks (task_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_store_tasks_created ON store_tasks (created_at, store_id)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_store_tasks_date ON store_tasks (created_date, created_at, store_id)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_store_files_name ON store_files (name)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_store_files_blob ON store_files (blob_digest)")
+
+    def new_store_id(self) -> str:
+        """生成任务目录名，格式为 时间戳_8位随机串"""
+        return f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+    def save_files(self, files: Dict[str, bytes], task_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        保存一个任务的文件并记录元数据
+
+        配置了内容寻址存储时文件按内容去重压缩保存，否则写入新的任务目录
+
+        Args:
+            files: 文件名到文件内容的映射
+            task_id: 任务ID，默认自动生成
+
+        Returns:
+            Dict[str, Any]: 任务元数据
+        """
+        store_id = self.new_store_id()
+        directory = os.path.join(self.base_dir, store_id)
+        task_id = task_id or str(uuid.uuid4())
+        if self.blob_store is not None:
+            return self._save_blobs(store_id, directory, files, task_id)
+        os.makedirs(directory, exist_ok=True)
+        for name, content in files.items():
+            with open(os.path.join(directory, os.path.basename(name)), 'wb') as f:
+                f.write(content)
+        return self.register_task(store_id, directory, list(files), task_id=task_id)
+
+    def read_file(self, store_id: str, name: str) -> bytes:
+        """
+        读取任务中的文件内容
+
+        Args:
+            store_id: 任务目录名
+            name: 文件名
+
+        Returns:
+            bytes: 文件内容
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT f.blob_digest, t.directory FROM store_files f JOIN store_tasks t USING (store_id) "
+                "WHERE f.store_id = ? AND f.name = ?",
+                (store_id, name)
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"文件不存在: {store_id}/{name}")
+        if row["blob_digest"]:
+            return self.blob_store.get(row["blob_digest"])
+        with open(os.path.join(row["directory"], name), 'rb') as f:
+            return f.read()
+
+    def migrate_files_to_blobs(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        将直接保存在任务目录中的文件转入内容寻址存储，转存后删除原文件及空目录
+
+        只处理file_store根目录下的任务目录，上传目录中的原始文档不受影响
+
+        Args:
+            limit: 最多处理的文件数量
+
+        Returns:
+            Dict[str, Any]: 包含migrated_files和freed_bytes的字典
+        """
+        if self.blob_store is None:
+            raise ValueError("未配置内容寻址存储")
+        query = ("SELECT f.store_id, f.name, t.directory FROM store_files f JOIN store_tasks t USING (store_id) "
+                 "WHERE f.blob_digest IS NULL ORDER BY t.created_at")
+        params: List[Any] = []
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        migrated = 0
+        freed = 0
+        for row in rows:
+            path = os.path.join(row["directory"], row["name"])
+            if os.path.dirname(os.path.normpath(row["directory"])) != os.path.normpath(self.base_dir) \
+                    or not os.path.isfile(path):
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            blob = self.blob_store.put(data)
+            with self._connect() as conn:
+                self._record_blob(conn, blob)
+                conn.execute(
+                    "UPDATE store_files SET blob_digest = ? WHERE store_id = ? AND name = ?",
+                    (blob["digest"], row["store_id"], row["name"])
+                )
+            os.remove(path)
+            if not os.listdir(row["directory"]):
+                os.rmdir(row["directory"])
+            migrated += 1
+            freed += len(data) - (blob["stored_size"] if blob["created"] else 0)
+        return {"migrated_files": migrated, "freed_bytes": freed}
+
+    def gc_blobs(self, grace_seconds: float = 3600) -> Dict[str, Any]:
+        """
+        删除不再被任何任务引用的内容
+
+        刚写入或刚被复用的内容在宽限期内不删除，避免与尚未提交元数据的写入冲突
+
+        Args:
+            grace_seconds: 宽限期秒数
+
+        Returns:
+            Dict[str, Any]: 包含deleted_blobs和freed_bytes的字典
+        """
+        if self.blob_store is None:
+            return {"deleted_blobs": 0, "freed_bytes": 0}
+        cutoff = time.time() - grace_seconds
+        with self._connect() as conn:
+            digests = [row["digest"] for row in conn.execute(
+                "SELECT digest FROM store_blobs b WHERE touched_at < ? "
+                "AND NOT EXISTS (SELECT 1 FROM store_files f WHERE f.blob_digest = b.digest)",
+                (cutoff,)
+            ).fetchall()]
+            known = {row["digest"] for row in conn.execute("SELECT digest FROM store_blobs").fetchall()}
+
+        deleted = 0
+        freed = 0
+        for digest in digests:
+            # 在事务中再次确认未被引用后才删除，期间被复用的内容保留
+            with self._connect() as conn:
+                removed = conn.execute(
+                    "DELETE FROM store_blobs WHERE digest = ? AND touched_at < ? "
+                    "AND NOT EXISTS (SELECT 1 FROM store_files WHERE blob_digest = ?)",
+                    (digest, cutoff, digest)
+                ).rowcount
+            if removed:
+                freed += self.blob_store.delete(digest)
+                deleted += 1
+
+        # 写入内容后未能记录元数据（如进程崩溃）留下的孤立内容
+        for digest, modified_at in list(self.blob_store.iter_blobs()):
+            if digest in known:
+                continue
+            if modified_at < cutoff:
+                with self._connect() as conn:
+                    referenced = conn.execute(
+                        "SELECT 1 FROM store_blobs WHERE digest = ?", (digest,)
+                    ).fetchone()
+                if referenced is None:
+                    freed += self.blob_store.delete(digest)
+                    deleted += 1
+        return {"deleted_blobs": deleted, "freed_bytes": freed}
+
+    def blob_stats(self) -> Dict[str, Any]:
+        """
+        获取内容寻址存储的去重和压缩统计
+
+        Returns:
+            Dict[str, Any]: 包含引用数、逻辑大小、去重后大小、磁盘占用及去重率和压缩率的字典
+        """
+        with self._connect() as conn:
+            references, logical_size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM store_files WHERE blob_digest IS NOT NULL"
+            ).fetchone()
+            blobs, unique_size, stored_size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM store_blobs"
+            ).fetchone()
+            unreferenced = conn.execute(
+                "SELECT COUNT(*) FROM store_blobs b "
+                "WHERE NOT EXISTS (SELECT 1 FROM store_files f WHERE f.blob_digest = b.digest)"
+            ).fetchone()[0]
+        return {
+            "references": references,
+            "blobs": blobs,
+            "unreferenced_blobs": unreferenced,
+            "logical_size": logical_size,
+            "unique_size": unique_size,
+            "stored_size": stored_size,
+            "dedup_ratio": round(logical_size / unique_size, 3) if unique_size else None,
+            "compression_ratio": round(unique_size / stored_size, 3) if stored_size else None,
+            "saved_bytes": logical_size - stored_size
+        }
+
+    def _save_blobs(self, store_id: str, directory: str, files: Dict[str, bytes],
+                    task_id: str) -> Dict[str, Any]:
+        """将任务文件写入内容寻址存储，并在同一个事务中记录任务、文件和内容元数据"""
+        now = datetime.now().isoformat()
+        blobs = {os.path.basename(name): (content, self.blob_store.put(content)) for name, content in files.items()}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO store_tasks "
+                "(store_id, task_id, directory, created_at, created_date, file_count, total_size, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, 0, 0, ?)",
+                (store_id, task_id, directory, now, now[:10], now)
+            )
+            for _, blob in blobs.values():
+                self._record_blob(conn, blob)
+            self._upsert_files(conn, store_id, [
+                {"name": name, "size": blob["size"], "created_at": now, "last_modified": now,
+                 "blob_digest": blob["digest"]}
+                for name, (_, blob) in blobs.items()
+            ], now)
+        # 复用的内容可能在提交前恰好被垃圾回收，提交后确认内容仍然存在
+        for content, blob in blobs.values():
+            if not self.blob_store.exists(blob["digest"]):
+                self.blob_store.put(content)
+        return self.get_task(store_id)
+
+    @staticmethod
+    def _record_blob(conn: sqlite3.Connection, blob: Dict[str, Any]) -> None:
+        """记录内容元数据，已存在时刷新时间以推迟垃圾回收"""
+        conn.execute(
+            "INSERT INTO store_blobs (digest, size, stored_size, codec, touched_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (digest) DO UPDATE SET touched_at = excluded.touched_at",
+            (blob["digest"], blob["size"], blob["stored_size"], blob["codec"], time.time())
+        )
+
+    def register_task(self, store_id: str, directory: str, file_names: List[str],
+                      task_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        记录已写入磁盘的任务目录，文件大小和时间从磁盘读取；任务已存在时追加或更新其中的文件
+
+        Args:
+            store_id: 任务目录名
+            directory: 任务目录路径
+            file_names: 目录中需要记录的文件名列表
+            task_id: 任务ID
+
+        Returns:
+            Dict[str, Any]: 任务元数据
+        """
+        now = datetime.now().isoformat()
+        files = []
+        for name in file_names:
+            stat = os.stat(os.path.join(directory, os.path.basename(name)))
+            files.append({
+                "name": os.path.basename(name),
+                "size": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_ctime).isoformat(),
+                "last_modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
+            })
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO store_tasks "
+                "(store_id, task_id, directory, created_at, created_date, file_count, total_size, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, 0, 0, ?) "
+                "ON CONFLICT (store_id) DO UPDATE SET task_id = COALESCE(excluded.task_id, task_id)",
+                (store_id, task_id, directory, now, now[:10], now)
+            )
+            self._upsert_files(conn, store_id, files, now)
+        return self.get_task(store_id)
+
+    def get_task(self, store_id: str) -> Optional[Dict[str, Any]]:
+        """
+        按任务目录名获取任务元数据
+
+        Args:
+            store_id: 任务目录名
+
+        Returns:
+            Optional[Dict[str, Any]]: 与metadata.json条目结构一致的任务元数据，不存在时返回None
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM store_tasks WHERE store_id = ?", (store_id,)).fetchone()
+            if row is None:
+                return None
+            return self._task_to_dict(conn, row)
+
+    def get_tasks_by_task_id(self, task_id: str) -> List[Dict[str, Any]]:
+        """
+        按任务ID获取任务元数据
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            List[Dict[str, Any]]: 按创建时间排序的任务元数据列表
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM store_tasks WHERE task_id = ? ORDER BY created_at, store_id", (task_id,)
+            ).fetchall()
+            return [self._task_to_dict(conn, row) for row in rows]
+
+    def list_tasks(self, date: Optional[str] = None, file_name: Optional[str] = None,
+                   limit: int = 100, before: Optional[str] = None) -> Dict[str, Any]:
+        """
+        按创建时间倒序分页列出任务
+
+        使用游标分页，每页只读取索引上的limit行，耗时与任务总数无关
+
+        Args:
+            date: 只列出该日期（YYYY-MM-DD）创建的任务
+            file_name: 只列出包含该文件名的任务
+            limit: 每页数量
+            before: 上一页返回的next_cursor
+
+        Returns:
+            Dict[str, Any]: 包含tasks和next_cursor的字典，没有下一页时next_cursor为None
+        """
+        conditions, params = [], []
+        if date:
+            conditions.append("t.created_date = ?")
+            params.append(date)
+        if file_name:
+            conditions.append("t.store_id IN (SELECT store_id FROM store_files WHERE name = ?)")
+            params.append(file_name)
+        if before:
+            created_at, _, store_id = before.partition('|')
+            conditions.append("(t.created_at, t.store_id) < (?, ?)")
+            params.extend([created_at, store_id])
+        query = "SELECT t.* FROM store_tasks t"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY t.created_at DESC, t.store_id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+            tasks = [self._task_to_dict(conn, row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = f"{last['created_at']}|{last['store_id']}"
+        return {"tasks": tasks, "next_cursor": next_cursor}
+
+    def delete_task(self, store_id: str) -> bool:
+        """
+        删除任务元数据（不删除磁盘上的文件）
+
+        Args:
+            store_id: 任务目录名
+
+        Returns:
+            bool: 任务是否存在
+        """
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM store_tasks WHERE store_id = ?", (store_id,)).rowcount > 0
+
+    def count(self) -> int:
+        """获取任务数量"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM store_tasks").fetchone()[0]
+
+    def _upsert_files(self, conn: sqlite3.Connection, store_id: str, files: List[Dict[str, Any]],
+                      last_modified: str) -> None:
+        """写入文件记录并重新统计任务的文件数量和总大小，与调用方在同一个事务中执行"""
+        conn.executemany(
+            "INSERT OR REPLACE INTO store_files (store_id, name, size, created_at, last_modified, blob_digest) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(store_id, f["name"], f["size"], f["created_at"], f["last_modified"], f.get("blob_digest"))
+             for f in files]
+        )
+        conn.execute(
+            "UPDATE store_tasks SET "
+            "file_count = (SELECT COUNT(*) FROM store_files WHERE store_id = ?), "
+            "total_size = (SELECT COALESCE(SUM(size), 0) FROM store_files WHERE store_id = ?), "
+            "last_modified = ? WHERE store_id = ?",
+            (store_id, store_id, last_modified, store_id)
+        )
+
+    @staticmethod
+    def _task_to_dict(conn: sqlite3.Connection, row: sqlite3.Row) -> Dict[str, Any]:
+        """将任务记录转换为与metadata.json条目结构一致的字典"""
+        files = conn.execute(
+            "SELECT name, size, created_at, last_modified, blob_digest FROM store_files "
+            "WHERE store_id = ? ORDER BY name",
+            (row["store_id"],)
+        ).fetchall()
+        return {
+            "store_id": row["store_id"],
+            "task_id": row["task_id"],
+            "directory": row["directory"],
+            "created_at": row["created_at"],
+            "file_count": row["file_count"],
+            "total_size": row["total_size"],
+            "files": [dict(f) for f in files],
+            "last_modified": row["last_modified"]
+        }
+
+    def _migrate_legacy_metadata(self) -> None:
+        """将旧版metadata.json的内容在一个事务中导入数据库，完成后重命名为metadata.json.migrated"""
+        legacy_path = os.path.join(self.base_dir, "metadata.json")
+        if not os.path.exists(legacy_path):
+            return
+        # 多个worker同时启动时只由一个进程迁移
+        with ProcessLock(os.path.join(self.base_dir, ".migrate.lock")):
+            if not os.path.exists(legacy_path):
+                return
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+
+            with self._connect() as conn:
+                for store_id, entry in legacy.items():
+                    created_at = entry.get("created_at") or datetime.now().isoformat()
+                    last_modified = entry.get("last_modified") or created_at
+                    conn.execute(
+                        "INSERT OR IGNORE INTO store_tasks "
+                        "(store_id, task_id, directory, created_at, created_date, file_count, total_size, last_modified) "
+                        "VALUES (?, ?, ?, ?, ?, 0, 0, ?)",
+                        (store_id, entry.get("task_id"), os.path.join(self.base_dir, store_id),
+                         created_at, created_at[:10], last_modified)
+                    )
+                    files = [
+                        {
+                            "name": f["name"],
+                            "size": f.get("size", 0),
+                            "created_at": f.get("created_at") or created_at,
+                            "last_modified": f.get("last_modified") or created_at
+                        }
+                        for f in entry.get("files", [])
+                    ]
+                    self._upsert_files(conn, store_id, files, last_modified)
+            os.replace(legacy_path, legacy_path + ".migrated")
+            print(f"已将 {legacy_path} 中的 {len(legacy)} 个任务迁移到 {self.db_path}")
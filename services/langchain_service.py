@@ -1,10 +1,24 @@
 import os
 import json
-from typing import Dict, Any, Optional
+import logging
+import time
+import hashlib
+from itertools import groupby
+from typing import Dict, Any, Optional, List, Iterator
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from config import Config
+from services.token_budget import estimate_tokens, split_blocks, split_document, split_by_token_budget
+from services.test_point_separator import normalize_point_content
+from services.metrics import metrics
+from services.tracing import tracer
+from services.batch_output_splitter import (
+    format_batch_points, point_key, split_batch_response, pack_points, missing_points, merge_batch_results,
+    strip_code_fence
+)
+
+logger = logging.getLogger(__name__)
 
 class LangChainService:
     def __init__(self):
@@ -63,10 +77,10 @@ class LangChainService:
             with open(config_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except FileNotFoundError:
-            print(f"警告: 未找到提示词配置文件 {config_path}")
+            logger.warning(f"未找到提示词配置文件 {config_path}")
             return {}
         except json.JSONDecodeError as e:
-            print(f"错误: 提示词配置文件格式不正确 {e}")
+            logger.error(f"提示词配置文件格式不正确 {e}")
             return {}
     
     def create_script_generator_prompt(self) -> PromptTemplate:
@@ -75,11 +89,23 @@ class LangChainService:
         template = config.get('template', '')
         return PromptTemplate.from_template(template)
     
+    def create_script_generator_batch_prompt(self) -> PromptTemplate:
+        """创建批量脚本生成的输出格式提示词模板"""
+        config = self.prompt_configs.get('script_generator_batch', {})
+        template = config.get('template', '')
+        return PromptTemplate.from_template(template)
+    
     def create_test_case_generator_prompt(self) -> PromptTemplate:
         """创建测试案例生成提示词模板"""
         config = self.prompt_configs.get('test_case_generator', {})
         template = config.get('template', '')
         return PromptTemplate.from_template(template)
+
+    def create_test_case_generator_batch_prompt(self) -> PromptTemplate:
+        """创建批量测试案例生成的输出格式提示词模板"""
+        config = self.prompt_configs.get('test_case_generator_batch', {})
+        template = config.get('template', '')
+        return PromptTemplate.from_template(template)
         
 
     
@@ -90,6 +116,152 @@ class LangChainService:
         # 更新变量名从test_case到html_report_content
         return PromptTemplate.from_template(template)
 
+    def create_ai_analysis_delta_prompt(self) -> PromptTemplate:
+        """创建AI增量分析提示词模板"""
+        config = self.prompt_configs.get('ai_analysis_delta', {})
+        template = config.get('template', '')
+        return PromptTemplate.from_template(template)
+
+    def create_ai_analysis_map_prompt(self) -> PromptTemplate:
+        """创建AI分片分析提示词模板"""
+        config = self.prompt_configs.get('ai_analysis_map', {})
+        template = config.get('template', '')
+        return PromptTemplate.from_template(template)
+
+    def create_ai_analysis_reduce_prompt(self) -> PromptTemplate:
+        """创建AI分片分析汇总提示词模板"""
+        config = self.prompt_configs.get('ai_analysis_reduce', {})
+        template = config.get('template', '')
+        return PromptTemplate.from_template(template)
+
+    def get_prompt_version(self, *prompt_keys: str) -> str:
+        """
+        根据提示词模板内容计算提示词版本
+
+        Args:
+            prompt_keys: 提示词配置键名
+
+        Returns:
+            str: 提示词版本标识
+        """
+        digest = hashlib.sha256()
+        for key in prompt_keys:
+            digest.update(self.prompt_configs.get(key, {}).get('template', '').encode('utf-8'))
+            digest.update(b'\0')
+        return f"{'+'.join(prompt_keys)}:{digest.hexdigest()[:12]}"
+
+    def _invoke(self, prompt_key: str, prompt: str):
+        """
+        调用大模型并记录耗时及token数指标
+
+        Args:
+            prompt_key: 提示词类别，作为指标的prompt标签
+            prompt: 格式化后的提示词
+
+        Returns:
+            大模型响应消息
+        """
+        with tracer.span("llm.invoke", provider=Config.MODEL_PROVIDER, prompt=prompt_key) as span:
+            started = time.perf_counter()
+            try:
+                response = self.llm.invoke(prompt)
+            except Exception:
+                self._record_llm_call(prompt_key, "invoke", "error", time.perf_counter() - started)
+                raise
+            self._record_llm_call(prompt_key, "invoke", "success", time.perf_counter() - started)
+            self._record_llm_tokens(prompt_key, prompt, response, span=span)
+            return response
+
+    def _batch(self, prompt_key: str, prompts: List[str], max_concurrency: int) -> list:
+        """
+        并发批量调用大模型并记录指标，耗时按整个批次记录，token数按每个请求记录
+
+        Args:
+            prompt_key: 提示词类别
+            prompts: 格式化后的提示词列表
+            max_concurrency: 并发请求数
+
+        Returns:
+            list: 与prompts顺序一致的响应消息
+        """
+        with tracer.span("llm.batch", provider=Config.MODEL_PROVIDER, prompt=prompt_key,
+                         requests=len(prompts), max_concurrency=max_concurrency) as span:
+            started = time.perf_counter()
+            try:
+                responses = self.llm.batch(prompts, config={"max_concurrency": max_concurrency})
+            except Exception:
+                self._record_llm_call(prompt_key, "batch", "error", time.perf_counter() - started, len(prompts))
+                raise
+            self._record_llm_call(prompt_key, "batch", "success", time.perf_counter() - started, len(prompts))
+            for prompt, response in zip(prompts, responses):
+                self._record_llm_tokens(prompt_key, prompt, response, span=span)
+            return responses
+
+    def _stream(self, prompt_key: str, prompt: str) -> Iterator[str]:
+        """
+        流式调用大模型，记录首个token耗时、总耗时及token数
+
+        Args:
+            prompt_key: 提示词类别
+            prompt: 格式化后的提示词
+
+        Yields:
+            str: 大模型输出的文本片段
+        """
+        labels = {"provider": Config.MODEL_PROVIDER, "prompt": prompt_key}
+        # 生成器跨越多次迭代，span不设为当前span
+        span = tracer.start_span("llm.stream", **labels)
+        started = time.perf_counter()
+        status = "error"
+        parts = []
+        usage = None
+        try:
+            for chunk in self.llm.stream(prompt):
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                if chunk.content:
+                    if not parts:
+                        ttft = time.perf_counter() - started
+                        metrics.observe("llm_time_to_first_token_seconds", ttft, labels)
+                        span.set_attribute("ttft_ms", round(ttft * 1000, 1))
+                    parts.append(chunk.content)
+                    yield chunk.content
+            status = "success"
+        except GeneratorExit:
+            status = "cancelled"
+            raise
+        except Exception as e:
+            span.record_error(e)
+            raise
+        finally:
+            # 客户端中途断开时生成器被关闭，按已输出的部分记录
+            self._record_llm_call(prompt_key, "stream", status, time.perf_counter() - started)
+            self._record_llm_tokens(prompt_key, prompt, None, ''.join(parts), usage, span)
+            span.set_attribute("outcome", status)
+            span.end()
+
+    @staticmethod
+    def _record_llm_call(prompt_key: str, mode: str, status: str, duration: float, requests: int = 1) -> None:
+        """记录大模型调用次数及耗时"""
+        labels = {"provider": Config.MODEL_PROVIDER, "prompt": prompt_key, "mode": mode}
+        metrics.observe("llm_request_duration_seconds", duration, labels)
+        metrics.inc("llm_requests_total", dict(labels, status=status), requests)
+
+    @staticmethod
+    def _record_llm_tokens(prompt_key: str, prompt: str, response, content: str = None, usage: dict = None,
+                           span=None) -> None:
+        """记录输入及输出token数，模型未返回用量时按文本估算；传入span时累加到span属性"""
+        usage = usage or getattr(response, "usage_metadata", None) or {}
+        if content is None:
+            content = getattr(response, "content", "") or ""
+        labels = {"provider": Config.MODEL_PROVIDER, "prompt": prompt_key}
+        prompt_tokens = usage.get("input_tokens") or estimate_tokens(prompt)
+        completion_tokens = usage.get("output_tokens") or estimate_tokens(content)
+        metrics.observe("llm_prompt_tokens", prompt_tokens, labels)
+        metrics.observe("llm_completion_tokens", completion_tokens, labels)
+        if span is not None and span.trace is not None:
+            span.set_attribute("prompt_tokens", span.attributes.get("prompt_tokens", 0) + prompt_tokens)
+            span.set_attribute("completion_tokens", span.attributes.get("completion_tokens", 0) + completion_tokens)
+
     def parse_test_case(self, context: str, input_text: str, prompt_template: str = None) -> str:
         """解析测试用例"""
         # 由于test_case_parser模板已被删除，此方法将不再使用默认模板
@@ -102,11 +274,11 @@ class LangChainService:
         # 简化的chain创建方式
         inputs = {"context": context, "input": input_text}
         formatted_prompt = prompt.format(**inputs)
-        response = self.llm.invoke(formatted_prompt)
+        response = self._invoke("test_case_parser", formatted_prompt)
         return response.content
 
     def generate_test_script(self, test_case: str, prompt_template: str = None) -> str:
-        """生成测试脚本"""
+        """生成测试脚本，去掉输出首尾的代码块标记"""
         if prompt_template:
             # 使用自定义提示词模板
             prompt = PromptTemplate.from_template(prompt_template)
@@ -116,41 +288,410 @@ class LangChainService:
         # 简化的chain创建方式
         inputs = {"factor_combinations": test_case}
         formatted_prompt = prompt.format(**inputs)
-        response = self.llm.invoke(formatted_prompt)
-        return response.content
+        response = self._invoke("script_generator", formatted_prompt)
+        # 与批量生成一致，去掉代码块标记后再返回，写入磁盘的脚本与是否批量生成无关
+        return strip_code_fence(response.content)
+
+    def generate_test_scripts_batched(self, test_cases: List[str], max_points: int = None,
+                                      token_budget: int = None, max_concurrency: int = None,
+                                      max_retries: int = 1) -> List[str]:
+        """
+        批量生成测试脚本
+
+        按上下文预算将多个测试要点打包进同一个提示词，响应按分隔行拆分回各要点；
+        缺失或格式错误的要点只对这些要点重新批量请求，重试后仍失败的逐个单独生成
 
-    def generate_test_cases_from_rules(self, requirements: str) -> str:
-        """根据需求生成测试用例"""
+        Args:
+            test_cases: 测试要点内容列表
+            max_points: 每个批次最多包含的要点数，默认使用Config.GENERATION_BATCH_MAX_POINTS
+            token_budget: 单次请求的上下文token预算，默认使用Config.GENERATION_TOKEN_BUDGET
+            max_concurrency: 批次并发请求数，默认使用Config.GENERATION_MAX_CONCURRENCY
+            max_retries: 缺失要点重新批量请求的次数
+
+        Returns:
+            List[str]: 与test_cases顺序一致的测试脚本
+        """
+        max_points = max_points or Config.GENERATION_BATCH_MAX_POINTS
+        token_budget = token_budget or Config.GENERATION_TOKEN_BUDGET
+        max_concurrency = max_concurrency or Config.GENERATION_MAX_CONCURRENCY
+        template_tokens = estimate_tokens(
+            self.prompt_configs.get('script_generator', {}).get('template', '') +
+            self.prompt_configs.get('script_generator_batch', {}).get('template', '')
+        )
+
+        results: Dict[int, str] = {}
+        pending = list(range(len(test_cases)))
+        singles: List[int] = []
+        for attempt in range(max_retries + 1):
+            batches = [
+                [pending[i] for i in batch]
+                for batch in pack_points([test_cases[i] for i in pending], template_tokens, token_budget,
+                                         Config.GENERATION_OUTPUT_TOKENS_PER_POINT, max_points)
+            ]
+            # 只有一个要点的批次直接使用单要点提示词
+            singles += [batch[0] for batch in batches if len(batch) == 1]
+            multi = [batch for batch in batches if len(batch) > 1]
+            if not multi:
+                pending = []
+                break
+            responses = self._batch(
+                "script_generator",
+                [self._format_script_batch_prompt([test_cases[i] for i in batch]) for batch in multi],
+                max_concurrency
+            )
+            parsed = [(batch, split_batch_response(response.content, len(batch)))
+                      for batch, response in zip(multi, responses)]
+            results.update(merge_batch_results(parsed))
+            pending = [i for batch, sections in parsed for i in missing_points(batch, sections)]
+            if not pending:
+                break
+            logger.info(f"批量生成测试脚本: {len(pending)} 个要点的输出缺失或格式错误"
+                        f"{'，重新请求' if attempt < max_retries else '，改为逐个生成'}")
+
+        # 单独成批及重试后仍失败的要点逐个生成
+        for i in sorted(singles + pending):
+            results[i] = self.generate_test_script(test_cases[i])
+        return [results[i] for i in range(len(test_cases))]
+
+    def _format_script_batch_prompt(self, test_cases: List[str]) -> str:
+        """格式化批量生成测试脚本的提示词"""
+        prompt = self.create_script_generator_prompt().format(factor_combinations=format_batch_points(test_cases))
+        batch_prompt = self.create_script_generator_batch_prompt().format(
+            point_count=len(test_cases),
+            point_keys='、'.join(point_key(i) for i in range(1, len(test_cases) + 1))
+        )
+        return f"{prompt}\n\n{batch_prompt}"
+
+    def generate_test_cases_from_rules(self, requirements: str, chunk_tokens: int = None,
+                                       max_concurrency: int = None) -> str:
+        """
+        根据需求生成测试用例
+
+        需求文档超出分片预算时按顶层章节切分为多个分片并发生成，每个分片附带文档前言及所属标题路径，
+        再按分片顺序合并各分片的测试用例并去掉重复行
+
+        Args:
+            requirements: 需求文档内容
+            chunk_tokens: 每个分片的token数，默认使用Config.TEST_CASE_CHUNK_TOKENS
+            max_concurrency: 分片并发生成数，默认使用Config.GENERATION_MAX_CONCURRENCY
+
+        Returns:
+            str: 测试用例，每行一条
+        """
+        chunk_tokens = chunk_tokens or Config.TEST_CASE_CHUNK_TOKENS
+        max_concurrency = max_concurrency or Config.GENERATION_MAX_CONCURRENCY
         prompt = self.create_test_case_generator_prompt()
-        # 简化的chain创建方式
-        inputs = {"requirements": requirements}
-        formatted_prompt = prompt.format(**inputs)
-        response = self.llm.invoke(formatted_prompt)
-        return response.content
+        if estimate_tokens(requirements) <= chunk_tokens:
+            # 简化的chain创建方式
+            inputs = {"requirements": requirements}
+            formatted_prompt = prompt.format(**inputs)
+            response = self._invoke("test_case_generator", formatted_prompt)
+            return response.content
+
+        chunks = split_document(requirements, chunk_tokens)
+        logger.info(f"需求文档约 {estimate_tokens(requirements)} 个token，切分为 {len(chunks)} 个分片并发生成测试用例")
+        responses = self._batch(
+            "test_case_generator",
+            [prompt.format(requirements=chunk) for chunk in chunks],
+            max_concurrency
+        )
+        return self._merge_test_case_outputs([response.content for response in responses])
+
+    def generate_test_cases_batched(self, requirements: List[str], contexts: Optional[List[str]] = None,
+                                    max_points: int = None, token_budget: int = None,
+                                    max_concurrency: int = None, max_retries: int = 1) -> List[str]:
+        """
+        按章节批量生成多条需求的测试用例
+
+        上下文相同（属于同一章节）的相邻需求按上下文预算打包进同一个提示词，章节上下文放在带编号的需求之前，
+        所有批次并发请求，响应按分隔行拆分回各条需求；缺失的需求重新批量请求，重试后仍缺失的逐条并发生成
+
+        Args:
+            requirements: 需求内容列表
+            contexts: 与requirements顺序一致的章节上下文（如标题路径），为空时不附加上下文
+            max_points: 每个批次最多包含的需求数，默认使用Config.GENERATION_BATCH_MAX_POINTS
+            token_budget: 单次请求的上下文token预算，默认使用Config.GENERATION_TOKEN_BUDGET
+            max_concurrency: 批次并发请求数，默认使用Config.GENERATION_MAX_CONCURRENCY
+            max_retries: 缺失需求重新批量请求的次数
+
+        Returns:
+            List[str]: 与requirements顺序一致的测试用例，每行一条
+        """
+        contexts = contexts or [""] * len(requirements)
+        max_points = max_points or Config.GENERATION_BATCH_MAX_POINTS
+        token_budget = token_budget or Config.GENERATION_TOKEN_BUDGET
+        max_concurrency = max_concurrency or Config.GENERATION_MAX_CONCURRENCY
+        template_tokens = estimate_tokens(
+            self.prompt_configs.get('test_case_generator', {}).get('template', '') +
+            self.prompt_configs.get('test_case_generator_batch', {}).get('template', '')
+        )
+
+        results: Dict[int, str] = {}
+        pending = list(range(len(requirements)))
+        singles: List[int] = []
+        for attempt in range(max_retries + 1):
+            batches = []
+            for context, members in groupby(pending, key=lambda i: contexts[i]):
+                members = list(members)
+                batches += [
+                    [members[i] for i in batch]
+                    for batch in pack_points([requirements[i] for i in members],
+                                             template_tokens + estimate_tokens(context), token_budget,
+                                             Config.GENERATION_OUTPUT_TOKENS_PER_POINT, max_points)
+                ]
+            # 只有一条需求的批次直接使用单条需求的提示词
+            singles += [batch[0] for batch in batches if len(batch) == 1]
+            multi = [batch for batch in batches if len(batch) > 1]
+            if not multi:
+                pending = []
+                break
+            responses = self._batch(
+                "test_case_generator",
+                [self._format_test_case_batch_prompt(contexts[batch[0]], [requirements[i] for i in batch])
+                 for batch in multi],
+                max_concurrency
+            )
+            parsed = [
+                (batch, split_batch_response(response.content, len(batch), lambda section: bool(section.strip())))
+                for batch, response in zip(multi, responses)
+            ]
+            results.update(merge_batch_results(parsed))
+            pending = [i for batch, sections in parsed for i in missing_points(batch, sections)]
+            if not pending:
+                break
+            logger.info(f"批量生成测试用例: {len(pending)} 条需求的输出缺失"
+                        f"{'，重新请求' if attempt < max_retries else '，改为逐条生成'}")
+
+        # 单独成批及重试后仍缺失的需求逐条并发生成
+        remaining = sorted(singles + pending)
+        if remaining:
+            prompt = self.create_test_case_generator_prompt()
+            responses = self._batch(
+                "test_case_generator",
+                [prompt.format(requirements=self._with_context(contexts[i], requirements[i])) for i in remaining],
+                max_concurrency
+            )
+            for i, response in zip(remaining, responses):
+                results[i] = response.content
+        return [results[i] for i in range(len(requirements))]
+
+    def _format_test_case_batch_prompt(self, context: str, requirements: List[str]) -> str:
+        """格式化按章节批量生成测试用例的提示词"""
+        prompt = self.create_test_case_generator_prompt().format(
+            requirements=self._with_context(context, format_batch_points(requirements))
+        )
+        batch_prompt = self.create_test_case_generator_batch_prompt().format(
+            point_count=len(requirements),
+            point_keys='、'.join(point_key(i) for i in range(1, len(requirements) + 1))
+        )
+        return f"{prompt}\n\n{batch_prompt}"
+
+    @staticmethod
+    def _with_context(context: str, requirements: str) -> str:
+        """在需求内容之前附加章节上下文"""
+        return f"{context}\n{requirements}" if context else requirements
+
+    @staticmethod
+    def _merge_test_case_outputs(outputs: List[str]) -> str:
+        """按分片顺序合并各分片生成的测试用例，归一化后相同的行只保留第一次出现的"""
+        seen = set()
+        lines = []
+        for output in outputs:
+            for line in (output or "").split('\n'):
+                key = normalize_point_content(line)
+                if key and key not in seen:
+                    seen.add(key)
+                    lines.append(line.strip())
+        return '\n'.join(lines)
 
     def analyze_test_results(self, test_report: str, execution_result, prompt_template: str = None) -> str:
         """分析测试结果"""
         try:
-            if prompt_template:
-                # 使用自定义提示词模板
-                prompt = PromptTemplate.from_template(prompt_template)
-            else:
-                # 使用默认提示词模板
-                prompt = self.create_ai_analysis_prompt()
-            # 简化的chain创建方式
-            inputs = {
-                "html_report_content": test_report,
-                "success": execution_result.success,
-                "output": execution_result.output,
-                "error": execution_result.error or ""
-            }
-            formatted_prompt = prompt.format(**inputs)
-            response = self.llm.invoke(formatted_prompt)
+            formatted_prompt = self._format_ai_analysis_prompt(test_report, execution_result, prompt_template)
+            response = self._invoke("ai_analysis", formatted_prompt)
             return response.content
         except Exception as e:
-            print(f"分析测试结果时出错: {e}")
+            logger.error(f"分析测试结果时出错: {e}")
             raise
 
+    def stream_analyze_test_results(self, test_report: str, execution_result,
+                                    prompt_template: str = None) -> Iterator[str]:
+        """
+        流式分析测试结果，逐段返回大模型输出的文本
+
+        Args:
+            test_report: 测试报告内容
+            execution_result: 测试执行结果
+            prompt_template: 自定义提示词模板
+
+        Yields:
+            str: 大模型输出的文本片段
+        """
+        formatted_prompt = self._format_ai_analysis_prompt(test_report, execution_result, prompt_template)
+        yield from self._stream("ai_analysis", formatted_prompt)
+
+    def _format_ai_analysis_prompt(self, test_report: str, execution_result, prompt_template: str = None) -> str:
+        """格式化AI分析提示词"""
+        if prompt_template:
+            # 使用自定义提示词模板
+            prompt = PromptTemplate.from_template(prompt_template)
+        else:
+            # 使用默认提示词模板
+            prompt = self.create_ai_analysis_prompt()
+        # 简化的chain创建方式
+        inputs = {
+            "html_report_content": test_report,
+            "success": execution_result.success,
+            "output": execution_result.output,
+            "error": execution_result.error or ""
+        }
+        with tracer.span("prompt.format", prompt="ai_analysis", report_chars=len(test_report or "")):
+            return prompt.format(**inputs)
+
+    def analyze_test_results_delta(self, delta_report: str, baseline_analysis: str, execution_result) -> str:
+        """
+        增量分析测试结果
+
+        只将两次运行之间的变化及基线分析结论交给大模型，输出与analyze_test_results相同的四部分结构
+
+        Args:
+            delta_report: 两次运行之间的变化明细
+            baseline_analysis: 基线运行的分析结论
+            execution_result: 测试执行结果
+
+        Returns:
+            str: 更新后的分析结果
+        """
+        try:
+            prompt = self.create_ai_analysis_delta_prompt()
+            formatted_prompt = prompt.format(
+                baseline_analysis=baseline_analysis,
+                delta_report=delta_report,
+                success=execution_result.success,
+                error=execution_result.error or ""
+            )
+            response = self._invoke("ai_analysis_delta", formatted_prompt)
+            return response.content
+        except Exception as e:
+            logger.error(f"增量分析测试结果时出错: {e}")
+            raise
+
+    def needs_chunked_analysis(self, test_report: str, token_budget: int = None) -> bool:
+        """判断测试报告是否超出单次分析的token预算"""
+        token_budget = token_budget or Config.ANALYSIS_TOKEN_BUDGET
+        template_tokens = estimate_tokens(self.prompt_configs.get('ai_analysis', {}).get('template', ''))
+        return estimate_tokens(test_report) + template_tokens > token_budget
+
+    def analyze_test_results_chunked(self, test_report: str, execution_result,
+                                     chunk_tokens: int = None, max_concurrency: int = None,
+                                     token_budget: int = None) -> str:
+        """
+        分片并行分析测试结果（map-reduce）
+
+        将报告按token预算切分为多个分片并发分析，再将各分片结论合并为
+        与analyze_test_results相同的四部分结构
+
+        Args:
+            test_report: 提取后的测试报告文本
+            execution_result: 测试执行结果
+            chunk_tokens: 每个分片的token数，默认使用Config.ANALYSIS_CHUNK_TOKENS
+            max_concurrency: 分片并发分析数，默认使用Config.ANALYSIS_MAX_CONCURRENCY
+            token_budget: 单次请求的token预算，默认使用Config.ANALYSIS_TOKEN_BUDGET
+
+        Returns:
+            str: 合并后的分析结果
+        """
+        try:
+            formatted_prompt = self._build_chunked_reduce_prompt(
+                test_report, execution_result, chunk_tokens, max_concurrency, token_budget)
+            if formatted_prompt is None:
+                return self.analyze_test_results(test_report, execution_result)
+            response = self._invoke("ai_analysis_reduce", formatted_prompt)
+            return response.content
+        except Exception as e:
+            logger.error(f"分片分析测试结果时出错: {e}")
+            raise
+
+    def stream_analyze_test_results_chunked(self, test_report: str, execution_result,
+                                            chunk_tokens: int = None, max_concurrency: int = None,
+                                            token_budget: int = None) -> Iterator[str]:
+        """
+        分片并行分析测试结果，并流式返回汇总阶段的输出
+
+        Args:
+            test_report: 提取后的测试报告文本
+            execution_result: 测试执行结果
+            chunk_tokens: 每个分片的token数
+            max_concurrency: 分片并发分析数
+            token_budget: 单次请求的token预算
+
+        Yields:
+            str: 汇总阶段大模型输出的文本片段
+        """
+        formatted_prompt = self._build_chunked_reduce_prompt(
+            test_report, execution_result, chunk_tokens, max_concurrency, token_budget)
+        if formatted_prompt is None:
+            yield from self.stream_analyze_test_results(test_report, execution_result)
+            return
+        yield from self._stream("ai_analysis_reduce", formatted_prompt)
+
+    def _build_chunked_reduce_prompt(self, test_report: str, execution_result,
+                                     chunk_tokens: int = None, max_concurrency: int = None,
+                                     token_budget: int = None) -> Optional[str]:
+        """执行分片分析的map阶段，返回格式化后的汇总提示词；报告为空时返回None"""
+        chunk_tokens = chunk_tokens or Config.ANALYSIS_CHUNK_TOKENS
+        max_concurrency = max_concurrency or Config.ANALYSIS_MAX_CONCURRENCY
+        token_budget = token_budget or Config.ANALYSIS_TOKEN_BUDGET
+        error = execution_result.error or ""
+
+        with tracer.span("prompt.split", prompt="ai_analysis_map") as span:
+            chunks = split_by_token_budget(split_blocks(test_report), chunk_tokens)
+            span.set_attribute("chunks", len(chunks))
+        if not chunks:
+            return None
+
+        # map：各分片并发分析
+        partials = self._map_analysis_chunks(chunks, execution_result.success, error, max_concurrency)
+
+        # 局部结论仍超出预算时，逐层合并直到能放入一次汇总请求
+        reduce_template_tokens = estimate_tokens(
+            self.prompt_configs.get('ai_analysis_reduce', {}).get('template', ''))
+        while len(partials) > 1 and \
+                estimate_tokens('\n\n'.join(partials)) + reduce_template_tokens > token_budget:
+            groups = split_by_token_budget(partials, max(chunk_tokens, token_budget - reduce_template_tokens))
+            if len(groups) >= len(partials):
+                break
+            partials = self._map_analysis_chunks(groups, execution_result.success, error, max_concurrency)
+
+        # reduce：合并为四部分结构
+        findings = '\n\n'.join(
+            f"【分片 {i}/{len(partials)}】\n{partial}" for i, partial in enumerate(partials, 1)
+        )
+        prompt = self.create_ai_analysis_reduce_prompt()
+        return prompt.format(
+            partial_findings=findings,
+            chunk_total=len(partials),
+            success=execution_result.success,
+            error=error
+        )
+
+    def _map_analysis_chunks(self, chunks: List[str], success: bool, error: str,
+                             max_concurrency: int) -> List[str]:
+        """并发分析各报告分片，返回各分片的局部结论"""
+        prompt = self.create_ai_analysis_map_prompt()
+        formatted_prompts = [
+            prompt.format(
+                report_chunk=chunk,
+                chunk_index=i,
+                chunk_total=len(chunks),
+                success=success,
+                error=error
+            )
+            for i, chunk in enumerate(chunks, 1)
+        ]
+        responses = self._batch("ai_analysis_map", formatted_prompts, max_concurrency)
+        return [response.content for response in responses]
+
     def extract_test_cases_from_excel(self, file_path: str) -> str:
         """从Excel文件中提取测试用例"""
         # 这里应该实现Excel文件解析逻辑
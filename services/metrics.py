@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标模块
+以计数器、直方图和仪表记录接口耗时、大模型调用、hrp执行、报告扫描、文档导入及缓存命中等指标，
+按Prometheus文本格式输出；记录指标只在内存中累加，热路径开销可以忽略。
+多个worker各自定期把指标快照写入共享目录，任意worker输出/metrics时合并所有存活worker的快照
+"""
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+# 默认直方图分桶（秒），覆盖毫秒级接口到数分钟的大模型调用及测试执行
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# token数分桶
+TOKEN_BUCKETS = (64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str) -> None:
+        """注册计数器"""
+        self._register(name, "counter", help_text)
+
+    def gauge(self, name: str, help_text: str) -> None:
+        """注册仪表"""
+        self._register(name, "gauge", help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """注册直方图"""
+        self._register(name, "histogram", help_text, list(buckets))
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, amount: float = 1) -> None:
+        """计数器累加"""
+        key = self._label_key(labels)
+        with self._lock:
+            series = self._metrics[name]["series"]
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        """设置仪表的值，也用于同步其他组件自行累计的计数"""
+        key = self._label_key(labels)
+        with self._lock:
+            self._metrics[name]["series"][key] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        """直方图记录一个观测值"""
+        key = self._label_key(labels)
+        with self._lock:
+            metric = self._metrics[name]
+            series = metric["series"].get(key)
+            if series is None:
+                # 各分桶的计数、总和及观测次数
+                series = metric["series"][key] = [[0] * len(metric["buckets"]), 0.0, 0]
+            index = bisect.bisect_left(metric["buckets"], value)
+            if index < len(metric["buckets"]):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def timer(self, name: str, labels: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        记录代码块耗时到直方图
+
+        产出的字典即为标签，代码块中可以补充或修改标签（例如退出码）
+        """
+        labels = dict(labels or {})
+        started = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(name, time.perf_counter() - started, labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取可以JSON序列化的指标快照"""
+        with self._lock:
+            return {
+                name: {
+                    "type": metric["type"],
+                    "help": metric["help"],
+                    "buckets": metric["buckets"],
+                    "series": [[list(key), json.loads(json.dumps(value))] for key, value in metric["series"].items()]
+                }
+                for name, metric in self._metrics.items()
+            }
+
+    @staticmethod
+    def merge(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        合并多个worker的指标快照，计数器、仪表及直方图的各项数值相加
+
+        Args:
+            snapshots: 指标快照列表
+
+        Returns:
+            Dict[str, Any]: 合并后的快照
+        """
+        merged: Dict[str, Any] = {}
+        for snapshot in snapshots:
+            for name, metric in snapshot.items():
+                target = merged.setdefault(name, dict(metric, series={}))
+                for key, value in metric["series"]:
+                    key = tuple(tuple(pair) for pair in key)
+                    existing = target["series"].get(key)
+                    if existing is None:
+                        target["series"][key] = json.loads(json.dumps(value))
+                    elif metric["type"] == "histogram":
+                        existing[0] = [a + b for a, b in zip(existing[0], value[0])]
+                        existing[1] += value[1]
+                        existing[2] += value[2]
+                    else:
+                        target["series"][key] = existing + value
+        for metric in merged.values():
+            metric["series"] = [[list(key), value] for key, value in metric["series"].items()]
+        return merged
+
+    @staticmethod
+    def render(snapshot: Dict[str, Any]) -> str:
+        """
+        按Prometheus文本格式输出指标快照
+
+        Args:
+            snapshot: 指标快照
+
+        Returns:
+            str: Prometheus文本格式的指标
+        """
+        lines = []
+        for name in sorted(snapshot):
+            metric = snapshot[name]
+            if not metric["series"]:
+                continue
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for key, value in sorted(metric["series"], key=lambda item: item[0]):
+                labels = [(k, v) for k, v in key]
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(metric["buckets"], counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, directory: str) -> None:
+        """将当前进程的指标快照写入共享目录，文件名为进程号"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def remove_snapshot(self, directory: str) -> None:
+        """删除当前进程的指标快照"""
+        try:
+            os.remove(os.path.join(directory, f"{os.getpid()}.json"))
+        except OSError:
+            pass
+
+    def collect(self, directory: Optional[str] = None, max_age: float = 60) -> Dict[str, Any]:
+        """
+        获取所有存活worker合并后的指标快照
+
+        Args:
+            directory: 快照共享目录，为空时只返回当前进程的指标
+            max_age: 超过该秒数未更新的快照视为已退出的worker，不参与合并
+
+        Returns:
+            Dict[str, Any]: 合并后的快照
+        """
+        snapshots = [self.snapshot()]
+        if directory and os.path.isdir(directory):
+            own = f"{os.getpid()}.json"
+            now = time.time()
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if name == own or not name.endswith(".json"):
+                    continue
+                try:
+                    if now - os.path.getmtime(path) > max_age:
+                        os.remove(path)
+                        continue
+                    with open(path, 'r', encoding='utf-8') as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return self.merge(snapshots)
+
+    def _register(self, name: str, metric_type: str, help_text: str, buckets: Optional[list] = None) -> None:
+        """注册指标，重复注册时保留已有数据"""
+        with self._lock:
+            self._metrics.setdefault(name, {"type": metric_type, "help": help_text, "buckets": buckets, "series": {}})
+
+    @staticmethod
+    def _label_key(labels: Optional[Dict[str, Any]]) -> tuple:
+        """将标签转换为有序元组作为序列键"""
+        if not labels:
+            return ()
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    """格式化标签"""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels) + "}"
+
+
+def _escape_label(value: str) -> str:
+    """转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    """格式化数值，整数不带小数点"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """
+    获取请求匹配的路由模板作为指标标签，路径参数替换为{参数名}，避免按具体ID产生大量序列
+
+    Args:
+        scope: 路由匹配后的ASGI scope
+
+    Returns:
+        str: 路由模板，未匹配任何路由时返回unmatched
+    """
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    if "endpoint" not in scope:
+        return "unmatched"
+    path = scope["path"]
+    for name, value in (scope.get("path_params") or {}).items():
+        value = str(value)
+        if value and path.endswith(value):
+            # 静态文件挂载的path参数位于路径末尾
+            path = path[:len(path) - len(value)] + "{" + name + "}"
+        else:
+            path = path.replace(f"/{value}", "/{" + name + "}", 1)
+    return path
+
+
+class MetricsMiddleware:
+    """记录接口请求耗时的ASGI中间件，按请求方法、路由模板和响应状态码统计，流式响应在发送完毕后才计入"""
+
+    def __init__(self, app, registry: "MetricsRegistry"):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.registry.observe("http_request_duration_seconds", time.perf_counter() - started, {
+                "method": scope["method"],
+                "route": route_template(scope),
+                "status": status[0]
+            })
+
+
+# 进程内共享的指标注册表，各服务直接导入使用
+metrics = MetricsRegistry()
+metrics.histogram("http_request_duration_seconds", "接口请求耗时（含准入排队）")
+metrics.histogram("llm_request_duration_seconds", "大模型调用耗时")
+metrics.histogram("llm_time_to_first_token_seconds", "流式大模型调用的首个token耗时")
+metrics.histogram("llm_prompt_tokens", "大模型调用的输入token数", TOKEN_BUCKETS)
+metrics.histogram("llm_completion_tokens", "大模型调用的输出token数", TOKEN_BUCKETS)
+metrics.counter("llm_requests_total", "大模型调用次数")
+metrics.histogram("hrp_run_duration_seconds", "hrp测试执行耗时")
+metrics.counter("hrp_runs_total", "hrp测试执行次数")
+metrics.histogram("report_scan_duration_seconds", "测试报告目录扫描及报告提取耗时")
+metrics.histogram("document_ingestion_duration_seconds", "Excel、docx等文档提取耗时")
+metrics.counter("cache_requests_total", "共享缓存查询次数")
+metrics.gauge("cache_hit_ratio", "共享缓存命中率")
+metrics.counter("single_flight_requests_total", "请求合并统计")
+metrics.gauge("admission_running", "准入控制中执行中的请求数")
+metrics.gauge("admission_queue_depth", "准入控制中排队的请求数")
+metrics.counter("admission_requests_total", "准入控制结果统计")
+metrics.counter("admission_queue_wait_seconds_total", "准入控制排队总耗时")
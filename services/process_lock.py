@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨进程文件锁模块
+uvicorn多worker或同一主机上的多个副本共享数据目录时，用锁文件保护目录和文件的读-改-写操作；
+同一进程内的多个线程同样互斥
+"""
+import os
+import time
+import threading
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# 同一锁文件在进程内共享一个线程锁，flock对同一进程的不同文件描述符不保证互斥
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+class ProcessLock:
+    """基于锁文件的跨进程互斥锁"""
+
+    def __init__(self, path: str, poll_interval: float = 0.05):
+        """
+        初始化跨进程锁
+
+        Args:
+            path: 锁文件路径，所在目录不存在时自动创建
+            poll_interval: 阻塞等待时的轮询间隔（秒），仅在不支持阻塞锁的平台上使用
+        """
+        self.path = os.path.abspath(path)
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        with _thread_locks_guard:
+            self._thread_lock = _thread_locks.setdefault(self.path, threading.Lock())
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        获取锁
+
+        Args:
+            blocking: 锁被占用时是否等待
+            timeout: 最长等待秒数，为空时一直等待
+
+        Returns:
+            bool: 是否获得锁
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        acquired = self._thread_lock.acquire(True, timeout) if blocking and timeout is not None \
+            else self._thread_lock.acquire(blocking)
+        if not acquired:
+            return False
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            while True:
+                if self._try_lock(fd, blocking and deadline is None):
+                    self._fd = fd
+                    return True
+                if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                    os.close(fd)
+                    self._thread_lock.release()
+                    return False
+                time.sleep(self.poll_interval)
+        except Exception:
+            self._thread_lock.release()
+            raise
+
+    def release(self) -> None:
+        """释放锁"""
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+            self._thread_lock.release()
+
+    def __enter__(self) -> "ProcessLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
+
+    @staticmethod
+    def _try_lock(fd: int, wait: bool) -> bool:
+        """尝试对文件描述符加排他锁，wait为True且平台支持时阻塞等待"""
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                return False
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
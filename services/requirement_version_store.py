@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+需求版本存储模块
+记录需求文档每个段落、表格行和Excel行的指纹及其生成的测试用例，
+文档修订后与已存储版本比对，只有新增和修改的需求需要重新生成测试用例，删除的需求对应的测试用例被停用
+"""
+import os
+import time
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+from services.test_point_separator import compute_point_id, normalize_point_content
+
+
+def fingerprint_units(units: List[Dict[str, Any]]) -> List[str]:
+    """
+    计算需求单元的指纹
+
+    指纹只与归一化后的内容有关，段落移动位置或格式微调不会改变指纹；
+    同一文档中内容相同的单元按出现次序区分
+
+    Args:
+        units: 需求单元列表，每个单元包含content字段
+
+    Returns:
+        List[str]: 与units顺序一致的指纹列表
+    """
+    occurrences: Dict[str, int] = {}
+    fingerprints = []
+    for unit in units:
+        base = compute_point_id(unit["content"])
+        occurrence = occurrences.get(base, 0)
+        occurrences[base] = occurrence + 1
+        fingerprints.append(compute_point_id(unit["content"], occurrence=occurrence) if occurrence else base)
+    return fingerprints
+
+
+def _bigrams(content: str) -> set:
+    """获取归一化内容的字符二元组集合"""
+    text = normalize_point_content(content)
+    return {text[i:i + 2] for i in range(max(len(text) - 1, 1))}
+
+
+def diff_units(old_units: List[Dict[str, Any]], old_fingerprints: List[str],
+               new_units: List[Dict[str, Any]], new_fingerprints: List[str],
+               similarity_threshold: float = 0.5) -> Dict[str, List]:
+    """
+    比对新旧两个版本的需求单元
+
+    指纹在两个版本中都存在的单元视为未变化（包括仅移动位置的单元）；
+    其余单元中内容足够相似的新旧单元配对为修改，剩下的为新增或删除
+
+    Args:
+        old_units: 已存储版本的需求单元列表
+        old_fingerprints: 已存储版本的指纹列表
+        new_units: 新版本的需求单元列表
+        new_fingerprints: 新版本的指纹列表
+        similarity_threshold: 判定为修改的最小字符二元组Jaccard相似度
+
+    Returns:
+        Dict[str, List]: added为新增单元下标，removed为删除单元下标，
+        changed为 (旧下标, 新下标) 列表，unchanged为新版本中未变化单元的下标
+    """
+    old_set = set(old_fingerprints)
+    new_set = set(new_fingerprints)
+    unchanged = [i for i, fingerprint in enumerate(new_fingerprints) if fingerprint in old_set]
+    added = [i for i, fingerprint in enumerate(new_fingerprints) if fingerprint not in old_set]
+    removed = [i for i, fingerprint in enumerate(old_fingerprints) if fingerprint not in new_set]
+
+    # 按相似度从高到低贪心配对，相似度相同时优先配对位置相近的单元
+    candidates = []
+    if added and removed:
+        old_bigrams = {i: _bigrams(old_units[i]["content"]) for i in removed}
+        for new in added:
+            new_bigrams = _bigrams(new_units[new]["content"])
+            for old, bigrams in old_bigrams.items():
+                similarity = len(new_bigrams & bigrams) / len(new_bigrams | bigrams)
+                if similarity >= similarity_threshold:
+                    candidates.append((-similarity, abs(old - new), old, new))
+    changed = []
+    paired_old, paired_new = set(), set()
+    for _, _, old, new in sorted(candidates):
+        if old not in paired_old and new not in paired_new:
+            paired_old.add(old)
+            paired_new.add(new)
+            changed.append((old, new))
+    return {
+        "added": [i for i in added if i not in paired_new],
+        "removed": [i for i in removed if i not in paired_old],
+        "changed": sorted(changed, key=lambda pair: pair[1]),
+        "unchanged": unchanged
+    }
+
+
+class RequirementVersionStore:
+    """需求版本存储"""
+
+    def __init__(self, db_path: str = "file_store/requirement_versions.db"):
+        """
+        初始化需求版本存储
+
+        Args:
+            db_path: SQLite数据库文件路径
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """创建数据库连接，每次操作使用独立连接以支持多线程"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        """创建数据表"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS requirement_documents (
+                    document_id TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    sha256 TEXT,
+                    unit_count INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS requirement_units (
+                    document_id TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    location TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    test_cases TEXT,
+                    status TEXT NOT NULL,
+                    version_added INTEGER NOT NULL,
+                    version_retired INTEGER,
+                    PRIMARY KEY (document_id, fingerprint)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_requirement_units_status "
+                "ON requirement_units (document_id, status, position)"
+            )
+
+    def get_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取需求文档的当前版本信息
+
+        Args:
+            document_id: 需求文档ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 包含version、sha256、unit_count和updated_at的字典，文档不存在时返回None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT document_id, version, sha256, unit_count, updated_at "
+                "FROM requirement_documents WHERE document_id = ?",
+                (document_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_units(self, document_id: str, include_retired: bool = False) -> List[Dict[str, Any]]:
+        """
+        获取需求文档的需求单元及其测试用例
+
+        Args:
+            document_id: 需求文档ID
+            include_retired: 是否包含已删除需求的停用单元
+
+        Returns:
+            List[Dict[str, Any]]: 按文档顺序排列的需求单元，停用单元排在最后
+        """
+        query = ("SELECT fingerprint, position, kind, location, content, test_cases, status, "
+                 "version_added, version_retired FROM requirement_units WHERE document_id = ?")
+        if not include_retired:
+            query += " AND status = 'active'"
+        query += " ORDER BY status = 'retired', position"
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, (document_id,)).fetchall()]
+
+    def save_revision(self, document_id: str, units: List[Dict[str, Any]], fingerprints: List[str],
+                      test_cases: Dict[str, str], retired: List[str], sha256: Optional[str] = None) -> int:
+        """
+        在同一个事务中保存文档的新版本
+
+        所有单元按新版本更新位置，新增和修改的单元写入新生成的测试用例，删除和被修改的旧单元标记为停用
+
+        Args:
+            document_id: 需求文档ID
+            units: 新版本的需求单元列表
+            fingerprints: 与units顺序一致的指纹列表
+            test_cases: 本次生成的指纹到测试用例的映射
+            retired: 需要停用的旧单元指纹列表
+            sha256: 文档内容的sha256
+
+        Returns:
+            int: 新版本号
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT version FROM requirement_documents WHERE document_id = ?", (document_id,)
+            ).fetchone()
+            version = (row["version"] if row else 0) + 1
+            conn.executemany(
+                "UPDATE requirement_units SET status = 'retired', version_retired = ? "
+                "WHERE document_id = ? AND fingerprint = ?",
+                [(version, document_id, fingerprint) for fingerprint in retired]
+            )
+            for position, (unit, fingerprint) in enumerate(zip(units, fingerprints)):
+                if fingerprint in test_cases:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO requirement_units "
+                        "(document_id, fingerprint, position, kind, location, content, test_cases, status, "
+                        "version_added, version_retired) VALUES (?, ?, ?, ?, ?, ?, ?, 'active', ?, NULL)",
+                        (document_id, fingerprint, position, unit["kind"], unit["location"], unit["content"],
+                         test_cases[fingerprint], version)
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE requirement_units SET position = ?, location = ? "
+                        "WHERE document_id = ? AND fingerprint = ?",
+                        (position, unit["location"], document_id, fingerprint)
+                    )
+            conn.execute(
+                "INSERT OR REPLACE INTO requirement_documents "
+                "(document_id, version, sha256, unit_count, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (document_id, version, sha256, len(units), now)
+            )
+        return version
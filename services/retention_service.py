@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试产物保留策略模块
+按目录配置的保留天数、数量和总大小，将results/、reports/、allure-results/、allure-report/中
+超出策略的旧运行压缩归档，归档时提取结构化摘要写入索引以便继续查询；
+归档过程按字节限速读取，避免影响正在执行的测试
+"""
+import os
+import json
+import time
+import shutil
+import sqlite3
+import tarfile
+import threading
+import fnmatch
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+from services.test_report_extractor import TestReportExtractor
+from services.process_lock import ProcessLock
+
+# 默认保留策略，键为被管理的目录
+DEFAULT_RETENTION_POLICIES: Dict[str, Dict[str, Any]] = {
+    "results": {"max_age_days": 30, "max_count": 200, "max_size_mb": 2048},
+    "reports": {"max_age_days": 30, "max_count": 500, "max_size_mb": 1024, "exclude": ["assets"]},
+    "allure-results": {"max_age_days": 14, "max_size_mb": 2048},
+    # allure-report是由allure-results整体生成的站点，只能作为一个整体归档
+    "allure-report": {"max_age_days": 14, "whole_directory": True}
+}
+
+
+class IORateLimiter:
+    """按字节数限速的令牌桶，多个读取方共享同一速率"""
+
+    def __init__(self, bytes_per_second: Optional[float]):
+        """
+        初始化限速器
+
+        Args:
+            bytes_per_second: 每秒允许读取的字节数，为空或不大于0时不限速
+        """
+        self.bytes_per_second = bytes_per_second if bytes_per_second and bytes_per_second > 0 else None
+        self._allowance = self.bytes_per_second or 0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, size: int) -> None:
+        """消耗size字节的额度，额度不足时等待"""
+        if self.bytes_per_second is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.bytes_per_second,
+                                  self._allowance + (now - self._last) * self.bytes_per_second)
+            self._last = now
+            self._allowance -= size
+            wait = -self._allowance / self.bytes_per_second if self._allowance < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class _ThrottledReader:
+    """读取时按限速器消耗额度的文件对象包装"""
+
+    def __init__(self, fileobj, limiter: IORateLimiter):
+        self._fileobj = fileobj
+        self._limiter = limiter
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        self._limiter.consume(len(data))
+        return data
+
+
+class RetentionService:
+    """测试产物保留策略服务"""
+
+    def __init__(self, archive_dir: str = "file_store/archives",
+                 policies: Optional[Dict[str, Dict[str, Any]]] = None,
+                 io_rate_bytes: Optional[float] = 5 * 1024 * 1024, min_age_seconds: float = 600,
+                 archive_max_age_days: Optional[float] = 365, root_dir: str = ".",
+                 directories: Optional[Dict[str, str]] = None):
+        """
+        初始化保留策略服务
+
+        Args:
+            archive_dir: 归档文件及归档索引的保存目录
+            policies: 目录到保留策略的映射，策略字段包括max_age_days、max_count、max_size_mb、
+                pattern（只管理名称匹配的条目，可按项目前缀区分）、exclude和whole_directory
+            io_rate_bytes: 归档时每秒读取的最大字节数
+            min_age_seconds: 最近修改时间在该秒数内的条目视为正在使用，不归档
+            archive_max_age_days: 归档文件保留的天数，为空时永久保留
+            root_dir: 被管理目录所在的根目录
+            directories: 策略目录名到实际路径的映射，未配置的目录位于root_dir下
+        """
+        self.archive_dir = archive_dir
+        self.policies = policies if policies is not None else DEFAULT_RETENTION_POLICIES
+        self.limiter = IORateLimiter(io_rate_bytes)
+        self.min_age_seconds = min_age_seconds
+        self.archive_max_age_days = archive_max_age_days
+        self.root_dir = root_dir
+        self.directories = directories or {}
+        self.db_path = os.path.join(archive_dir, "archive_index.db")
+        self.extractor = TestReportExtractor()
+        self.last_run_path = os.path.join(archive_dir, "last_run.json")
+        # 多个worker共享归档目录，同一时间只有一个进程执行保留策略
+        self._run_lock = ProcessLock(os.path.join(archive_dir, ".retention.lock"))
+        os.makedirs(archive_dir, exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """创建数据库连接，每次操作使用独立连接以支持多线程"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        """创建归档索引表"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS archived_entries (
+                    directory TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    archive_path TEXT,
+                    original_size INTEGER NOT NULL,
+                    archived_size INTEGER NOT NULL,
+                    modified_at REAL NOT NULL,
+                    archived_at REAL NOT NULL,
+                    reason TEXT NOT NULL,
+                    summary TEXT,
+                    PRIMARY KEY (directory, name, modified_at)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_archived_entries_time ON archived_entries (directory, modified_at)"
+            )
+
+    def plan(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        按保留策略计算需要归档的条目
+
+        条目按修改时间从新到旧排列，超出保留天数、超出保留数量或累计大小超出上限的条目需要归档；
+        最近仍在修改的条目不归档
+
+        Args:
+            now: 当前时间戳，默认使用系统时间
+
+        Returns:
+            List[Dict[str, Any]]: 包含directory、name、path、size、modified_at和reason的条目列表
+        """
+        now = now or time.time()
+        planned = []
+        for directory, policy in self.policies.items():
+            entries = self._list_entries(directory, policy)
+            max_age = policy.get("max_age_days")
+            max_count = policy.get("max_count")
+            max_size = policy.get("max_size_mb")
+            total_size = 0
+            for index, entry in enumerate(entries):
+                total_size += entry["size"]
+                if now - entry["modified_at"] < self.min_age_seconds:
+                    continue
+                reason = None
+                if max_age is not None and now - entry["modified_at"] > max_age * 86400:
+                    reason = "age"
+                elif max_count is not None and index >= max_count:
+                    reason = "count"
+                elif max_size is not None and total_size > max_size * 1024 * 1024:
+                    reason = "size"
+                if reason:
+                    planned.append(dict(entry, directory=directory, reason=reason))
+        return planned
+
+    def run_once(self, dry_run: bool = False, min_interval: Optional[float] = None) -> Dict[str, Any]:
+        """
+        执行一次保留策略：归档超出策略的条目，并删除超出保留期的归档文件
+
+        所有进程中同一时间只执行一次，正在执行时直接返回
+
+        Args:
+            dry_run: 只返回计划归档的条目，不修改文件
+            min_interval: 距上次执行（任意进程）不足该秒数时跳过，避免多个worker的后台任务重复执行
+
+        Returns:
+            Dict[str, Any]: 执行结果，包含归档条目、释放空间及删除的归档文件数量
+        """
+        if not self._run_lock.acquire(blocking=False):
+            return {"skipped": True, "reason": "保留策略正在执行"}
+        try:
+            started = time.time()
+            last_run = self.get_last_run()
+            if min_interval and not dry_run and last_run and started - last_run["started_at"] < min_interval:
+                return {"skipped": True, "reason": "距上次执行的间隔不足"}
+            planned = self.plan(started)
+            if dry_run:
+                return {"dry_run": True, "planned": planned}
+
+            archived, errors = [], []
+            freed = 0
+            for entry in planned:
+                try:
+                    record = self._archive_entry(entry)
+                    archived.append(record)
+                    freed += record["original_size"] - record["archived_size"]
+                except Exception as e:
+                    errors.append({"directory": entry["directory"], "name": entry["name"], "error": str(e)})
+            expired = self._expire_archives(started)
+            last_run = {
+                "started_at": started,
+                "duration": round(time.time() - started, 3),
+                "archived": len(archived),
+                "freed_bytes": freed,
+                "expired_archives": expired,
+                "errors": errors,
+                "entries": archived
+            }
+            tmp_path = self.last_run_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(last_run, f, ensure_ascii=False)
+            os.replace(tmp_path, self.last_run_path)
+            return last_run
+        finally:
+            self._run_lock.release()
+
+    def get_last_run(self) -> Optional[Dict[str, Any]]:
+        """获取最近一次执行结果，结果保存在归档目录中，所有worker读取到的一致"""
+        try:
+            with open(self.last_run_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list_archives(self, directory: Optional[str] = None, name: Optional[str] = None,
+                      limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        查询已归档条目及其结构化摘要
+
+        Args:
+            directory: 只返回该目录的归档
+            name: 只返回名称包含该字符串的归档
+            limit: 最多返回的数量
+
+        Returns:
+            List[Dict[str, Any]]: 按原修改时间倒序排列的归档记录
+        """
+        conditions, params = [], []
+        if directory:
+            conditions.append("directory = ?")
+            params.append(directory)
+        if name:
+            conditions.append("name LIKE ?")
+            params.append(f"%{name}%")
+        query = "SELECT * FROM archived_entries"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY modified_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [dict(row, summary=json.loads(row["summary"]) if row["summary"] else None) for row in rows]
+
+    def _list_entries(self, directory: str, policy: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """列出目录中受策略管理的条目，按修改时间从新到旧排列"""
+        path = self._directory_path(directory)
+        if not os.path.isdir(path):
+            return []
+        if policy.get("whole_directory"):
+            names = [None] if os.listdir(path) else []
+        else:
+            pattern = policy.get("pattern", "*")
+            exclude = set(policy.get("exclude", []))
+            names = [name for name in os.listdir(path)
+                     if name not in exclude and not name.startswith('.') and fnmatch.fnmatch(name, pattern)]
+        entries = []
+        for name in names:
+            entry_path = path if name is None else os.path.join(path, name)
+            size, modified_at = self._measure(entry_path)
+            entries.append({"name": name or directory, "path": entry_path, "size": size, "modified_at": modified_at})
+        entries.sort(key=lambda entry: entry["modified_at"], reverse=True)
+        return entries
+
+    def _directory_path(self, directory: str) -> str:
+        """获取策略目录的实际路径"""
+        return self.directories.get(directory) or os.path.join(self.root_dir, directory)
+
+    @staticmethod
+    def _measure(path: str) -> tuple:
+        """统计文件或目录的总大小及最近修改时间"""
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            return stat.st_size, stat.st_mtime
+        size, modified_at = 0, os.stat(path).st_mtime
+        for root, _, files in os.walk(path):
+            for name in files:
+                stat = os.stat(os.path.join(root, name))
+                size += stat.st_size
+                modified_at = max(modified_at, stat.st_mtime)
+        return size, modified_at
+
+    def _archive_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """将条目压缩为tar.gz归档并记录摘要，归档成功后删除原条目"""
+        summary = self._extract_summary(entry["path"])
+        target_dir = os.path.join(self.archive_dir, entry["directory"])
+        os.makedirs(target_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d%H%M%S', time.localtime(entry["modified_at"]))
+        archive_path = os.path.join(target_dir, f"{entry['name']}_{stamp}.tar.gz")
+        tmp_path = archive_path + ".tmp"
+        try:
+            with tarfile.open(tmp_path, "w:gz") as tar:
+                self._add_to_tar(tar, entry["path"], entry["name"])
+            os.replace(tmp_path, archive_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        record = {
+            "directory": entry["directory"],
+            "name": entry["name"],
+            "archive_path": archive_path,
+            "original_size": entry["size"],
+            "archived_size": os.path.getsize(archive_path),
+            "modified_at": entry["modified_at"],
+            "archived_at": time.time(),
+            "reason": entry["reason"],
+            "summary": summary
+        }
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO archived_entries "
+                "(directory, name, archive_path, original_size, archived_size, modified_at, archived_at, reason, summary) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (record["directory"], record["name"], archive_path, record["original_size"], record["archived_size"],
+                 record["modified_at"], record["archived_at"], record["reason"],
+                 json.dumps(summary, ensure_ascii=False) if summary is not None else None)
+            )
+
+        # 整体归档的目录保留空目录，供静态文件挂载继续使用
+        if os.path.isdir(entry["path"]):
+            if entry["path"] == self._directory_path(entry["directory"]):
+                for name in os.listdir(entry["path"]):
+                    child = os.path.join(entry["path"], name)
+                    shutil.rmtree(child) if os.path.isdir(child) else os.remove(child)
+            else:
+                shutil.rmtree(entry["path"])
+        else:
+            os.remove(entry["path"])
+        return record
+
+    def _add_to_tar(self, tar: tarfile.TarFile, path: str, arcname: str) -> None:
+        """逐个文件写入归档，读取时按限速器限速"""
+        if os.path.isfile(path):
+            tarinfo = tar.gettarinfo(path, arcname)
+            with open(path, 'rb') as f:
+                tar.addfile(tarinfo, _ThrottledReader(f, self.limiter))
+            return
+        tar.add(path, arcname, recursive=False)
+        for name in sorted(os.listdir(path)):
+            self._add_to_tar(tar, os.path.join(path, name), f"{arcname}/{name}")
+
+    def _extract_summary(self, path: str) -> Optional[Dict[str, Any]]:
+        """提取条目的结构化摘要，支持hrp运行目录的summary.json及报告JSON文件"""
+        summary_path = None
+        if os.path.isdir(path) and os.path.exists(os.path.join(path, "summary.json")):
+            summary_path = os.path.join(path, "summary.json")
+        elif path.endswith(".json") and os.path.isfile(path):
+            summary_path = path
+        if summary_path is None:
+            return None
+        try:
+            with open(summary_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if isinstance(data, dict) and "details" in data:
+            report = self.extractor.extract_from_summary(data)
+            return {
+                "stat": report.get("stat"),
+                "failed_cases": [case.get("name") for case in report.get("cases", []) if not case.get("success")]
+            }
+        if isinstance(data, dict):
+            # 其他JSON报告只保留标量字段，避免索引过大
+            return {key: value for key, value in data.items() if isinstance(value, (str, int, float, bool))}
+        return None
+
+    def _expire_archives(self, now: float) -> int:
+        """删除超出保留期的归档文件，索引中的摘要保留，archive_path置空"""
+        if not self.archive_max_age_days:
+            return 0
+        cutoff = now - self.archive_max_age_days * 86400
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT rowid, archive_path FROM archived_entries WHERE archived_at < ? AND archive_path IS NOT NULL",
+                (cutoff,)
+            ).fetchall()
+            for row in rows:
+                if os.path.exists(row["archive_path"]):
+                    os.remove(row["archive_path"])
+                conn.execute("UPDATE archived_entries SET archive_path = NULL WHERE rowid = ?", (row["rowid"],))
+        return len(rows)
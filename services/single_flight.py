@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求合并模块
+键相同的并发请求共享同一次正在进行的计算（single-flight），前端重试或多人同时点击生成时只调用一次大模型或只执行一次测试；
+配置共享缓存时，不同worker中的相同请求通过缓存的防击穿锁合并
+"""
+import asyncio
+import threading
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from services.cache_service import CacheService
+from services.tracing import tracer
+
+
+class SingleFlight:
+    """并发请求合并"""
+
+    def __init__(self, cache: Optional[CacheService] = None, result_ttl: float = 5):
+        """
+        初始化请求合并
+
+        Args:
+            cache: 用于跨worker合并的共享缓存，为空时只合并当前worker内的请求
+            result_ttl: 跨worker合并时计算结果在缓存中保留的秒数，只需覆盖等待中的请求读取结果的时间
+        """
+        self.cache = cache
+        self.result_ttl = result_ttl
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+
+    async def run(self, namespace: str, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        执行计算，键相同的计算正在进行时等待其结果
+
+        计算在线程中执行，发起请求被取消时计算继续进行，其他等待的请求仍能获得结果；
+        计算抛出的异常同样传递给所有等待的请求
+
+        Args:
+            namespace: 请求类型，如convert、analyze、execute
+            key: 归一化后的请求键
+            func: 计算函数，跨worker合并时返回值必须可以JSON序列化
+
+        Returns:
+            Tuple[Any, bool]: (计算结果, 是否与其他请求合并)
+        """
+        flight_key = f"{namespace}:{key}"
+        self._count(namespace, "calls")
+        with tracer.span(f"flight.{namespace}") as span:
+            task = self._inflight.get(flight_key)
+            if task is not None:
+                # 计算的span记录在发起计算的请求的trace中
+                self._count(namespace, "coalesced")
+                span.set_attribute("coalesced", True)
+                result, _ = await asyncio.shield(task)
+                return result, True
+
+            task = asyncio.ensure_future(self._lead(namespace, key, func))
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda t: self._finish(flight_key, t))
+            result, coalesced = await asyncio.shield(task)
+            span.set_attribute("coalesced", coalesced)
+            return result, coalesced
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        获取当前worker按请求类型的合并统计
+
+        Returns:
+            Dict[str, Dict[str, int]]: calls为请求数，executions为实际计算次数，coalesced为等待本worker中
+            进行中计算的请求数，coalesced_remote为由其他worker计算的请求数，errors为计算失败次数，inflight为进行中的计算数
+        """
+        with self._stats_lock:
+            stats = {namespace: dict(counts) for namespace, counts in self._stats.items()}
+        for flight_key in list(self._inflight):
+            counts = stats.setdefault(flight_key.split(":", 1)[0], {})
+            counts["inflight"] = counts.get("inflight", 0) + 1
+        return stats
+
+    async def _lead(self, namespace: str, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """执行计算并记录统计，返回 (计算结果, 是否由其他worker计算)"""
+        try:
+            result, executed = await asyncio.to_thread(self._execute, namespace, key, func)
+        except Exception:
+            self._count(namespace, "errors")
+            raise
+        self._count(namespace, "executions" if executed else "coalesced_remote")
+        return result, not executed
+
+    def _execute(self, namespace: str, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """在线程中执行计算，配置共享缓存时由缓存的防击穿锁保证所有worker中只计算一次"""
+        if self.cache is None:
+            return func(), True
+        executed = []
+
+        def compute():
+            executed.append(True)
+            return func()
+
+        result = self.cache.get_or_compute(f"flight.{namespace}", key, compute, ttl=self.result_ttl)
+        return result, bool(executed)
+
+    def _finish(self, flight_key: str, task: asyncio.Task) -> None:
+        """计算结束后移除进行中的记录，所有等待的请求都已取消时取出异常避免告警"""
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+        if not task.cancelled():
+            task.exception()
+
+    def _count(self, namespace: str, name: str) -> None:
+        """累加请求类型统计"""
+        with self._stats_lock:
+            counts = self._stats.setdefault(namespace, {})
+            counts[name] = counts.get(name, 0) + 1
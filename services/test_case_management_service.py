@@ -1,14 +1,27 @@
-import re
 import json
-import uuid
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+
+from services.test_point_separator import TestPointSeparator
+from services.test_point_grouping import TestPointGroupingService
+from services.test_point_registry import TestPointRegistry
 
 class TestCaseManagementService:
     """
     测试案例管理服务，负责测试要点分离、逻辑分组和报告整合
     """
     
+    def __init__(self, registry: Optional[TestPointRegistry] = None):
+        """
+        初始化测试案例管理服务
+        
+        Args:
+            registry: 测试要点注册表，用于读取历史执行耗时
+        """
+        self.separator = TestPointSeparator()
+        self.grouping_service = TestPointGroupingService()
+        self.registry = registry
+    
     def separate_test_points(self, test_cases_content: str) -> List[Dict[str, Any]]:
         """
         将测试用例内容分离为独立的测试要点
@@ -33,56 +46,57 @@ class TestCaseManagementService:
             except json.JSONDecodeError:
                 pass
         
-        # 分离测试要点
-        test_points = []
-        
-        # 使用正则表达式匹配测试要点
-        # 匹配数字开头的要点，如 "1. 用户登录系统" 或 "1、用户登录系统"
-        pattern = r'(?:^|\n)\s*(\d+)[\.\、]\s*(.+?)(?=\n\d+[\.\、]|\n?$)'
-        matches = re.findall(pattern, content, re.DOTALL)
-        
-        if matches:
-            for i, (number, point) in enumerate(matches):
-                test_points.append({
-                    "id": f"TP{str(uuid.uuid4())[:8]}",
-                    "index": int(number),
-                    "content": point.strip(),
-                    "title": f"测试要点 {number}"
-                })
-        else:
-            # 如果没有找到编号的要点，按句子分割
-            sentences = re.split(r'[。\n]+', content)
-            for i, sentence in enumerate(sentences):
-                if sentence.strip():
-                    test_points.append({
-                        "id": f"TP{str(uuid.uuid4())[:8]}",
-                        "index": i + 1,
-                        "content": sentence.strip(),
-                        "title": f"测试要点 {i + 1}"
-                    })
-        
-        return test_points
+        # 逐行单遍分离测试要点，支持多级编号和列表样式
+        return list(self.separator.iter_points_from_text(content))
+    
+    def iter_test_points_from_file(self, file_path: str, encoding: str = 'utf-8') -> Iterator[Dict[str, Any]]:
+        """
+        从大文件中流式分离测试要点
+        
+        Args:
+            file_path: 需求文本文件路径
+            encoding: 文件编码
+            
+        Returns:
+            逐个产出测试要点的生成器
+        """
+        return self.separator.iter_points_from_file(file_path, encoding=encoding)
     
-    def group_test_cases_by_logic(self, test_points: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    def group_test_cases_by_logic(self, test_points: List[Dict[str, Any]],
+                                  num_groups: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
         """
-        按逻辑关系对测试要点进行分组（每5个要点为一组）
+        按逻辑关系对测试要点进行分组
+        
+        共享前置条件或内容相似的要点分到同一组以复用前置流程，
+        各组按历史或预估执行时间均衡，使并行执行时同时完成
         
         Args:
             test_points: 测试要点列表
+            num_groups: 分组数量（并行执行数），默认每5个要点一组
             
         Returns:
             分组后的测试要点字典
         """
-        grouped_points = {}
-        
-        # 每5个测试要点为一组
-        group_size = 5
-        for i in range(0, len(test_points), group_size):
-            group_number = i // group_size + 1
-            group_name = f"测试组 {group_number}"
-            grouped_points[group_name] = test_points[i:i + group_size]
+        return {
+            group_name: group["points"]
+            for group_name, group in self.build_execution_groups(test_points, num_groups).items()
+        }
+    
+    def build_execution_groups(self, test_points: List[Dict[str, Any]],
+                               num_groups: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        对测试要点分组，并返回各组的预估耗时和共享前置条件
         
-        return grouped_points
+        Args:
+            test_points: 测试要点列表
+            num_groups: 分组数量（并行执行数），默认每5个要点一组
+            
+        Returns:
+            组名到分组信息（points、estimated_duration、preconditions）的映射
+        """
+        duration_lookup = self.registry.get_execution_times if self.registry else None
+        groups = self.grouping_service.group(test_points, num_groups=num_groups, duration_lookup=duration_lookup)
+        return {f"测试组 {i}": group for i, group in enumerate(groups, 1)}
     
     def integrate_test_reports(self, reports: List[Any]) -> Dict[str, Any]:
         """
@@ -1,5 +1,4 @@
-from math import log
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
 
 # 配置日志，确保输出到控制台
@@ -13,11 +12,27 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 # 修复导入问题，确保使用正确的导入路径
 from services.langchain_service import LangChainService
+from services.test_point_registry import TestPointRegistry
+from services.test_point_dedup import TestPointDeduplicator
+from services.artefact_reuse_index import ArtefactReuseIndex
+from services.file_store import FileStore
+from services.requirement_version_store import RequirementVersionStore, fingerprint_units, diff_units
+from services.test_point_separator import compute_point_id, normalize_point_content
+from services.process_lock import ProcessLock
+from services.token_budget import heading_level, heading_paths
+from services.tracing import tracer
+from config import Config
 import os
 
 class TestCaseConversionService:
-    def __init__(self):
+    def __init__(self, file_store: Optional[FileStore] = None):
         self.langchain_service = LangChainService()
+        self.file_store = file_store
+        self.registry = TestPointRegistry(Config.TEST_POINT_REGISTRY_PATH)
+        self.deduplicator = TestPointDeduplicator(threshold=Config.DEDUP_SIMILARITY_THRESHOLD)
+        self.reuse_index = ArtefactReuseIndex(Config.REUSE_INDEX_PATH, threshold=Config.REUSE_SIMILARITY_THRESHOLD,
+                                              fuzzy=Config.REUSE_FUZZY_ENABLED)
+        self.requirement_store = RequirementVersionStore(Config.REQUIREMENT_VERSION_STORE_PATH)
         
     def extract_test_cases_from_excel(self, file_path: str) -> Dict:
         """从Excel文件中提取测试用例"""
@@ -55,85 +70,416 @@ class TestCaseConversionService:
     
     def convert_single_case(self, test_case_description: str, 
                            parser_prompt_template: str = None, generator_prompt_template: str = None,
-                           generation_type: str = "test_cases") -> Dict:
+                           generation_type: str = "test_cases", deduplicate: bool = True,
+                           batch_generation: Optional[bool] = None) -> Dict:
         """转换测试要点为测试用例或生成测试数据文件"""
-        try:
-            # 根据生成类型调用相应的函数
-            if generation_type == "test_data":
-                # 生成测试数据并保存为yml文件
-                test_points = self._split_test_points(test_case_description)
-                saved_files = []
-                serialized_cases = []
-                
-                # 确保demo/testcases目录存在
-                testcases_dir = os.path.join("demo", "testcases")
-                if not os.path.exists(testcases_dir):
-                    os.makedirs(testcases_dir)
+        with tracer.span("convert", generation_type=generation_type) as span:
+            try:
+                dedup_summary = None
+                reused = []
+                # 根据生成类型调用相应的函数
+                if generation_type == "test_data":
+                    # 生成测试数据并保存为yml文件
+                    test_points = self._split_test_points(test_case_description)
+                    test_data = self.generate_test_data_files(test_points, deduplicate, batch_generation, reused)
+                    combined_cases_text = test_data["serialized_cases"]
+                    dedup_summary = test_data["dedup"]
+                else:
+                    # 默认生成测试用例，需求内容未变化时直接复用已生成的测试用例
+                    generated_content = self._get_or_generate_test_cases(test_case_description, reused)
+                    # 生成的测试用例同时存入文件存储，相同内容只保存一份
+                    store_id = self._save_to_file_store({
+                        f"test_cases_{compute_point_id(test_case_description)}.txt": generated_content
+                    })
+            
+                # 根据生成类型返回不同的字段名
+                result = {
+                    "status": "success",
+                    "metadata": {
+                        "input_content": test_case_description,
+                        "generation_type": generation_type,
+                        "reused_artefacts": reused
+                    }
+                }
+            
+                if generation_type == "test_data":
+                    # 直接返回serialized_cases作为纯文本
+                    result["generated_test_data"] = combined_cases_text
+                    result["metadata"]["dedup"] = dedup_summary
+                else:
+                    result["generated_test_cases"] = generated_content
+                    result["metadata"]["store_id"] = store_id
                 
-                # 逐条处理测试要点并生成yml文件
-                for i, test_point in enumerate(test_points, 1):
-                    # 生成测试用例内容
-                    generated_content = self.langchain_service.generate_test_script(
-                        test_case=test_point
-                    )
-                    logger.info(f"已生成测试数据 #{i}: {generated_content}")
-                    
-                    # 创建文件名
-                    file_name = f"TC{i:03d}-{self._generate_safe_filename(test_point)}.yml"
-                    file_path = os.path.join(testcases_dir, file_name)
-                    
-                    # 序列化内容
-                    serialized_content = self._serialize_yaml_content(generated_content, test_point)
-                    
-                    # 保存到文件
-                    try:
-                        with open(file_path, 'w', encoding='utf-8') as f:
+                return result
+            except Exception as e:
+                span.record_error(e)
+                logger.error(f"转换测试用例时出错: {e}")
+                return {
+                    "status": "error",
+                    "error": str(e)
+                }
+    
+    def generate_test_data_files(self, test_points: List[str], deduplicate: bool = True,
+                                 batch_generation: Optional[bool] = None,
+                                 reused: Optional[List[Dict]] = None) -> Dict:
+        """
+        为测试要点列表生成测试数据并保存为yml文件
+        
+        Args:
+            test_points: 测试要点内容列表
+            deduplicate: 是否对重复及近似重复的要点去重
+            batch_generation: 是否将多个要点合并为一次大模型请求，默认使用配置
+            reused: 复用记录列表，复用历史产物时追加记录
+            
+        Returns:
+            包含saved_files、total_files、directory、store_id、serialized_cases和dedup的字典
+        """
+        if batch_generation is None:
+            batch_generation = Config.GENERATION_BATCH_ENABLED
+        if reused is None:
+            reused = []
+        saved_files = []
+        serialized_cases = []
+        
+        # 确保测试数据目录存在
+        testcases_dir = Config.TESTCASES_DIR
+        if not os.path.exists(testcases_dir):
+            os.makedirs(testcases_dir, exist_ok=True)
+        
+        # 重复及近似重复的要点每簇只生成一次，结果分发给簇内所有要点
+        with tracer.span("convert.dedup", points=len(test_points)):
+            clusters = self.deduplicator.cluster(test_points) if deduplicate \
+                else [[i] for i in range(len(test_points))]
+            dedup_summary = self.deduplicator.summarize(test_points, clusters)
+        if dedup_summary["llm_calls_saved"]:
+            logger.info(f"{len(test_points)} 个测试要点去重后剩余 {len(clusters)} 个，"
+                        f"节省 {dedup_summary['llm_calls_saved']} 次大模型调用")
+        
+        # 逐簇处理测试要点并生成yml文件，内容未变化的要点直接复用已生成的测试数据
+        prompt_version = self.langchain_service.get_prompt_version("script_generator")
+        occurrences = {}
+        point_ids = []
+        for test_point in test_points:
+            normalized = normalize_point_content(test_point)
+            point_ids.append(compute_point_id(test_point, occurrence=occurrences.get(normalized, 0)))
+            occurrences[normalized] = occurrences.get(normalized, 0) + 1
+        
+        # 先复用注册表及复用索引中的产物，收集需要调用大模型生成的簇
+        with tracer.span("convert.reuse_lookup", clusters=len(clusters)) as span:
+            artefacts = {}
+            to_generate = []
+            for i, members in enumerate(clusters, 1):
+                test_point = test_points[members[0]]
+                point_id = point_ids[members[0]]
+            
+                generated_content = self.registry.get_artefact(point_id, "test_data", prompt_version)
+                if generated_content is not None:
+                    logger.info(f"测试要点 #{i} ({point_id}) 未变化，复用已生成的测试数据")
+                else:
+                    # 与历史要点足够相似时复用其测试数据
+                    generated_content = self._lookup_reuse(point_id, "test_data", prompt_version,
+                                                           test_point, reused)
+                if generated_content is None:
+                    to_generate.append(i)
+                else:
+                    artefacts[i] = generated_content
+            span.set_attribute("reused", len(artefacts))
+        
+        # 生成测试用例内容，启用批量生成时多个要点合并为一次请求
+        if to_generate:
+            with tracer.span("convert.generate", points=len(to_generate), batch=batch_generation):
+                contents = [test_points[clusters[i - 1][0]] for i in to_generate]
+                if batch_generation and len(contents) > 1:
+                    generated = self.langchain_service.generate_test_scripts_batched(contents)
+                else:
+                    generated = [self.langchain_service.generate_test_script(test_case=c) for c in contents]
+            for i, test_point, generated_content in zip(to_generate, contents, generated):
+                self._store_generated(point_ids[clusters[i - 1][0]], "test_data", prompt_version,
+                                      test_point, generated_content)
+                artefacts[i] = generated_content
+                logger.info(f"已生成测试数据 #{i}: {generated_content}")
+        
+        store_files = {}
+        with tracer.span("convert.write", files=len(clusters)):
+            for i, members in enumerate(clusters, 1):
+                test_point = test_points[members[0]]
+                generated_content = artefacts[i]
+            
+                # 簇内其他要点共享同一份测试数据
+                for member in members[1:]:
+                    self.registry.save_artefact(point_ids[member], "test_data", prompt_version,
+                                                test_points[member], generated_content)
+            
+                # 创建文件名，每簇只保存一个文件
+                file_name = f"TC{i:03d}-{self._generate_safe_filename(test_point)}.yml"
+                file_path = os.path.join(testcases_dir, file_name)
+            
+                # 序列化内容
+                serialized_content = self._serialize_yaml_content(generated_content, test_point)
+            
+                # 保存到文件，多个worker共享测试数据目录，写入时持有目录锁并原子替换，执行测试时不会读到写了一半的文件
+                try:
+                    with ProcessLock(os.path.join(Config.LOCK_DIR, "testcases.lock")):
+                        tmp_path = file_path + f".{os.getpid()}.tmp"
+                        with open(tmp_path, 'w', encoding='utf-8') as f:
                             f.write(serialized_content)
-                        saved_files.append(file_name)
-                        
-                        # 将序列化后的内容添加到结果中，每个测试用例添加编号
-                        serialized_cases.append(f"测试用例{i}:\n{serialized_content}")
-                    except Exception as e:
-                        print(f"保存文件 {file_name} 失败: {str(e)}")
-                
-                # 组合所有序列化后的测试用例为纯文本
-                combined_cases_text = "\n\n".join(serialized_cases)
+                        os.replace(tmp_path, file_path)
+                    saved_files.append(file_name)
+                    store_files[file_name] = serialized_content
                 
-                generated_content = {
-                    "saved_files": saved_files,
-                    "total_files": len(saved_files),
-                    "directory": testcases_dir,
-                    "serialized_cases": combined_cases_text
+                    # 将序列化后的内容添加到结果中，每个测试用例添加编号，并注明合并的重复要点
+                    duplicates = "".join(f"\n# 重复要点: {test_points[m]}" for m in members[1:])
+                    serialized_cases.append(f"测试用例{i}:{duplicates}\n{serialized_content}")
+                except Exception as e:
+                    logger.error(f"保存文件 {file_name} 失败: {e}")
+        
+        # 组合所有序列化后的测试用例为纯文本
+        combined_cases_text = "\n\n".join(serialized_cases)
+        
+        # 生成的测试数据同时存入文件存储，相同内容只保存一份
+        store_id = self._save_to_file_store(store_files)
+        
+        return {
+            "saved_files": saved_files,
+            "total_files": len(saved_files),
+            "directory": testcases_dir,
+            "store_id": store_id,
+            "serialized_cases": combined_cases_text,
+            "dedup": dedup_summary
+        }
+    
+    def _lookup_reuse(self, point_id: str, artefact_type: str, prompt_version: str,
+                      content: str, reused: List[Dict], excluded: Optional[set] = None) -> Optional[str]:
+        """
+        在复用索引中查找内容相同（启用模糊复用时为相似）的历史要点的产物，找到时写入注册表
+        
+        Args:
+            point_id: 测试要点ID
+            artefact_type: 产物类型
+            prompt_version: 提示词版本
+            content: 测试要点内容
+            reused: 复用记录列表，复用历史产物时追加一条记录
+            excluded: 不能复用其产物的历史要点内容（归一化后）
+            
+        Returns:
+            复用的产物，没有可复用的历史产物时返回None
+        """
+        match = self.reuse_index.lookup(content, artefact_type, prompt_version)
+        if match is None or normalize_point_content(match["source_content"]) in (excluded or ()):
+            return None
+        logger.info(f"测试要点 ({point_id}) 与历史要点 ({match['source_point_id']}) "
+                    f"相似度 {match['similarity']}，复用已生成的产物")
+        reused.append({
+            "point_id": point_id,
+            "content": content,
+            "source_point_id": match["source_point_id"],
+            "source_content": match["source_content"],
+            "similarity": match["similarity"],
+            "adapted": match["adapted"]
+        })
+        self.registry.save_artefact(point_id, artefact_type, prompt_version, content, match["artefact"])
+        return match["artefact"]
+    
+    def _get_or_generate_test_cases(self, requirements: str, reused: List[Dict]) -> str:
+        """
+        获取需求对应的测试用例，需求内容未变化时复用，否则调用大模型生成
+        
+        需求内容可能是包含多条规则的整篇文档，相似度无法反映其中某条规则的修改，
+        因此只按内容精确复用，不查询也不写入复用索引
+        
+        Args:
+            requirements: 需求内容
+            reused: 复用记录列表，复用历史产物时追加记录
+            
+        Returns:
+            测试用例
+        """
+        prompt_version = self.langchain_service.get_prompt_version("test_case_generator")
+        point_id = compute_point_id(requirements)
+        generated_content = self.registry.get_artefact(point_id, "test_cases", prompt_version)
+        if generated_content is not None:
+            logger.info(f"需求内容 ({point_id}) 未变化，复用已生成的测试用例")
+            return generated_content
+        with tracer.span("convert.generate", points=1, batch=False):
+            generated_content = self.langchain_service.generate_test_cases_from_rules(requirements=requirements)
+        self._store_generated(point_id, "test_cases", prompt_version, requirements, generated_content, index=False)
+        return generated_content
+    
+    def _lookup_test_cases(self, requirements: str, prompt_version: str, reused: List[Dict],
+                           use_index: bool = True, excluded: Optional[set] = None) -> Optional[str]:
+        """
+        获取单条需求内容未变化或在复用索引中可以复用的测试用例
+        
+        Args:
+            requirements: 需求内容
+            prompt_version: 提示词版本
+            reused: 复用记录列表，复用历史产物时追加记录
+            use_index: 内容没有生成记录时是否查询复用索引
+            excluded: 不能复用其产物的历史需求内容（归一化后）
+            
+        Returns:
+            可以复用的测试用例，没有时返回None
+        """
+        point_id = compute_point_id(requirements)
+        generated_content = self.registry.get_artefact(point_id, "test_cases", prompt_version)
+        if generated_content is not None:
+            logger.info(f"需求内容 ({point_id}) 未变化，复用已生成的测试用例")
+            return generated_content
+        if not use_index:
+            return None
+        return self._lookup_reuse(point_id, "test_cases", prompt_version, requirements, reused, excluded)
+    
+    def regenerate_from_requirements(self, document_id: str, units: List[Dict],
+                                     sha256: Optional[str] = None) -> Dict:
+        """
+        根据需求文档的修订增量生成测试用例
+        
+        新版本的需求单元与已存储版本按指纹比对，只有新增和修改的需求需要生成测试用例，
+        删除和被修改的旧需求对应的测试用例被停用，未变化（包括仅移动位置）的需求保留原测试用例。
+        被修改的需求不查询复用索引，新增的需求不复用本次停用的旧需求的测试用例，避免修改后的需求沿用旧测试用例。
+        需要生成的需求按所属章节打包，以章节标题路径为上下文并发批量生成，结果按指纹写回各需求；
+        章节标题本身只作为上下文，不单独生成测试用例
+        
+        Args:
+            document_id: 需求文档ID
+            units: 新版本的需求单元列表，每个单元包含kind、location和content
+            sha256: 文档内容的sha256，与当前版本相同时直接返回
+            
+        Returns:
+            包含version、added、changed、removed、unchanged统计及新生成测试用例所在store_id的字典
+        """
+        try:
+            document = self.requirement_store.get_document(document_id)
+            if document and sha256 and document["sha256"] == sha256:
+                logger.info(f"需求文档 ({document_id}) 内容未变化，跳过生成")
+                return {
+                    "status": "success",
+                    "document_id": document_id,
+                    "version": document["version"],
+                    "previous_version": document["version"],
+                    "added": [],
+                    "changed": [],
+                    "removed": [],
+                    "unchanged": document["unit_count"],
+                    "reused_artefacts": [],
+                    "store_id": None
+                }
+            
+            old_units = self.requirement_store.get_units(document_id)
+            old_fingerprints = [unit["fingerprint"] for unit in old_units]
+            fingerprints = fingerprint_units(units)
+            diff = diff_units(old_units, old_fingerprints, units, fingerprints)
+            added, removed = diff["added"], diff["removed"]
+            changed = {new for _, new in diff["changed"]}
+            retired_contents = {
+                normalize_point_content(old_units[i]["content"])
+                for i in removed + [old for old, _ in diff["changed"]]
+            }
+            
+            reused = []
+            test_cases = {}
+            prompt_version = self.langchain_service.get_prompt_version("test_case_generator")
+            contents = [unit["content"] for unit in units]
+            paths = heading_paths(contents)
+            to_generate = []
+            for i in sorted(added + list(changed)):
+                if heading_level(contents[i]):
+                    test_cases[fingerprints[i]] = ""
+                    continue
+                generated_content = self._lookup_test_cases(contents[i], prompt_version, reused,
+                                                            use_index=i not in changed, excluded=retired_contents)
+                if generated_content is None:
+                    to_generate.append(i)
+                else:
+                    test_cases[fingerprints[i]] = generated_content
+            
+            if to_generate:
+                with tracer.span("convert.generate", points=len(to_generate), batch=True):
+                    generated = self.langchain_service.generate_test_cases_batched(
+                        [contents[i] for i in to_generate], [paths[i] for i in to_generate]
+                    )
+                for i, generated_content in zip(to_generate, generated):
+                    self._store_generated(compute_point_id(contents[i]), "test_cases", prompt_version,
+                                          contents[i], generated_content)
+                    test_cases[fingerprints[i]] = generated_content
+            # 新生成的测试用例存入文件存储，每条需求一个文件
+            store_id = self._save_to_file_store({
+                f"test_cases_{fingerprints[i]}.txt": test_cases[fingerprints[i]] for i in to_generate
+            })
+            
+            retired = [old_fingerprints[i] for i in removed] + [old_fingerprints[old] for old, _ in diff["changed"]]
+            version = self.requirement_store.save_revision(
+                document_id, units, fingerprints, test_cases, retired, sha256=sha256
+            )
+            
+            def describe(i: int) -> Dict:
+                return {
+                    "fingerprint": fingerprints[i],
+                    "location": units[i]["location"],
+                    "content": units[i]["content"],
+                    "generated_test_cases": test_cases[fingerprints[i]]
                 }
-            else:
-                # 默认生成测试用例
-                generated_content = self.langchain_service.generate_test_cases_from_rules(
-                    requirements=test_case_description
-                )
             
-            # 根据生成类型返回不同的字段名
             result = {
                 "status": "success",
-                "metadata": {
-                    "input_content": test_case_description,
-                    "generation_type": generation_type
-                }
+                "document_id": document_id,
+                "version": version,
+                "previous_version": document["version"] if document else 0,
+                "added": [describe(i) for i in added],
+                "changed": [
+                    dict(describe(new), previous_content=old_units[old]["content"])
+                    for old, new in diff["changed"]
+                ],
+                "removed": [
+                    {
+                        "fingerprint": old_units[i]["fingerprint"],
+                        "location": old_units[i]["location"],
+                        "content": old_units[i]["content"]
+                    }
+                    for i in removed
+                ],
+                "unchanged": len(diff["unchanged"]),
+                "reused_artefacts": reused,
+                "store_id": store_id
             }
-            
-            if generation_type == "test_data":
-                # 直接返回serialized_cases作为纯文本
-                result["generated_test_data"] = combined_cases_text
-            else:
-                result["generated_test_cases"] = generated_content
-                
+            logger.info(f"需求文档 ({document_id}) 更新到版本 {version}：新增 {len(added)}，"
+                        f"修改 {len(diff['changed'])}，删除 {len(removed)}，未变化 {result['unchanged']}")
             return result
         except Exception as e:
-            logger.error(f"转换测试用例时出错: {e}")
+            logger.error(f"增量生成测试用例时出错: {e}")
             return {
                 "status": "error",
                 "error": str(e)
             }
     
+    def _save_to_file_store(self, files: Dict[str, str]) -> Optional[str]:
+        """
+        将生成产物存入文件存储，配置内容寻址存储时相同内容只保存一份
+        
+        Args:
+            files: 文件名到文本内容的映射
+            
+        Returns:
+            Optional[str]: 文件存储的任务ID，未配置文件存储、没有文件或保存失败时返回None
+        """
+        if self.file_store is None or not files:
+            return None
+        try:
+            with tracer.span("convert.file_store", files=len(files)):
+                return self.file_store.save_files(
+                    {name: str(content).encode('utf-8') for name, content in files.items()}
+                )["store_id"]
+        except Exception as e:
+            logger.error(f"保存生成产物到文件存储失败: {e}")
+            return None
+    
+    def _store_generated(self, point_id: str, artefact_type: str, prompt_version: str,
+                         content: str, artefact: str, index: bool = True) -> None:
+        """将大模型新生成的产物写入注册表，index为True时同时写入复用索引，只有单条要点或需求需要写入"""
+        if index and isinstance(artefact, str):
+            self.reuse_index.add(point_id, artefact_type, prompt_version, content, artefact)
+        self.registry.save_artefact(point_id, artefact_type, prompt_version, content, artefact)
+    
     def _split_test_points(self, test_points_text: str) -> List[str]:
         """将测试要点文本分割成单个测试要点列表"""
         # 使用标准库字符串操作函数进行分割
@@ -157,29 +503,45 @@ class TestCaseConversionService:
         return safe_name[:30]
 
     def convert_batch_cases(self, test_cases: List[str],
-                           parser_prompt_template: str = None, generator_prompt_template: str = None) -> Dict:
-        """批量转换测试用例为自动化测试脚本"""
+                           parser_prompt_template: str = None, generator_prompt_template: str = None,
+                           deduplicate: bool = True) -> Dict:
+        """批量转换测试用例为自动化测试脚本，重复及近似重复的测试用例只转换一次"""
         try:
-            results = []
-            for test_case in test_cases:
+            clusters = self.deduplicator.cluster(test_cases) if deduplicate \
+                else [[i] for i in range(len(test_cases))]
+            dedup_summary = self.deduplicator.summarize(test_cases, clusters)
+            
+            generated = [None] * len(test_cases)
+            for members in clusters:
                 result = self.convert_single_case(
-                    test_case_description=test_case,
+                    test_case_description=test_cases[members[0]],
                     parser_prompt_template=parser_prompt_template,
                     generator_prompt_template=generator_prompt_template,
                     generation_type="test_cases"
                 )
-                results.append({
+                for member in members:
+                    generated[member] = result.get("generated_test_cases", "")
+            
+            results = [
+                {
                     "input_content": test_case,
-                    "generated_test_cases": result.get("generated_test_cases", "")
-                })
+                    "generated_test_cases": generated[i]
+                }
+                for i, test_case in enumerate(test_cases)
+            ]
+            
+            if dedup_summary["llm_calls_saved"]:
+                logger.info(f"批量转换 {len(test_cases)} 个测试用例，"
+                            f"去重节省 {dedup_summary['llm_calls_saved']} 次大模型调用")
                 
             return {
                 "status": "success",
-                "results": results
+                "results": results,
+                "dedup": dedup_summary
             }
         except Exception as e:
             logger.error(f"批量转换测试用例时出错: {e}")
             return {
                 "status": "error",
                 "error": str(e)
-            }
\ No newline at end of file
+            }
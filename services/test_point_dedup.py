@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试要点去重模块
+对同一批测试要点做归一化和MinHash/LSH近似去重，
+措辞略有差异的重复要点只调用一次大模型，生成结果分发给簇内所有要点
+"""
+import re
+import hashlib
+from typing import Dict, List, Any
+
+import numpy as np
+
+from services.test_point_separator import normalize_point_content
+
+
+# MinHash使用的梅森素数 2^61-1
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# 计算shingle前去掉的标点、空白及不影响语义的虚词
+_PUNCTUATION_PATTERN = re.compile(r'[\s\W_]+|[的了地得着过到后]')
+# 数字在测试要点中通常是关键取值（期限、金额、边界值），数字不同的要点不视为近似重复
+_NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+# 否定词、HTTP方法和接口路径同样决定要点的含义，如“允许转账”与“不允许转账”、
+# “GET /api/users”与“POST /api/users”，这些词不同的要点不视为近似重复
+_GUARD_PATTERN = re.compile(
+    r'禁止|不|非|未|无|没|勿'
+    r"|(?<![a-z])(?:not|no|never|cannot|without)(?![a-z])|n't"
+    r'|(?<![a-z])(?:get|post|put|patch|delete|head|options)(?![a-z])'
+    r'|/[\w{}:.\-]+(?:/[\w{}:.\-]*)*'
+)
+
+
+class TestPointDeduplicator:
+    """测试要点近似去重器"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 2, seed: int = 1):
+        """
+        初始化去重器
+
+        Args:
+            threshold: 判定为近似重复的最小Jaccard相似度
+            num_perm: MinHash签名长度
+            bands: LSH分桶数，num_perm需能被bands整除
+            shingle_size: 字符shingle长度
+            seed: 随机种子，固定后签名在不同运行中保持一致
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm必须能被bands整除")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self._b = generator.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """
+        将归一化后的文本切分为字符shingle并哈希为整数
+
+        Args:
+            text: 测试要点内容
+
+        Returns:
+            np.ndarray: 去重后的shingle哈希值
+        """
+        # 数字替换为占位符，数字取值不同的要点仍有相同的shingle，由调用方单独比较数字
+        normalized = _NUMBER_PATTERN.sub('〇', normalize_point_content(text))
+        normalized = _PUNCTUATION_PATTERN.sub('', normalized)
+        size = self.shingle_size
+        grams = {normalized[i:i + size] for i in range(max(len(normalized) - size + 1, 1))}
+        return np.array(
+            [int.from_bytes(hashlib.md5(g.encode('utf-8')).digest()[:4], 'little') for g in grams],
+            dtype=np.uint64
+        )
+
+    @staticmethod
+    def extract_numbers(text: str) -> List[str]:
+        """
+        提取测试要点中的数字取值
+
+        Args:
+            text: 测试要点内容
+
+        Returns:
+            List[str]: 按出现顺序排列的数字
+        """
+        return _NUMBER_PATTERN.findall(normalize_point_content(text))
+
+    @staticmethod
+    def extract_guard_tokens(text: str) -> List[str]:
+        """
+        提取测试要点中决定含义的否定词、HTTP方法和接口路径
+
+        Args:
+            text: 测试要点内容
+
+        Returns:
+            List[str]: 按出现顺序排列的否定词、小写HTTP方法和接口路径
+        """
+        return _GUARD_PATTERN.findall(normalize_point_content(text))
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        计算文本的MinHash签名
+
+        Args:
+            text: 测试要点内容
+
+        Returns:
+            np.ndarray: 长度为num_perm的签名
+        """
+        return self._minhash(self.shingles(text))
+
+    def _minhash(self, hashes: np.ndarray) -> np.ndarray:
+        """根据shingle哈希值计算MinHash签名"""
+        # (a * x + b) mod p，按排列取最小值；a、x均小于2^32，乘积不会溢出uint64
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def cluster(self, texts: List[str]) -> List[List[int]]:
+        """
+        将文本聚为精确重复及近似重复的簇
+
+        归一化后内容相同的直接合并；其余要点通过LSH分桶找出候选簇，
+        与簇代表要点的shingle Jaccard相似度达到阈值，且包含的数字、否定词、HTTP方法和接口路径完全相同才归入该簇
+
+        Args:
+            texts: 测试要点内容列表
+
+        Returns:
+            List[List[int]]: 每个簇包含的下标，簇首为代表要点，簇按首次出现顺序排列
+        """
+        clusters: List[List[int]] = []
+        exact: Dict[str, int] = {}
+        unique = []
+        for i, text in enumerate(texts):
+            key = normalize_point_content(text)
+            if key in exact:
+                clusters[exact[key]].append(i)
+            else:
+                exact[key] = len(clusters)
+                clusters.append([i])
+                unique.append(i)
+
+        if len(unique) < 2:
+            return clusters
+
+        # 只与各簇的代表要点比较，避免相似关系传递导致不相关的要点被串联合并
+        shingle_sets = [self.shingles(texts[i]) for i in unique]
+        signatures = np.stack([self._minhash(hashes) for hashes in shingle_sets])
+        shingle_sets = [set(hashes.tolist()) for hashes in shingle_sets]
+        numbers = [self.extract_numbers(texts[i]) for i in unique]
+        guards = [self.extract_guard_tokens(texts[i]) for i in unique]
+        buckets: Dict[tuple, List[int]] = {}
+        merged: List[List[int]] = []
+        leaders: Dict[int, int] = {}  # 代表要点行号 -> merged中的簇下标
+        for row in range(len(unique)):
+            band_keys = [
+                (band, signatures[row, band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)
+            ]
+            candidates = {leader for key in band_keys for leader in buckets.get(key, ())}
+            best, best_similarity = None, self.threshold
+            for leader in candidates:
+                if numbers[leader] != numbers[row] or guards[leader] != guards[row]:
+                    continue
+                # LSH只负责召回候选，最终按精确的Jaccard相似度判定
+                similarity = len(shingle_sets[leader] & shingle_sets[row]) / \
+                    len(shingle_sets[leader] | shingle_sets[row])
+                if similarity >= best_similarity:
+                    best, best_similarity = leader, similarity
+
+            if best is None:
+                leaders[row] = len(merged)
+                merged.append(list(clusters[row]))
+                for key in band_keys:
+                    buckets.setdefault(key, []).append(row)
+            else:
+                merged[leaders[best]].extend(clusters[row])
+        return [sorted(members) for members in merged]
+
+    @staticmethod
+    def summarize(texts: List[str], clusters: List[List[int]]) -> Dict[str, Any]:
+        """
+        汇总去重结果
+
+        Args:
+            texts: 测试要点内容列表
+            clusters: cluster返回的簇
+
+        Returns:
+            Dict[str, Any]: 要点总数、簇数量、节省的大模型调用次数及重复簇明细
+        """
+        return {
+            "total_points": len(texts),
+            "unique_points": len(clusters),
+            "llm_calls_saved": len(texts) - len(clusters),
+            "duplicate_clusters": [
+                {
+                    "representative": texts[members[0]],
+                    "duplicates": [texts[i] for i in members[1:]]
+                }
+                for members in clusters if len(members) > 1
+            ]
+        }
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试要点分组模块
+基于本地字符n-gram TF-IDF相似度将共享前置条件的测试要点聚为一组，
+再按预估或历史执行时间装箱，使并行执行的各组耗时接近
+"""
+import re
+import heapq
+import hashlib
+import math
+from typing import Callable, Dict, List, Any, Optional
+
+import numpy as np
+
+
+# 显式前置条件描述，如"前置条件：用户已登录"
+_PRECONDITION_PATTERN = re.compile(r'(?:前置条件|前提条件|前提|预置条件|precondition)\s*[:：]\s*([^\n。；;，,]+)', re.I)
+# 隐式前置条件描述，如"已登录"、"在订单详情页"
+_IMPLICIT_PRECONDITION_PATTERN = re.compile(r'(已[一-龥]{1,6}|在[一-龥]{1,10}(?:页面|页|界面))')
+
+
+class TestPointGroupingService:
+    """测试要点分组服务"""
+
+    def __init__(self, ngram_range: tuple = (2, 3), n_features: int = 4096,
+                 similarity_threshold: float = 0.35, default_duration: float = 5.0):
+        """
+        初始化分组服务
+
+        Args:
+            ngram_range: 字符n-gram的长度范围
+            n_features: n-gram哈希后的特征维度
+            similarity_threshold: 归入同一相似簇的最小余弦相似度
+            default_duration: 没有历史执行时间时每个要点的预估耗时（秒）
+        """
+        self.ngram_range = ngram_range
+        self.n_features = n_features
+        self.similarity_threshold = similarity_threshold
+        self.default_duration = default_duration
+
+    def vectorize(self, texts: List[str]) -> np.ndarray:
+        """
+        将文本转换为L2归一化的字符n-gram TF-IDF向量
+
+        n-gram通过哈希映射到固定维度，无需维护词表
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            np.ndarray: 形状为 (文本数, n_features) 的矩阵
+        """
+        counts = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = re.sub(r'\s+', ' ', (text or "").lower())
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                for start in range(max(len(text) - n + 1, 0)):
+                    gram = text[start:start + n]
+                    column = int.from_bytes(hashlib.md5(gram.encode('utf-8')).digest()[:4], 'little') \
+                        % self.n_features
+                    counts[row, column] += 1
+
+        # TF-IDF：子线性词频乘以平滑逆文档频率
+        document_frequency = np.count_nonzero(counts, axis=0)
+        idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+        tfidf = np.log1p(counts) * idf.astype(np.float32)
+        norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return tfidf / norms
+
+    @staticmethod
+    def extract_precondition(point: Dict[str, Any]) -> str:
+        """
+        提取测试要点的前置条件键
+
+        优先使用显式的前置条件描述，其次使用隐式描述（已登录、在某页面），
+        都没有时使用父要点ID，使同一父要点下的子要点共享前置流程
+
+        Args:
+            point: 测试要点
+
+        Returns:
+            str: 前置条件键，没有时返回空字符串
+        """
+        content = point.get("content", "")
+        match = _PRECONDITION_PATTERN.search(content)
+        if match:
+            return match.group(1).strip()
+        match = _IMPLICIT_PRECONDITION_PATTERN.search(content)
+        if match:
+            return match.group(1)
+        return point.get("parent_id") or ""
+
+    def cluster(self, test_points: List[Dict[str, Any]]) -> List[List[int]]:
+        """
+        按前置条件和文本相似度对测试要点聚类
+
+        相同前置条件的要点先归为一类；其余要点按与簇中心的余弦相似度贪心归类
+
+        Args:
+            test_points: 测试要点列表
+
+        Returns:
+            List[List[int]]: 每个簇包含的要点下标
+        """
+        if not test_points:
+            return []
+
+        vectors = self.vectorize([point.get("content", "") for point in test_points])
+        clusters: List[List[int]] = []
+        centroids: List[np.ndarray] = []
+        precondition_clusters: Dict[str, int] = {}
+
+        for i, point in enumerate(test_points):
+            precondition = self.extract_precondition(point)
+            if precondition and precondition in precondition_clusters:
+                target = precondition_clusters[precondition]
+            else:
+                target = -1
+                if centroids:
+                    similarities = np.stack(centroids) @ vectors[i]
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.similarity_threshold:
+                        target = best
+                if target == -1:
+                    clusters.append([])
+                    centroids.append(np.zeros(self.n_features, dtype=np.float32))
+                    target = len(clusters) - 1
+                if precondition:
+                    precondition_clusters[precondition] = target
+
+            clusters[target].append(i)
+            # 增量更新簇中心并重新归一化
+            centroid = centroids[target] + (vectors[i] - centroids[target]) / len(clusters[target])
+            norm = np.linalg.norm(centroid)
+            centroids[target] = centroid / norm if norm else centroid
+
+        return clusters
+
+    def group(self, test_points: List[Dict[str, Any]], num_groups: Optional[int] = None,
+              duration_lookup: Optional[Callable[[List[str]], Dict[str, float]]] = None) -> List[Dict[str, Any]]:
+        """
+        对测试要点聚类并按执行时间装箱为若干执行组
+
+        采用最长处理时间优先（LPT）装箱：簇按总耗时降序依次放入当前耗时最少的组；
+        单个簇超过平均组耗时时拆分，以免拖慢整体完成时间
+
+        Args:
+            test_points: 测试要点列表
+            num_groups: 执行组数量（并行worker数），默认每5个要点一组
+            duration_lookup: 根据要点ID批量查询历史执行时间的函数
+
+        Returns:
+            List[Dict[str, Any]]: 执行组列表，包含points、estimated_duration和preconditions
+        """
+        if not test_points:
+            return []
+        num_groups = max(1, min(num_groups or math.ceil(len(test_points) / 5), len(test_points)))
+
+        history = duration_lookup([point.get("id", "") for point in test_points]) if duration_lookup else {}
+        durations = [
+            history.get(point.get("id", "")) or self.default_duration
+            for point in test_points
+        ]
+
+        target_load = sum(durations) / num_groups
+        units = []
+        for members in self.cluster(test_points):
+            # 超过平均组耗时的簇按顺序拆分
+            piece, piece_load = [], 0.0
+            for i in members:
+                if piece and piece_load + durations[i] > target_load:
+                    units.append((piece_load, piece))
+                    piece, piece_load = [], 0.0
+                piece.append(i)
+                piece_load += durations[i]
+            units.append((piece_load, piece))
+
+        bins = [(0.0, b) for b in range(num_groups)]
+        heapq.heapify(bins)
+        assigned: List[List[int]] = [[] for _ in range(num_groups)]
+        loads = [0.0] * num_groups
+        for load, members in sorted(units, key=lambda unit: unit[0], reverse=True):
+            bin_load, b = heapq.heappop(bins)
+            assigned[b].extend(members)
+            loads[b] = bin_load + load
+            heapq.heappush(bins, (loads[b], b))
+
+        groups = []
+        for b in sorted(range(num_groups), key=lambda b: min(assigned[b]) if assigned[b] else len(test_points)):
+            if not assigned[b]:
+                continue
+            members = sorted(assigned[b])
+            groups.append({
+                "points": [test_points[i] for i in members],
+                "estimated_duration": round(loads[b], 2),
+                "preconditions": sorted({
+                    p for p in (self.extract_precondition(test_points[i]) for i in members)
+                    if p and not p.startswith("TP")
+                })
+            })
+        return groups
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试要点注册表模块
+以测试要点的稳定ID为键，记录其生成产物（测试数据、测试用例）和最近一次执行结果，
+相同需求再次提交时可直接复用，无需重新调用大模型或重新执行
+"""
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+
+class TestPointRegistry:
+    """测试要点注册表"""
+
+    def __init__(self, db_path: str = "file_store/test_point_registry.db"):
+        """
+        初始化注册表
+
+        Args:
+            db_path: SQLite数据库文件路径
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """创建数据库连接，每次操作使用独立连接以支持多线程"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        """创建数据表"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS test_point_artefacts (
+                    point_id TEXT NOT NULL,
+                    artefact_type TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    artefact TEXT NOT NULL,
+                    generated_at REAL NOT NULL,
+                    PRIMARY KEY (point_id, artefact_type)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS test_point_results (
+                    point_id TEXT PRIMARY KEY,
+                    artefact_hash TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    executed_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get_artefact(self, point_id: str, artefact_type: str,
+                     prompt_version: Optional[str] = None) -> Optional[str]:
+        """
+        获取测试要点已生成的产物
+
+        Args:
+            point_id: 测试要点ID
+            artefact_type: 产物类型，如test_data、test_cases
+            prompt_version: 提示词版本，指定时只返回用相同提示词生成的产物
+
+        Returns:
+            Optional[str]: 生成产物，不存在或提示词已变化时返回None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT artefact, prompt_version FROM test_point_artefacts "
+                "WHERE point_id = ? AND artefact_type = ?",
+                (point_id, artefact_type)
+            ).fetchone()
+        if row is None:
+            return None
+        if prompt_version is not None and row["prompt_version"] != prompt_version:
+            return None
+        return row["artefact"]
+
+    def save_artefact(self, point_id: str, artefact_type: str, prompt_version: str,
+                      content: str, artefact: str) -> None:
+        """
+        保存测试要点的生成产物
+
+        Args:
+            point_id: 测试要点ID
+            artefact_type: 产物类型
+            prompt_version: 生成时使用的提示词版本
+            content: 测试要点内容
+            artefact: 生成产物
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO test_point_artefacts "
+                "(point_id, artefact_type, prompt_version, content, artefact, generated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (point_id, artefact_type, prompt_version, content, artefact, time.time())
+            )
+
+    def get_result(self, point_id: str, artefact_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        获取测试要点最近一次的执行结果
+
+        Args:
+            point_id: 测试要点ID
+            artefact_hash: 执行所用产物的哈希，指定时只返回同一产物的执行结果
+
+        Returns:
+            Optional[Dict[str, Any]]: 执行结果，不存在或产物已变化时返回None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT artefact_hash, result FROM test_point_results WHERE point_id = ?",
+                (point_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        if artefact_hash is not None and row["artefact_hash"] != artefact_hash:
+            return None
+        return json.loads(row["result"])
+
+    def record_result(self, point_id: str, artefact_hash: str, result: Dict[str, Any]) -> None:
+        """
+        记录测试要点的执行结果
+
+        Args:
+            point_id: 测试要点ID
+            artefact_hash: 执行所用产物的哈希
+            result: 执行结果
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO test_point_results "
+                "(point_id, artefact_hash, result, executed_at) VALUES (?, ?, ?, ?)",
+                (point_id, artefact_hash, json.dumps(result, ensure_ascii=False), time.time())
+            )
+
+    def get_execution_times(self, point_ids: List[str]) -> Dict[str, float]:
+        """
+        批量获取测试要点最近一次的执行耗时，用于执行分组时估算各组耗时
+
+        Args:
+            point_ids: 测试要点ID列表
+
+        Returns:
+            Dict[str, float]: 测试要点ID到执行耗时（秒）的映射，没有执行记录的要点不包含在内
+        """
+        times = {}
+        ids = [point_id for point_id in dict.fromkeys(point_ids) if point_id]
+        with self._connect() as conn:
+            # 分批查询，避免超过SQLite的参数数量上限
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT point_id, result FROM test_point_results "
+                    f"WHERE point_id IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for row in rows:
+                    execution_time = json.loads(row["result"]).get("execution_time")
+                    if execution_time:
+                        times[row["point_id"]] = float(execution_time)
+        return times
+
+    def describe(self, point_id: str) -> Dict[str, Any]:
+        """
+        获取测试要点的全部注册信息
+
+        Args:
+            point_id: 测试要点ID
+
+        Returns:
+            Dict[str, Any]: 包含各类生成产物及最近一次执行结果的字典
+        """
+        with self._connect() as conn:
+            artefacts = conn.execute(
+                "SELECT artefact_type, prompt_version, content, artefact, generated_at "
+                "FROM test_point_artefacts WHERE point_id = ?",
+                (point_id,)
+            ).fetchall()
+            result = conn.execute(
+                "SELECT artefact_hash, result, executed_at FROM test_point_results WHERE point_id = ?",
+                (point_id,)
+            ).fetchone()
+        return {
+            "point_id": point_id,
+            "artefacts": {row["artefact_type"]: dict(row) for row in artefacts},
+            "last_result": dict(result, result=json.loads(result["result"])) if result else None
+        }
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试要点分离模块
+逐行单遍扫描需求文本，识别多种编号和列表样式并保留层级关系，
+以生成器方式逐个产出测试要点，可直接处理文本流或大文件
+"""
+import io
+import re
+import hashlib
+import unicodedata
+from typing import Dict, Iterable, Iterator, List, Optional, Any
+
+
+# 行首编号/列表标记，只匹配行首，按行匹配不会产生跨行回溯
+_MARKER_PATTERN = re.compile(
+    r'^(?P<indent>[ \t　]*)(?:'
+    r'(?P<heading>#{1,6})[ \t]+'                                   # Markdown标题
+    r'|(?P<cn>[一二三四五六七八九十百零]+)[、.．]'                   # 一、
+    r'|(?P<dotted>\d{1,3}(?:[.．]\d+)+)(?:[.．、]|(?=[ \t　]))'  # 1.1 / 1.1.1，不匹配2024.1.1等日期
+    r'|(?P<num>\d{1,3})(?:[.．、](?!\d)|[)）])'                      # 1. / 1、 / 1)
+    r'|[(（](?P<paren>\d+|[一二三四五六七八九十]+)[)）]'              # (1) / （一）
+    r'|(?P<circled>[①-⑳])'                                # ①
+    r'|(?P<bullet>[-*+•·●○■□▪◦])[ \t]+'                             # 无序列表
+    r')[ \t　]*(?:\[[ xX]\][ \t]+)?(?P<text>.*)$'
+)
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = '。.;；,，、'
+
+# 无编号文本在找到第一个编号前最多缓存的行数，超过后按句子产出，保证内存占用恒定
+DEFAULT_MAX_PENDING_LINES = 200
+
+
+def normalize_point_content(content: str) -> str:
+    """
+    归一化测试要点内容，用于计算稳定ID
+
+    统一全角/半角字符、大小写和空白，去掉末尾标点，使措辞格式上的细微差异不影响ID
+
+    Args:
+        content: 测试要点内容
+
+    Returns:
+        str: 归一化后的内容
+    """
+    text = unicodedata.normalize('NFKC', content or "").lower()
+    text = _WHITESPACE_PATTERN.sub(' ', text).strip()
+    return text.rstrip(_TRAILING_PUNCTUATION).strip()
+
+
+def compute_point_id(content: str, parent_id: str = "", occurrence: int = 0) -> str:
+    """
+    根据归一化内容计算测试要点的稳定ID
+
+    相同内容在不同运行中得到相同ID；同一父要点下内容相同的要点按出现次序区分
+
+    Args:
+        content: 测试要点内容
+        parent_id: 父要点ID
+        occurrence: 相同内容在同一父要点下的出现次序（从0开始）
+
+    Returns:
+        str: 测试要点ID
+    """
+    key = f"{parent_id or ''}\n{normalize_point_content(content)}"
+    if occurrence:
+        key += f"\n#{occurrence}"
+    return f"TP{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}"
+
+
+def generation_content(point: Dict[str, Any]) -> str:
+    """
+    获取测试要点用于生成测试数据或脚本的内容，章节标题及各级父要点内容作为上下文放在要点内容之前
+
+    Args:
+        point: TestPointSeparator产出的测试要点
+
+    Returns:
+        str: 生成内容
+    """
+    context = [text for text in [point.get("section")] + list(point.get("context") or []) if text]
+    return '\n'.join(context + [point.get("content", "")])
+
+
+def generation_points(points: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    获取需要生成测试数据或脚本的要点内容
+
+    含子要点的要点（如“一、登录模块”“1. 支付”）只是分组标题，不单独生成，其内容作为上下文并入各子要点
+
+    Args:
+        points: TestPointSeparator产出的测试要点
+
+    Returns:
+        List[str]: 叶子要点的生成内容
+    """
+    return [generation_content(point) for point in points if not point.get("has_children")]
+
+
+class TestPointSeparator:
+    """
+    流式测试要点分离器
+
+    层级按标记样式首次出现的嵌套顺序确定：遇到已打开的样式视为同级，
+    遇到新样式视为当前要点的子要点；无序列表和数字编号还会结合缩进区分层级
+    """
+
+    def __init__(self, max_pending_lines: int = DEFAULT_MAX_PENDING_LINES):
+        """
+        初始化分离器
+
+        Args:
+            max_pending_lines: 第一个编号出现前最多缓存的无编号行数
+        """
+        self.max_pending_lines = max_pending_lines
+
+    def iter_points_from_text(self, text: str) -> Iterator[Dict[str, Any]]:
+        """
+        从文本中逐个产出测试要点
+
+        Args:
+            text: 测试用例内容
+
+        Yields:
+            Dict[str, Any]: 测试要点
+        """
+        return self.iter_points(io.StringIO(text))
+
+    def iter_points_from_file(self, file_path: str, encoding: str = 'utf-8') -> Iterator[Dict[str, Any]]:
+        """
+        从文件中逐行读取并产出测试要点
+
+        Args:
+            file_path: 文本文件路径
+            encoding: 文件编码
+
+        Yields:
+            Dict[str, Any]: 测试要点
+        """
+        with open(file_path, 'r', encoding=encoding) as f:
+            yield from self.iter_points(f)
+
+    def iter_points(self, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        单遍扫描文本行并产出测试要点
+
+        要点在下一个编号出现（或输入结束）时产出。编号出现前的无编号文本与原有规则一致：
+        文本中存在编号时丢弃，整段文本都没有编号时按句子拆分
+
+        Args:
+            lines: 文本行的可迭代对象
+
+        Yields:
+            Dict[str, Any]: 测试要点，包含id、index、content、title、number、level、
+            parent_id、path、section、context（各级父要点内容）和has_children
+        """
+        stack: List[tuple] = []  # (样式键, 要点, 同级序号, 子要点内容计数)
+        root_counts: Dict[str, int] = {}
+        current: Optional[Dict[str, Any]] = None
+        current_lines: List[str] = []
+        pending: List[str] = []
+        seen_marker = False
+        section = ""
+        index = 0
+
+        for raw_line in lines:
+            line = raw_line.rstrip('\r\n')
+            match = _MARKER_PATTERN.match(line)
+
+            if match is None:
+                if current is not None:
+                    if line.strip():
+                        current_lines.append(line.strip())
+                elif line.strip():
+                    pending.append(line)
+                    if len(pending) > self.max_pending_lines:
+                        # 长段无编号文本按句子产出，避免无限缓存
+                        for sentence in self._split_sentences(pending):
+                            index += 1
+                            point = self._build_point(index, str(index), 1, None, str(index), section)
+                            yield self._finish(point, [sentence], root_counts)
+                        pending = []
+                continue
+
+            if match.group('heading'):
+                # 标题作为后续要点的章节上下文，并结束当前列表
+                if current is not None:
+                    yield self._finish(current, current_lines, self._sibling_counts(stack, root_counts))
+                    current, current_lines = None, []
+                stack = []
+                section = match.group('text').strip()
+                continue
+
+            seen_marker = True
+            pending = []
+            style, number = self._marker_style(match)
+
+            open_styles = [entry[0] for entry in stack]
+            if current is not None:
+                if style not in open_styles:
+                    current["has_children"] = True
+                yield self._finish(current, current_lines, self._sibling_counts(stack, root_counts))
+
+            # 遇到已打开的样式时回到该层级，否则作为当前要点的子要点
+            ordinal = 1
+            if style in open_styles:
+                position = open_styles.index(style)
+                ordinal = stack[position][2] + 1
+                stack = stack[:position]
+            parent = stack[-1][1] if stack else None
+            if number is None:
+                # 无序列表没有编号，使用同级序号
+                number = str(ordinal)
+
+            index += 1
+            path = f"{parent['path']}/{number}" if parent else number
+            current = self._build_point(
+                index, number, len(stack) + 1,
+                parent["id"] if parent else None, path, section,
+                parent["context"] + [parent["content"]] if parent else []
+            )
+            current_lines = [match.group('text').strip()]
+            stack.append((style, current, ordinal, {}))
+
+        if current is not None:
+            yield self._finish(current, current_lines, self._sibling_counts(stack, root_counts))
+        elif pending and not seen_marker:
+            for sentence in self._split_sentences(pending):
+                index += 1
+                point = self._build_point(index, str(index), 1, None, str(index), section)
+                yield self._finish(point, [sentence], root_counts)
+
+    @staticmethod
+    def _marker_style(match: "re.Match") -> tuple:
+        """根据匹配结果计算标记样式键和编号文本，无序列表的编号为None"""
+        indent = match.group('indent').replace('\t', '    ').replace('　', '  ')
+        depth = len(indent) // 2
+        if match.group('cn'):
+            return ('cn',), match.group('cn')
+        if match.group('dotted'):
+            number = match.group('dotted').replace('．', '.')
+            return ('dotted', number.count('.') + 1), number
+        if match.group('num'):
+            return ('num', depth), match.group('num')
+        if match.group('paren'):
+            kind = 'paren_num' if match.group('paren').isdigit() else 'paren_cn'
+            return (kind,), f"({match.group('paren')})"
+        if match.group('circled'):
+            return ('circled',), str(ord(match.group('circled')) - 0x2460 + 1)
+        return ('bullet', depth), None
+
+    @staticmethod
+    def _split_sentences(lines: List[str]) -> List[str]:
+        """按句号和换行拆分无编号文本"""
+        sentences = []
+        for line in lines:
+            sentences.extend(s.strip() for s in line.split('。') if s.strip())
+        return sentences
+
+    @staticmethod
+    def _sibling_counts(stack: List[tuple], root_counts: Dict[str, int]) -> Dict[str, int]:
+        """获取当前要点（栈顶）所在层级的内容计数"""
+        return stack[-2][3] if len(stack) > 1 else root_counts
+
+    @staticmethod
+    def _build_point(index: int, number: str, level: int, parent_id: Optional[str], path: str,
+                     section: str, context: Optional[List[str]] = None) -> Dict[str, Any]:
+        """构建测试要点字典，ID和内容在要点结束时填充"""
+        return {
+            "id": "",
+            "index": index,
+            "content": "",
+            "title": f"测试要点 {number}",
+            "number": number,
+            "level": level,
+            "parent_id": parent_id,
+            "path": path,
+            "section": section,
+            "context": context or [],
+            "has_children": False
+        }
+
+    @staticmethod
+    def _finish(point: Dict[str, Any], lines: List[str], sibling_counts: Dict[str, int]) -> Dict[str, Any]:
+        """合并要点的续行内容，并根据内容计算稳定ID"""
+        point["content"] = '\n'.join(line for line in lines if line)
+        normalized = normalize_point_content(point["content"])
+        occurrence = sibling_counts.get(normalized, 0)
+        sibling_counts[normalized] = occurrence + 1
+        point["id"] = compute_point_id(point["content"], point["parent_id"], occurrence)
+        return point
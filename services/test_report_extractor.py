@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试报告提取模块
+将hrp生成的测试报告（summary.json或report.html）提取为统一的结构化数据
+"""
+import os
+import re
+import json
+import html
+from typing import Dict, List, Any, Optional
+
+
+# 报告文本中用于识别失败信息的关键字
+FAILURE_KEYWORDS = ("failed", "error", "exception", "失败", "错误", "异常", "timeout", "超时")
+
+
+class TestReportExtractor:
+    """测试报告提取器"""
+
+    def extract(self, report_path: str) -> Dict[str, Any]:
+        """
+        从报告路径提取结构化报告
+
+        优先读取与report.html同目录下的summary.json，不存在时退化为解析HTML文本
+
+        Args:
+            report_path: 测试报告路径
+
+        Returns:
+            Dict[str, Any]: 结构化报告，包含raw_content、text、stat、cases和failed_steps
+        """
+        raw_content = ""
+        if report_path and os.path.exists(report_path):
+            with open(report_path, 'r', encoding='utf-8') as f:
+                raw_content = f.read()
+
+        summary_path = self._find_summary_json(report_path)
+        if summary_path:
+            try:
+                with open(summary_path, 'r', encoding='utf-8') as f:
+                    summary = json.load(f)
+                report = self.extract_from_summary(summary)
+                report["raw_content"] = raw_content
+                return report
+            except (OSError, json.JSONDecodeError):
+                pass
+
+        return self.extract_from_text(raw_content)
+
+    def extract_from_summary(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        从hrp的summary.json数据中提取结构化报告
+
+        Args:
+            summary: summary.json解析后的字典
+
+        Returns:
+            Dict[str, Any]: 结构化报告
+        """
+        cases = []
+        for detail in summary.get("details") or []:
+            steps = [self._extract_step(record) for record in detail.get("records") or []]
+            cases.append({
+                "name": detail.get("name", ""),
+                "success": bool(detail.get("success", False)),
+                "elapsed_ms": sum(step["elapsed_ms"] for step in steps),
+                "steps": steps
+            })
+
+        return self._build_report(cases, stat=summary.get("stat") or {}, raw_content="")
+
+    def extract_from_text(self, content: str) -> Dict[str, Any]:
+        """
+        从报告文本（HTML或纯文本）中提取结构化报告
+
+        无法获得逐步骤数据时，将包含失败关键字的行作为失败步骤
+
+        Args:
+            content: 报告文本内容
+
+        Returns:
+            Dict[str, Any]: 结构化报告
+        """
+        # summary.json内容直接传入时按JSON解析
+        stripped = content.strip()
+        if stripped.startswith('{') and stripped.endswith('}'):
+            try:
+                report = self.extract_from_summary(json.loads(stripped))
+                report["raw_content"] = content
+                return report
+            except json.JSONDecodeError:
+                pass
+
+        text = self.html_to_text(content)
+        failed_steps = []
+        for line in text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            lowered = line.lower()
+            if any(keyword in lowered for keyword in FAILURE_KEYWORDS):
+                failed_steps.append({
+                    "case_name": "",
+                    "name": "",
+                    "success": False,
+                    "elapsed_ms": 0,
+                    "method": "",
+                    "url": "",
+                    "status_code": None,
+                    "error": line
+                })
+
+        report = self._build_report([], stat={}, raw_content=content)
+        report["failed_steps"] = failed_steps
+        report["text"] = text
+        return report
+
+    @staticmethod
+    def html_to_text(content: str) -> str:
+        """
+        将HTML内容转换为纯文本
+
+        Args:
+            content: HTML或纯文本内容
+
+        Returns:
+            str: 去除脚本、样式和标签后的文本
+        """
+        if '<' not in content:
+            return content
+        text = re.sub(r'(?is)<(script|style)[^>]*>.*?</\1>', ' ', content)
+        text = re.sub(r'(?i)<br\s*/?>|</(p|div|tr|li|h\d)>', '\n', text)
+        text = re.sub(r'<[^>]+>', ' ', text)
+        text = html.unescape(text)
+        text = re.sub(r'[ \t\r\f\v]+', ' ', text)
+        return re.sub(r'\n\s*\n+', '\n', text).strip()
+
+    def _find_summary_json(self, report_path: str) -> Optional[str]:
+        """查找报告对应的summary.json路径"""
+        if not report_path:
+            return None
+        if report_path.endswith('.json') and os.path.exists(report_path):
+            return report_path
+        summary_path = os.path.join(os.path.dirname(report_path), "summary.json")
+        return summary_path if os.path.exists(summary_path) else None
+
+    def _extract_step(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """提取单个测试步骤的关键信息"""
+        data = record.get("data") or {}
+        if not isinstance(data, dict):
+            data = {}
+        req_resps = data.get("req_resps") or {}
+        request = req_resps.get("request") or {}
+        response = req_resps.get("response") or {}
+
+        # 失败原因：优先使用attachments，其次使用未通过的校验器信息
+        error = record.get("attachments") or ""
+        if not isinstance(error, str):
+            error = json.dumps(error, ensure_ascii=False)
+        if not error:
+            failed_validators = [
+                validator for validator in data.get("validators") or []
+                if validator.get("check_result") == "fail"
+            ]
+            error = "; ".join(
+                f"{v.get('check')} {v.get('assert')} {v.get('expect')}, got {v.get('check_value')}"
+                for v in failed_validators
+            )
+
+        return {
+            "name": record.get("name", ""),
+            "success": bool(record.get("success", False)),
+            "elapsed_ms": int(record.get("elapsed_ms") or 0),
+            "method": request.get("method", ""),
+            "url": request.get("url", ""),
+            "status_code": response.get("status_code"),
+            "error": error
+        }
+
+    def _build_report(self, cases: List[Dict[str, Any]], stat: Dict[str, Any],
+                      raw_content: str) -> Dict[str, Any]:
+        """组装结构化报告"""
+        failed_steps = []
+        for case in cases:
+            for step in case["steps"]:
+                if not step["success"]:
+                    failed_steps.append(dict(step, case_name=case["name"]))
+
+        return {
+            "raw_content": raw_content,
+            "text": "",
+            "stat": stat,
+            "cases": cases,
+            "failed_steps": failed_steps
+        }
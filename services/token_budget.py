@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Token预算工具模块
+提供本地token数量估算及按token预算切分文本的功能
+"""
+import re
+from typing import List
+
+
+# 中日韩字符及全角标点，大致按每字符1个token估算
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+
+# 章节标题：Markdown标题、第X章/节/条、中文序号及数字编号
+_SECTION_HEADING_PATTERN = re.compile(
+    r'^\s*(#+\s|第[一二三四五六七八九十百\d]+[章节条部分]|[一二三四五六七八九十]+[、.．]|\d+(\.\d+)*[、.．\s](?!\d))'
+)
+
+# 标题中不会出现的句中标点，用于区分编号标题与编号列表中的需求条目
+_SENTENCE_PUNCTUATION_PATTERN = re.compile(r'[，。；：,;:！？!?]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    在本地估算文本的token数量
+
+    中文字符按每字1个token计算，其余字符按每4个字符1个token计算，
+    无需调用模型的分词器
+
+    Args:
+        text: 待估算的文本
+
+    Returns:
+        int: 估算的token数量
+    """
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    other_count = len(text) - cjk_count
+    return cjk_count + (other_count + 3) // 4
+
+
+def split_blocks(text: str) -> List[str]:
+    """
+    按空行和Markdown标题将文本切分为语义块
+
+    Args:
+        text: 待切分的文本
+
+    Returns:
+        List[str]: 非空文本块列表
+    """
+    blocks = []
+    current: List[str] = []
+    for line in text.split('\n'):
+        if (not line.strip() or line.startswith('#')) and current:
+            blocks.append('\n'.join(current))
+            current = []
+        if line.strip():
+            current.append(line)
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+
+def split_sections(text: str) -> List[str]:
+    """
+    按顶层章节标题将需求文档切分为文本块
+
+    只有层级最高的标题（如全文最高一级为“一、”时的“一、”“二、”）开始新的章节，
+    编号列表中的需求条目和下级标题留在所属章节内；第一个顶层标题之前的内容单独成块
+
+    Args:
+        text: 待切分的文本
+
+    Returns:
+        List[str]: 非空文本块列表
+    """
+    lines = text.split('\n')
+    levels = [heading_level(line) for line in lines]
+    top_level = min((level for level in levels if level), default=0)
+    blocks = []
+    current: List[str] = []
+    for line, level in zip(lines, levels):
+        if top_level and level == top_level and current:
+            blocks.append('\n'.join(current))
+            current = []
+        if line.strip():
+            current.append(line)
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+
+def split_document(text: str, max_tokens: int, max_preamble_ratio: float = 0.25) -> List[str]:
+    """
+    将需求文档按顶层章节切分为不超过token预算的分片，每个分片附带文档的共享上下文
+
+    第一个顶层标题之前的内容（文档说明、术语定义等）作为前言加到每个分片之前，
+    前言超过预算的max_preamble_ratio时按普通章节处理；超出预算的章节按行拆分，
+    拆分出的后续分片以所属的各级标题路径开头
+
+    Args:
+        text: 需求文档内容
+        max_tokens: 每个分片的最大token数（含前言）
+        max_preamble_ratio: 前言占分片预算的最大比例
+
+    Returns:
+        List[str]: 分片列表
+    """
+    sections = split_sections(text)
+    preamble = ""
+    if len(sections) > 1 and not heading_level(sections[0].split('\n', 1)[0]) \
+            and estimate_tokens(sections[0]) <= max_tokens * max_preamble_ratio:
+        preamble, sections = sections[0], sections[1:]
+    budget = max(1, max_tokens - estimate_tokens(preamble))
+
+    blocks = []
+    for section in sections:
+        blocks.extend(_split_section(section, budget) if estimate_tokens(section) > budget else [section])
+    chunks = split_by_token_budget(blocks, budget)
+    return [f"{preamble}\n\n{chunk}" for chunk in chunks] if preamble else chunks
+
+
+def split_by_token_budget(blocks: List[str], max_tokens: int) -> List[str]:
+    """
+    将文本块按token预算合并为若干分片
+
+    单个文本块超出预算时按行继续拆分，单行超出预算时按字符硬切分
+
+    Args:
+        blocks: 文本块列表
+        max_tokens: 每个分片的最大token数
+
+    Returns:
+        List[str]: 分片列表
+    """
+    max_tokens = max(1, max_tokens)
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append('\n\n'.join(current))
+        current = []
+        current_tokens = 0
+
+    for block in blocks:
+        block_tokens = estimate_tokens(block)
+        if block_tokens > max_tokens:
+            flush()
+            pieces = _split_oversized_block(block, max_tokens)
+            chunks.extend(pieces[:-1])
+            block = pieces[-1]
+            block_tokens = estimate_tokens(block)
+        if current_tokens + block_tokens > max_tokens:
+            flush()
+        current.append(block)
+        current_tokens += block_tokens
+
+    flush()
+    return chunks
+
+
+def _split_section(section: str, max_tokens: int) -> List[str]:
+    """将超出预算的章节按行拆分，续接的分片以第一行所属的标题路径开头"""
+    lines = section.split('\n')
+    pieces: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for line, path in zip(lines, heading_paths(lines)):
+        line_tokens = estimate_tokens(line)
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append('\n'.join(current))
+            current = [path] if path else []
+            current_tokens = estimate_tokens(path)
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append('\n'.join(current))
+    return pieces
+
+
+def _split_oversized_block(block: str, max_tokens: int) -> List[str]:
+    """将超出预算的文本块按行拆分"""
+    pieces: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for line in block.split('\n'):
+        line_tokens = estimate_tokens(line)
+        if line_tokens > max_tokens:
+            if current:
+                pieces.append('\n'.join(current))
+                current, current_tokens = [], 0
+            # 按字符数硬切分，每个字符最多计为1个token
+            step = max(1, max_tokens)
+            for start in range(0, len(line), step):
+                pieces.append(line[start:start + step])
+            continue
+        if current_tokens + line_tokens > max_tokens and current:
+            pieces.append('\n'.join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append('\n'.join(current))
+    return pieces or [block]
+
+
+def heading_level(line: str, max_length: int = 30) -> int:
+    """
+    获取章节标题行的层级
+
+    Markdown标题按#的数量计算；“第X章/部分”为1级、“第X节”为2级、“第X条”为3级；
+    “一、”等中文序号为1级；“1.”“1.1”等数字编号为段数加1级。
+    超过max_length、含句中标点或编号之外还有数字的行视为正文，例如编号列表中的需求条目
+
+    Args:
+        line: 单行文本
+        max_length: 标题的最大长度
+
+    Returns:
+        int: 标题层级，不是标题时返回0
+    """
+    line = line.strip()
+    match = _SECTION_HEADING_PATTERN.match(line)
+    if not match or len(line) > max_length or _SENTENCE_PUNCTUATION_PATTERN.search(line):
+        return 0
+    numbering = match.group(1).strip()
+    if re.search(r'\d', line[match.end():]):
+        return 0
+    if numbering.startswith('#'):
+        return len(numbering)
+    if numbering.startswith('第'):
+        return {'节': 2, '条': 3}.get(numbering[-1], 1)
+    if numbering[0].isdigit():
+        numbers = re.findall(r'\d+', numbering)
+        # 四位及以上的首段数字是年份等日期，如“2024.1.1 版本发布”
+        return len(numbers) + 1 if len(numbers[0]) < 4 else 0
+    return 1
+
+
+def heading_paths(lines: List[str]) -> List[str]:
+    """
+    获取每行文本所属章节的标题路径
+
+    Args:
+        lines: 按文档顺序排列的文本行
+
+    Returns:
+        List[str]: 与lines顺序一致的标题路径，各级标题以“ > ”连接，标题行为其上级标题的路径
+    """
+    stack: List[tuple] = []
+    paths = []
+    for line in lines:
+        level = heading_level(line)
+        if level:
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+        paths.append(' > '.join(title for _, title in stack))
+        if level:
+            stack.append((level, line.strip()))
+    return paths
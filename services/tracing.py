@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+链路追踪模块
+每个请求生成一条trace，接口、测试用例转换、大模型调用、测试执行及报告分析各阶段记录为嵌套的span，
+请求结束后整条trace写入本地JSONL文件，可选通过OTLP/HTTP发送到本地collector；
+响应头Server-Timing汇总各阶段耗时，便于直接在浏览器开发者工具中查看时间花在哪里
+"""
+import os
+import json
+import time
+import queue
+import secrets
+import threading
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Iterator, List, Optional
+
+from services.process_lock import ProcessLock
+
+
+class Span:
+    """一段带耗时及属性的操作"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes", "start_time", "end_time",
+                 "status", "error", "_started")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        """耗时（秒），未结束时为到目前为止的耗时"""
+        if self.end_time is None:
+            return time.perf_counter() - self._started
+        return self.end_time - self.start_time
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """设置属性"""
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        """标记为失败并记录异常"""
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        """结束span，重复调用时忽略"""
+        if self.end_time is not None:
+            return
+        self.end_time = self.start_time + (time.perf_counter() - self._started)
+        self.trace.finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可以JSON序列化的字典"""
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "pid": os.getpid()
+        }
+
+
+class _NoopSpan:
+    """追踪未启用时使用的空span"""
+
+    trace = None
+    span_id = None
+    duration = 0.0
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """一条请求链路，根span结束时导出所有已结束的span"""
+
+    def __init__(self, tracer: "Tracer", trace_id: Optional[str] = None):
+        self.tracer = tracer
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.root: Optional[Span] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._exported = False
+
+    def finish(self, span: Span) -> None:
+        """记录结束的span；根span结束后才结束的span（如请求取消后仍在执行的计算）单独导出"""
+        with self._lock:
+            if not self._exported:
+                self.spans.append(span)
+                if span is not self.root:
+                    return
+                self._exported = True
+                spans = self.spans
+            else:
+                spans = [span]
+        self.tracer.export(spans)
+
+    def completed_spans(self) -> List[Span]:
+        """获取已结束的span"""
+        with self._lock:
+            return list(self.spans)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """链路追踪"""
+
+    def __init__(self, exporters: Optional[List[Any]] = None, enabled: bool = True):
+        """
+        初始化链路追踪
+
+        Args:
+            exporters: 导出器列表，每个导出器提供export(spans)和shutdown()
+            enabled: 是否记录span，未启用时所有span为空操作
+        """
+        self.exporters = exporters or []
+        self.enabled = enabled
+
+    def configure(self, exporters: List[Any], enabled: bool = True) -> None:
+        """设置导出器并启用或关闭追踪，由服务入口在启动时调用"""
+        self.exporters = exporters
+        self.enabled = enabled
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Any]:
+        """
+        记录代码块为当前span的子span，没有当前span时开始一条新的trace
+
+        代码块中的span（包括asyncio.to_thread等复制了上下文的线程中的span）自动成为其子span；
+        不能跨越生成器的yield使用，生成器中应使用start_span
+
+        Args:
+            name: span名称，按“阶段.操作”命名，如convert.generate、llm.invoke
+            attributes: span属性
+
+        Yields:
+            Span: 当前span，可以在代码块中补充属性
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def start_span(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+                   **attributes) -> Any:
+        """
+        开始一个不设为当前span的span，需要调用end()结束，用于生成器等跨越多次调用的操作
+
+        Args:
+            name: span名称
+            trace_id: 继续上游传入的trace时的trace ID，为空时作为当前span的子span或开始新的trace
+            parent_id: 上游span ID
+            attributes: span属性
+
+        Returns:
+            Span: 新的span，未启用时返回空span
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = _current_span.get()
+        if parent is not None and trace_id is None:
+            return Span(parent.trace, name, parent.span_id, attributes)
+        trace = Trace(self, trace_id)
+        span = trace.root = Span(trace, name, parent_id, attributes)
+        return span
+
+    @contextmanager
+    def activate(self, span: Any) -> Iterator[Any]:
+        """将span设为代码块中的当前span，不结束span"""
+        if span is NOOP_SPAN:
+            yield span
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        """获取当前span"""
+        return _current_span.get()
+
+    def export(self, spans: List[Span]) -> None:
+        """将span交给所有导出器，导出失败不影响请求"""
+        records = [span.to_dict() for span in spans]
+        for exporter in self.exporters:
+            try:
+                exporter.export(records)
+            except Exception as e:
+                print(f"导出链路追踪数据失败: {e}")
+
+    def shutdown(self) -> None:
+        """关闭所有导出器"""
+        for exporter in self.exporters:
+            exporter.shutdown()
+
+
+class BackgroundSpanExporter:
+    """在后台线程中导出span的导出器基类，请求线程只入队，队列已满时丢弃"""
+
+    def __init__(self, max_queue: int = 1000, shutdown_timeout: float = 5):
+        self.shutdown_timeout = shutdown_timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        """将一批span放入导出队列"""
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            pass
+
+    def shutdown(self) -> None:
+        """导出队列中剩余的span后停止后台线程"""
+        self._queue.put(None)
+        self._thread.join(self.shutdown_timeout)
+
+    def _run(self) -> None:
+        """后台导出循环"""
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                return
+            try:
+                self._write(spans)
+            except Exception as e:
+                print(f"导出链路追踪数据失败: {e}")
+
+    def _write(self, spans: List[Dict[str, Any]]) -> None:
+        """导出一批span，由子类实现"""
+        raise NotImplementedError
+
+
+class JsonlSpanExporter(BackgroundSpanExporter):
+    """将span逐行写入本地JSONL文件，超过大小上限时轮转为.1文件"""
+
+    def __init__(self, path: str, max_bytes: int = 100 * 1024 * 1024, lock_path: Optional[str] = None):
+        """
+        初始化JSONL导出器
+
+        Args:
+            path: JSONL文件路径
+            max_bytes: 文件大小上限，0表示不轮转
+            lock_path: 跨进程锁文件路径，多个worker写入同一文件时互斥，默认为path加.lock
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = ProcessLock(lock_path or path + ".lock")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        super().__init__()
+
+    def _write(self, spans: List[Dict[str, Any]]) -> None:
+        """追加写入一批span"""
+        data = "".join(json.dumps(span, ensure_ascii=False, default=str) + "\n" for span in spans)
+        with self._lock:
+            if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+
+
+class OtlpHttpSpanExporter(BackgroundSpanExporter):
+    """通过OTLP/HTTP（JSON编码）将span发送到collector，不依赖OpenTelemetry SDK"""
+
+    def __init__(self, endpoint: str, service_name: str = "test-assistant", timeout: float = 5):
+        """
+        初始化OTLP导出器
+
+        Args:
+            endpoint: collector的traces接收地址，如http://localhost:4318/v1/traces
+            service_name: 上报的服务名
+            timeout: 单次发送的超时秒数
+        """
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        super().__init__(shutdown_timeout=timeout)
+
+    def _write(self, spans: List[Dict[str, Any]]) -> None:
+        """发送一批span"""
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(self._encode(spans)).encode('utf-8'),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        urllib.request.urlopen(request, timeout=self.timeout).close()
+
+    def _encode(self, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """按OTLP JSON格式编码span"""
+        encoded = []
+        for span in spans:
+            start = int(span["start_time"] * 1e9)
+            attributes = dict(span["attributes"], pid=span["pid"])
+            if span["error"]:
+                attributes["error"] = span["error"]
+            encoded.append({
+                "traceId": span["trace_id"],
+                "spanId": span["span_id"],
+                "parentSpanId": span["parent_id"] or "",
+                "name": span["name"],
+                # 根span为服务端span，其余为内部span
+                "kind": 2 if span["parent_id"] is None else 1,
+                "startTimeUnixNano": str(start),
+                "endTimeUnixNano": str(start + int(span["duration_ms"] * 1e6)),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+                "status": {"code": 2 if span["status"] == "error" else 1}
+            })
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name",
+                                             "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "services.tracing"}, "spans": encoded}]
+            }]
+        }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """将属性值编码为OTLP AnyValue"""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def parse_traceparent(header: Optional[str]) -> tuple:
+    """
+    解析W3C traceparent请求头
+
+    Args:
+        header: traceparent请求头，形如00-<32位trace ID>-<16位span ID>-<flags>
+
+    Returns:
+        tuple: (trace ID, 上游span ID)，请求头缺失或格式错误时为 (None, None)
+    """
+    parts = (header or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None, None
+    if set(parts[1]) == {"0"} or set(parts[2]) == {"0"}:
+        return None, None
+    return parts[1].lower(), parts[2].lower()
+
+
+def server_timing(root: Span, max_entries: int = 20) -> str:
+    """
+    按span名称汇总已结束的子span耗时，生成Server-Timing响应头
+
+    同名span的耗时相加，嵌套的span分别计入各自名称；按耗时从大到小最多输出max_entries项
+
+    Args:
+        root: 请求的根span
+        max_entries: 最多输出的阶段数
+
+    Returns:
+        str: Server-Timing响应头的值
+    """
+    totals: Dict[str, List[float]] = {}
+    for span in root.trace.completed_spans():
+        if span is root:
+            continue
+        entry = totals.setdefault(span.name, [0.0, 0])
+        entry[0] += span.duration
+        entry[1] += 1
+    items = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:max_entries]
+    entries = [f'{name};dur={total * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+               for name, (total, count) in items]
+    entries.append(f"total;dur={root.duration * 1000:.1f}")
+    entries.append(f'trace;desc="{root.trace.trace_id}"')
+    return ", ".join(entries)
+
+
+class TracingMiddleware:
+    """为每个请求开始一条trace的ASGI中间件，并在响应头中添加Server-Timing及traceparent"""
+
+    def __init__(self, app, tracer: Tracer, route_namer=None, add_server_timing: bool = True):
+        """
+        初始化链路追踪中间件
+
+        Args:
+            app: 下游ASGI应用
+            tracer: 链路追踪
+            route_namer: 根据路由匹配后的scope返回路由模板的函数，用于根span名称
+            add_server_timing: 是否添加Server-Timing响应头
+        """
+        self.app = app
+        self.tracer = tracer
+        self.route_namer = route_namer
+        self.add_server_timing = add_server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        trace_id, parent_id = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        span = self.tracer.start_span(f"{scope['method']} {scope['path']}", trace_id=trace_id,
+                                      parent_id=parent_id, method=scope["method"], path=scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("status_code", message["status"])
+                extra = [(b"traceparent", f"00-{span.trace.trace_id}-{span.span_id}-01".encode())]
+                if self.add_server_timing:
+                    # 流式响应只包含响应头发送之前已结束的阶段
+                    extra.append((b"server-timing", server_timing(span).encode()))
+                message = dict(message, headers=list(message.get("headers", [])) + extra)
+            await send(message)
+
+        try:
+            with self.tracer.activate(span):
+                await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            if self.route_namer is not None:
+                route = self.route_namer(scope)
+                span.name = f"{scope['method']} {route}"
+                span.set_attribute("route", route)
+            span.end()
+
+
+# 进程内共享的链路追踪，服务入口通过configure配置导出器后启用，各服务直接导入使用
+tracer = Tracer(enabled=False)
@@ -326,6 +326,106 @@ async function analyzeTestResultsStructured(testCase, responsePayload) {
     }
 }
 
+// 结构化分析各部分对应的页面元素及需要清理的重复标题
+const ANALYSIS_SECTIONS = {
+    first_part: { elementId: 'first-part-content', title: /[：:]测试案例分析/ },
+    second_part: { elementId: 'second-part-content', title: /[：:]测试结果分析/ },
+    third_part: { elementId: 'third-part-content', title: /[：:]指导建议/ },
+    summary: { elementId: 'summary-content', title: /[：:]总结/ }
+};
+
+// 渲染结构化分析的单个部分
+function renderAnalysisSection(section, content) {
+    const config = ANALYSIS_SECTIONS[section];
+    if (!config) {
+        return;
+    }
+    const cleanContent = (content || '').replace(config.title, '').trim();
+    document.getElementById(config.elementId).innerHTML =
+        typeof marked !== 'undefined' ? marked.parse(cleanContent) : cleanContent.replace(/\n/g, '<br>');
+}
+
+// AI结果分析函数（流式结构化版本），每个部分完成后立即渲染
+async function analyzeTestResultsStructuredStream(testCase, responsePayload) {
+    const data = typeof responsePayload === 'string' ? JSON.parse(responsePayload) : responsePayload;
+    
+    // 获取最新的测试报告路径
+    let testReportPath = '';
+    try {
+        const latestReport = await fetchLatestReport();
+        if (latestReport && latestReport.report_path) {
+            testReportPath = latestReport.report_path;
+        }
+    } catch (reportError) {
+        console.warn('获取测试报告路径失败:', reportError);
+    }
+    
+    const requestData = {
+        test_report_path: testReportPath,
+        execution_result: {
+            success: data.data?.success,
+            output: data.data?.output || '',
+            error: data.data?.error || ''
+        }
+    };
+    
+    const response = await fetch(`${ApiConfig.BACKEND_SERVICE_URL}${ApiConfig.API_ENDPOINTS.ANALYZE_RESULTS_STRUCTURED_STREAM}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(requestData)
+    });
+    
+    // 不支持流式读取时退回到非流式接口
+    if (!response.ok || !response.body) {
+        return analyzeTestResultsStructured(testCase, responsePayload);
+    }
+    
+    Object.values(ANALYSIS_SECTIONS).forEach(config => {
+        document.getElementById(config.elementId).innerHTML = '分析中...';
+    });
+    aiAnalysisSection.style.display = 'block';
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder('utf-8');
+    let buffer = '';
+    
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        
+        // SSE事件以空行分隔
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let eventName = 'message';
+            let eventData = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    eventName = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    eventData += line.slice(5).trim();
+                }
+            });
+            
+            const payload = eventData ? JSON.parse(eventData) : {};
+            if (eventName === 'section') {
+                renderAnalysisSection(payload.section, payload.content);
+            } else if (eventName === 'done') {
+                Object.keys(ANALYSIS_SECTIONS).forEach(section => renderAnalysisSection(section, payload[section]));
+            } else if (eventName === 'error') {
+                throw new Error(payload.error || 'AI分析失败');
+            }
+        }
+    }
+}
+
 // 显示加载状态的函数
 function showLoadingState(element, isLoading) {
     if (element && isLoading) {
@@ -678,8 +778,8 @@ aiAnalysisBtn.addEventListener('click', async () => {
     aiAnalysisBtn.textContent = '分析中...';
     
     try {
-        // AI结果分析（结构化版本）
-        await analyzeTestResultsStructured(testCase, response);
+        // AI结果分析（流式结构化版本）
+        await analyzeTestResultsStructuredStream(testCase, response);
         
         // 滚动到AI分析结果区域
         aiAnalysisSection.scrollIntoView({ behavior: 'smooth' });
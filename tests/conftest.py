@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试公共配置
+将项目根目录加入导入路径，并在导入config之前将数据目录指向临时目录，测试不会写入仓库中的数据文件
+"""
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="test_assistant_"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
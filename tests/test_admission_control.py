@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+准入控制测试
+类别内并发限制、排队已满立即拒绝、排队超时，以及名额空出时按优先级分配
+"""
+import asyncio
+
+import pytest
+
+from services.admission_control import AdmissionController, AdmissionRejected
+
+
+def classes(**overrides):
+    config = {
+        "interactive": {"priority": 0, "max_concurrency": 1, "max_queue": 2, "queue_timeout": 5},
+        "batch": {"priority": 1, "max_concurrency": 1, "max_queue": 1, "queue_timeout": 5}
+    }
+    for name, values in overrides.items():
+        config[name].update(values)
+    return config
+
+
+def test_queue_full_rejected():
+    async def scenario():
+        controller = AdmissionController(classes())
+        await controller.acquire("batch")
+        waiter = asyncio.ensure_future(controller.acquire("batch"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("batch")
+        assert excinfo.value.retry_after >= 1
+        assert controller.stats()["batch"]["queued"] == 1
+        controller.release("batch")
+        await waiter
+        stats = controller.stats()["batch"]
+        assert (stats["running"], stats["queued"], stats["admitted"], stats["rejected"]) == (1, 0, 2, 1)
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout():
+    async def scenario():
+        controller = AdmissionController(classes(batch={"queue_timeout": 0.05}))
+        async with controller.admit("batch"):
+            with pytest.raises(AdmissionRejected):
+                await controller.acquire("batch")
+        stats = controller.stats()["batch"]
+        assert (stats["running"], stats["timed_out"]) == (0, 1)
+
+    asyncio.run(scenario())
+
+
+def test_priority_dispatch():
+    async def scenario():
+        controller = AdmissionController(classes(), total_concurrency=1)
+        order = []
+
+        async def request(name):
+            async with controller.admit(name):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        await controller.acquire("batch")
+        tasks = [asyncio.ensure_future(request("batch")), asyncio.ensure_future(request("interactive"))]
+        await asyncio.sleep(0)
+        controller.release("batch")
+        await asyncio.gather(*tasks)
+        assert order == ["interactive", "batch"]
+
+    asyncio.run(scenario())
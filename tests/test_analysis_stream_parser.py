@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI分析结果增量解析测试
+各部分在下一个标识出现时立即产出，标识被拆分在两次输入之间时也能识别
+"""
+from services.analysis_stream_parser import IncrementalSectionParser
+
+ANSWER = "前言\n第一部分 需求概述\n第二部分 测试范围\n其中提到第一部分\n第三部分 风险\n总结 结论"
+
+
+def test_sections_emitted_incrementally():
+    parser = IncrementalSectionParser()
+    assert parser.feed("前言\n第一部分 需求概述\n") == []
+    assert parser.feed("第二部分 测试范围\n") == [("first_part", "需求概述")]
+    assert parser.feed("其中提到第一部分\n第三部分 风险\n总结 结论") == [
+        ("second_part", "测试范围\n其中提到第一部分"), ("third_part", "风险")
+    ]
+    assert parser.close() == [("summary", "结论")]
+    assert parser.close() == []
+
+
+def test_markers_split_across_chunks():
+    whole = IncrementalSectionParser()
+    whole.feed(ANSWER)
+    whole.close()
+    parser = IncrementalSectionParser()
+    completed = []
+    for char in ANSWER:
+        completed.extend(parser.feed(char))
+    completed.extend(parser.close())
+    assert [key for key, _ in completed] == ["first_part", "second_part", "third_part", "summary"]
+    assert parser.result == whole.result
+
+
+def test_missing_sections():
+    parser = IncrementalSectionParser()
+    parser.feed("没有分段的回答")
+    assert parser.close() == []
+    assert parser.result == {"first_part": "", "second_part": "", "third_part": "", "summary": ""}
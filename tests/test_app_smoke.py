@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务启动冒烟测试
+在临时数据目录中导入main并通过TestClient启动应用，确认各服务能够初始化、基础接口可以访问
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+DATA_DIR = tempfile.mkdtemp(prefix="test_assistant_")
+os.environ["DATA_DIR"] = DATA_DIR
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("WORKERS", "1")
+os.environ["RETENTION_ENABLED"] = "false"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def test_health(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "healthy"}
+
+
+def test_reports_list(client):
+    response = client.get("/api/v1/reports")
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+
+
+def test_metrics(client):
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
+
+
+def test_server_timing_header(client):
+    response = client.get("/api/v1/reports")
+    assert "server-timing" in response.headers
+    assert "traceparent" in response.headers
+
+
+def test_document_upload(client):
+    response = client.post(
+        "/api/v1/documents/upload",
+        files=[("files", ("rules.txt", "1. 用户登录成功\n2. 用户退出登录".encode("utf-8"), "text/plain"))],
+        data={"num_groups": "1"}
+    )
+    body = response.json()
+    assert body["success"] is True, body["error"]
+    assert body["total_points"] == 2
+    assert body["files"][0]["size"] == len("1. 用户登录成功\n2. 用户退出登录".encode("utf-8"))
+
+
+def test_document_upload_too_large(client, monkeypatch):
+    monkeypatch.setattr(main.document_ingestion_service, "max_upload_size", 8)
+    response = client.post("/api/v1/documents/upload",
+                           files=[("files", ("rules.txt", b"1. login ok\n2. logout ok", "text/plain"))])
+    body = response.json()
+    assert body["success"] is False
+    assert "超过大小上限" in body["error"]
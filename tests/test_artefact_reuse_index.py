@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成产物复用索引测试
+默认只复用内容相同的历史要点的产物；模糊复用时否定词、HTTP方法不同的要点不复用，数字不同时按上下文替换
+"""
+import os
+
+from services.artefact_reuse_index import ArtefactReuseIndex
+
+TRANSFER = "用户账户余额充足且已完成实名认证时允许发起转账"
+TRANSFER_ARTEFACT = "name: 允许转账\nrequest:\n  method: POST\n  url: /api/transfer\nvalidate:\n  - eq: [status_code, 200]"
+
+
+def make_index(tmp_path, **kwargs) -> ArtefactReuseIndex:
+    index = ArtefactReuseIndex(os.path.join(str(tmp_path), "reuse.db"), **kwargs)
+    index.add("TP1", "test_data", "v1", TRANSFER, TRANSFER_ARTEFACT)
+    return index
+
+
+def test_exact_match_reused(tmp_path):
+    match = make_index(tmp_path).lookup(TRANSFER + "。", "test_data", "v1")
+    assert match["artefact"] == TRANSFER_ARTEFACT
+    assert match["source_point_id"] == "TP1"
+    assert match["adapted"] is False
+
+
+def test_similar_not_reused_by_default(tmp_path):
+    index = make_index(tmp_path)
+    assert index.lookup("用户账户余额充足且已经完成实名认证时允许发起转账", "test_data", "v1") is None
+    assert index.lookup("用户账户余额充足且已经完成实名认证时允许发起转账", "test_data", "v1", fuzzy=True) is not None
+
+
+def test_negation_not_reused(tmp_path):
+    index = make_index(tmp_path, fuzzy=True)
+    assert index.lookup("用户账户余额充足且已完成实名认证时不允许发起转账", "test_data", "v1") is None
+
+
+def test_http_method_not_reused(tmp_path):
+    index = ArtefactReuseIndex(os.path.join(str(tmp_path), "reuse.db"), fuzzy=True)
+    index.add("TP1", "test_data", "v1", "GET /api/users returns the user list", "method: GET")
+    assert index.lookup("POST /api/users returns the user list", "test_data", "v1") is None
+    assert index.lookup("GET /api/users returns the user list.", "test_data", "v1") is not None
+
+
+def test_prompt_version_isolated(tmp_path):
+    assert make_index(tmp_path).lookup(TRANSFER, "test_data", "v2") is None
+
+
+def test_numbers_substituted_by_context(tmp_path):
+    index = ArtefactReuseIndex(os.path.join(str(tmp_path), "reuse.db"), fuzzy=True)
+    index.add("TP1", "test_data", "v1", "借款期限为12个月的用户可以申请提前还款",
+              "name: 借款12个月提前还款\nsteps:\n  - 选择期限12个月\n  - 申请提前还款")
+    match = index.lookup("借款期限为24个月的用户可以申请提前还款", "test_data", "v1")
+    assert match["adapted"] is True
+    assert "24个月" in match["artefact"] and "12" not in match["artefact"]
+
+
+def test_ambiguous_number_not_substituted(tmp_path):
+    index = ArtefactReuseIndex(os.path.join(str(tmp_path), "reuse.db"), fuzzy=True)
+    index.add("TP1", "test_data", "v1", "借款期限为12个月的用户可以申请提前还款",
+              "name: 借款12个月提前还款\nrequest:\n  json:\n    term: 12")
+    assert index.lookup("借款期限为24个月的用户可以申请提前还款", "test_data", "v1") is None
+
+
+def test_index_shared_between_instances(tmp_path):
+    make_index(tmp_path)
+    index = ArtefactReuseIndex(os.path.join(str(tmp_path), "reuse.db"))
+    assert index.size() == 1
+    assert index.lookup(TRANSFER, "test_data", "v1")["source_point_id"] == "TP1"
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量生成输出拆分测试
+按分隔行拆分批量响应，缺失或格式错误的要点可重新请求；批量与单要点生成的产物格式一致
+"""
+from types import SimpleNamespace
+
+from services.batch_output_splitter import (
+    format_batch_points, split_batch_response, pack_points, missing_points, merge_batch_results, strip_code_fence
+)
+from services.langchain_service import LangChainService
+
+
+def script(name: str) -> str:
+    return f"config:\n  name: {name}\nteststeps:\n- name: {name}\n  request:\n    method: GET\n    url: /api/{name}"
+
+
+def section(key: str, body: str) -> str:
+    return f"===== TEST_POINT {key} BEGIN =====\n{body}\n===== TEST_POINT {key} END ====="
+
+
+def test_format_batch_points():
+    assert format_batch_points(["登录", "退出"]) == "[P1] 登录\n[P2] 退出"
+
+
+def test_split_batch_response():
+    response = "\n".join([
+        "说明文字",
+        section("P1", script("login")),
+        "=== test_point p2 begin ===\n```yaml\n" + script("logout") + "\n```\n=== TEST_POINT P2 END ===",
+        section("P3", "不是测试用例"),
+        section("P9", script("extra"))
+    ])
+    sections = split_batch_response(response, 3)
+    assert sections == {1: script("login"), 2: script("logout")}
+    assert missing_points([4, 5, 6], sections) == [6]
+
+
+def test_split_batch_response_with_validator():
+    sections = split_batch_response(section("P1", "用例1") + "\n" + section("P2", ""), 2, validator=bool)
+    assert sections == {1: "用例1"}
+
+
+def test_strip_code_fence():
+    assert strip_code_fence("```yaml\nconfig: {}\n```\n") == "config: {}"
+    assert strip_code_fence("config: {}") == "config: {}"
+
+
+def test_pack_points():
+    points = ["a" * 40, "b" * 40, "c" * 40, "d"]
+    assert pack_points(points, template_tokens=10, token_budget=70, output_tokens_per_point=10, max_points=3) \
+        == [[0, 1], [2, 3]]
+    assert pack_points(points, template_tokens=0, token_budget=1000, output_tokens_per_point=0, max_points=3) \
+        == [[0, 1, 2], [3]]
+
+
+def test_merge_batch_results():
+    assert merge_batch_results([([3, 7], {1: "a", 2: "b"}), ([5], {})]) == {3: "a", 7: "b"}
+
+
+def test_batched_and_single_outputs_identical():
+    service = LangChainService()
+    points = ["用户登录", "用户退出"]
+    names = {"用户登录": "login", "用户退出": "logout"}
+
+    def invoke(prompt_key, prompt):
+        name = next(name for point, name in names.items() if point in prompt)
+        return SimpleNamespace(content=f"```yaml\n{script(name)}\n```")
+
+    def batch(prompt_key, prompts, max_concurrency):
+        return [SimpleNamespace(content="\n".join(
+            section(f"P{i}", f"```yaml\n{script(names[point])}\n```") for i, point in enumerate(points, 1)
+        )) for _ in prompts]
+
+    service._invoke = invoke
+    service._batch = batch
+    single = [service.generate_test_script(point) for point in points]
+    assert single == [script("login"), script("logout")]
+    assert service.generate_test_scripts_batched(points) == single
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存服务测试
+缓存键、LRU淘汰与过期、SQLite后端，以及get_or_compute的并发防击穿和命中统计
+"""
+import threading
+import time
+
+import pytest
+
+from services.cache_service import CacheService, MemoryCacheBackend, SQLiteCacheBackend, make_cache_key
+
+
+def test_make_cache_key():
+    key = make_cache_key("convert", "用例", {"a": 1})
+    assert key.startswith("convert:") and len(key) == len("convert:") + 32
+    assert key == make_cache_key("convert", "用例", {"a": 1})
+    assert key != make_cache_key("convert", "用例", {"a": 2})
+
+
+def test_memory_backend_lru_and_ttl():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a:1", b"1")
+    backend.set("a:2", b"2")
+    backend.get("a:1")
+    assert backend.set("a:3", b"3") == 1
+    assert (backend.get("a:1"), backend.get("a:2"), backend.get("a:3")) == (b"1", None, b"3")
+    backend.set("a:4", b"4", ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("a:4") is None
+    assert backend.clear("a") == 1
+
+
+def test_memory_backend_max_bytes():
+    backend = MemoryCacheBackend(max_bytes=4)
+    backend.set("a:1", b"12")
+    backend.set("a:2", b"34")
+    assert backend.set("a:3", b"5") == 1
+    assert backend.set("a:big", b"12345") == 0
+    assert backend.usage() == {"a": {"entries": 2, "bytes": 3}}
+
+
+@pytest.mark.parametrize("make_backend", [
+    lambda tmp_path: MemoryCacheBackend(),
+    lambda tmp_path: SQLiteCacheBackend(str(tmp_path / "cache.db"), lock_dir=str(tmp_path / "locks"))
+])
+def test_cache_service(tmp_path, make_backend):
+    cache = CacheService(make_backend(tmp_path), namespace_ttls={"short": 0.01})
+    cache.set("convert", "k", {"result": [1, "二"]})
+    assert cache.get("convert", "k") == {"result": [1, "二"]}
+    assert cache.get("convert", "missing", "default") == "default"
+    cache.set("short", "k", 1)
+    time.sleep(0.02)
+    assert cache.get("short", "k") is None
+    cache.delete("convert", "k")
+    assert cache.get("convert", "k") is None
+    stats = cache.stats()["namespaces"]["convert"]
+    assert (stats["hits"], stats["misses"], stats["sets"], stats["hit_rate"]) == (1, 2, 1, 0.3333)
+
+
+def test_get_or_compute_concurrent(tmp_path):
+    cache = CacheService(SQLiteCacheBackend(str(tmp_path / "cache.db"), lock_dir=str(tmp_path / "locks")))
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("analyze", "k", compute)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+    stats = cache.stats()["namespaces"]["analyze"]
+    assert (stats["computes"], stats["entries"]) == (1, 1)
+    assert stats.get("coalesced", 0) + stats.get("hits", 0) == 3
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel文件处理测试
+流式逐行读取工作簿，文本输出可逐行写入文本流；结构化输出默认与原有行为一致
+"""
+import io
+import os
+
+import pandas as pd
+
+from services.excel_processor import ExcelProcessor
+
+
+def write_workbook(tmp_path) -> str:
+    path = os.path.join(str(tmp_path), "cases.xlsx")
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({"用例编号": ["C1", None, "C3"], "测试要点": [" 登录 ", None, "退出"]}) \
+            .to_excel(writer, sheet_name="登录", index=False)
+        pd.DataFrame({"描述": ["支付成功"], "备注": [12]}).to_excel(writer, sheet_name="支付", index=False)
+    return path
+
+
+def test_text_lines(tmp_path):
+    lines = list(ExcelProcessor.iter_excel_text_lines(write_workbook(tmp_path)))
+    assert lines == [
+        "工作表: 登录", "用例编号\t测试要点", "C1\t登录", "C3\t退出", "=" * 50,
+        "工作表: 支付", "描述\t备注", "支付成功\t12", "=" * 50
+    ]
+
+
+def test_text_written_to_buffer(tmp_path):
+    path = write_workbook(tmp_path)
+    buf = io.StringIO()
+    assert ExcelProcessor.extract_test_cases_from_excel(path, buf=buf) is None
+    assert buf.getvalue() == ExcelProcessor.extract_test_cases_from_excel(path) + "\n"
+
+
+def test_iter_test_cases_rows(tmp_path):
+    cases = list(ExcelProcessor.iter_test_cases_from_excel(write_workbook(tmp_path), sheet_names=["登录"]))
+    assert [(case["row"], case["values"]) for case in cases] == [
+        (2, {"用例编号": "C1", "测试要点": "登录"}),
+        (4, {"用例编号": "C3", "测试要点": "退出"})
+    ]
+
+
+def test_structured_defaults_unchanged(tmp_path):
+    records = ExcelProcessor.extract_structured_test_cases_from_excel(write_workbook(tmp_path))
+    assert records == [
+        {"用例编号": "C1", "测试要点": " 登录 "},
+        {"用例编号": "", "测试要点": ""},
+        {"用例编号": "C3", "测试要点": "退出"}
+    ]
+
+
+def test_structured_cleanup_options(tmp_path):
+    records = ExcelProcessor.extract_structured_test_cases_from_excel(
+        write_workbook(tmp_path), drop_empty_rows=True, strip_values=True
+    )
+    assert records == [{"用例编号": "C1", "测试要点": "登录"}, {"用例编号": "C3", "测试要点": "退出"}]
+
+
+def test_iter_test_points(tmp_path):
+    points = list(ExcelProcessor.iter_test_points_from_excel(write_workbook(tmp_path)))
+    assert [(point["sheet"], point["id"], point["content"]) for point in points] == [
+        ("登录", "C1", "登录"), ("登录", "C3", "退出"), ("支付", points[2]["id"], "支付成功")
+    ]
+    assert points[2]["id"].startswith("TP")
+    assert points[2]["备注"] == "12"
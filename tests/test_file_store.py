@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件存储测试
+内容寻址存储的去重压缩与摘要校验，以及删除任务后按宽限期回收不再引用的内容
+"""
+import os
+
+import pytest
+
+from services.blob_store import BlobStore
+from services.file_store import FileStore
+
+
+def test_blob_store_put_get_delete(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"), codec="gzip")
+    data = "测试数据".encode("utf-8") * 100
+    blob = store.put(data)
+    assert blob["created"] and blob["codec"] == "gzip" and blob["stored_size"] < blob["size"]
+    assert store.put(data)["created"] is False
+    assert store.get(blob["digest"]) == data
+    assert [digest for digest, _ in store.iter_blobs()] == [blob["digest"]]
+    assert store.delete(blob["digest"]) == blob["stored_size"]
+    assert not store.exists(blob["digest"])
+    assert os.listdir(tmp_path / "blobs") == []
+    with pytest.raises(KeyError):
+        store.get(blob["digest"])
+
+
+def test_file_store_dedup_and_gc(tmp_path):
+    store = FileStore(str(tmp_path / "store"), blob_store=BlobStore(str(tmp_path / "blobs"), codec="gzip"))
+    shared = b"shared content" * 50
+    first = store.save_files({"a.yml": shared, "b.yml": b"only first"})
+    second = store.save_files({"c.yml": shared})
+    assert store.read_file(first["store_id"], "a.yml") == shared
+    stats = store.blob_stats()
+    assert (stats["references"], stats["blobs"], stats["unreferenced_blobs"]) == (3, 2, 0)
+
+    assert store.delete_task(first["store_id"])
+    assert store.gc_blobs(grace_seconds=3600) == {"deleted_blobs": 0, "freed_bytes": 0}
+    result = store.gc_blobs(grace_seconds=-1)
+    assert result["deleted_blobs"] == 1 and result["freed_bytes"] > 0
+    assert store.read_file(second["store_id"], "c.yml") == shared
+    assert store.blob_stats()["blobs"] == 1
+
+
+def test_gc_removes_orphaned_blobs(tmp_path):
+    blobs = BlobStore(str(tmp_path / "blobs"), codec="gzip")
+    store = FileStore(str(tmp_path / "store"), blob_store=blobs)
+    orphan = blobs.put(b"written before metadata")
+    assert store.gc_blobs(grace_seconds=3600)["deleted_blobs"] == 0
+    assert store.gc_blobs(grace_seconds=-1)["deleted_blobs"] == 1
+    assert not blobs.exists(orphan["digest"])
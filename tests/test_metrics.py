@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+指标测试
+多个worker快照的合并及Prometheus文本格式输出
+"""
+from services.metrics import MetricsRegistry
+
+
+def make_registry(requests: int, latency: float) -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "请求数")
+    registry.gauge("inflight", "进行中的请求数")
+    registry.histogram("latency_seconds", "请求耗时", buckets=(0.1, 1))
+    registry.inc("requests_total", {"route": "/api/convert"}, requests)
+    registry.set("inflight", 1)
+    registry.observe("latency_seconds", latency, {"route": "/api/convert"})
+    return registry
+
+
+def test_merge():
+    merged = MetricsRegistry.merge([make_registry(2, 0.05).snapshot(), make_registry(3, 0.5).snapshot()])
+    assert merged["requests_total"]["series"] == [[[("route", "/api/convert")], 5]]
+    assert merged["inflight"]["series"] == [[[], 2]]
+    assert merged["latency_seconds"]["series"] == [[[("route", "/api/convert")], [[1, 1], 0.55, 2]]]
+
+
+def test_render():
+    registry = make_registry(2, 5)
+    registry.inc("requests_total", {"route": 'a"b\n'})
+    text = MetricsRegistry.render(registry.snapshot())
+    assert text.splitlines() == [
+        "# HELP inflight 进行中的请求数",
+        "# TYPE inflight gauge",
+        "inflight 1",
+        "# HELP latency_seconds 请求耗时",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/api/convert",le="0.1"} 0',
+        'latency_seconds_bucket{route="/api/convert",le="1"} 0',
+        'latency_seconds_bucket{route="/api/convert",le="+Inf"} 1',
+        'latency_seconds_sum{route="/api/convert"} 5',
+        'latency_seconds_count{route="/api/convert"} 1',
+        "# HELP requests_total 请求数",
+        "# TYPE requests_total counter",
+        'requests_total{route="/api/convert"} 2',
+        'requests_total{route="a\\"b\\n"} 1',
+    ]
+
+
+def test_render_skips_empty_metrics():
+    registry = MetricsRegistry()
+    registry.counter("unused_total", "未使用")
+    assert MetricsRegistry.render(registry.snapshot()) == "\n"
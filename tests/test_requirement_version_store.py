@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+需求版本比对测试
+仅移动位置的单元视为未变化，相似单元配对为修改，其余为新增或删除
+"""
+from services.requirement_version_store import diff_units, fingerprint_units
+
+
+def units(*contents):
+    return [{"content": content} for content in contents]
+
+
+def diff(old, new):
+    return diff_units(old, fingerprint_units(old), new, fingerprint_units(new))
+
+
+def test_fingerprint_ignores_format_and_counts_duplicates():
+    first, second, third = fingerprint_units(units("用户登录", "用户 登录。", "用户退出"))
+    assert first != second
+    assert fingerprint_units(units("用户登录"))[0] == first
+    assert third not in (first, second)
+
+
+def test_diff_units():
+    old = units("用户使用正确密码登录成功", "用户退出", "导出报表为Excel")
+    new = units("用户退出", "用户使用正确密码登录成功并跳转首页", "删除用户需要二次确认")
+    assert diff(old, new) == {"added": [2], "removed": [2], "changed": [(0, 1)], "unchanged": [0]}
+
+
+def test_diff_units_moved_only():
+    old = units("用户登录", "用户退出")
+    assert diff(old, list(reversed(old))) == {"added": [], "removed": [], "changed": [], "unchanged": [0, 1]}
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+保留策略测试
+按保留天数、数量和总大小计算需要归档的条目，最近修改的条目不归档；归档后可查询摘要
+"""
+import os
+import time
+
+from services.retention_service import RetentionService
+
+DAY = 86400
+
+
+def make_entry(directory, name, age_days, size=10, now=None):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    modified_at = (now or time.time()) - age_days * DAY
+    os.utime(path, (modified_at, modified_at))
+
+
+def make_service(tmp_path, policies, **kwargs):
+    return RetentionService(archive_dir=str(tmp_path / "archives"), policies=policies, io_rate_bytes=None,
+                            root_dir=str(tmp_path), **kwargs)
+
+
+def test_plan(tmp_path):
+    now = time.time()
+    results = tmp_path / "results"
+    results.mkdir()
+    for name, age in [("new.json", 0), ("recent.json", 1), ("middle.json", 2), ("old.json", 40)]:
+        make_entry(str(results), name, age, now=now)
+    service = make_service(tmp_path, {"results": {"max_age_days": 30, "max_count": 2}})
+    planned = {entry["name"]: entry["reason"] for entry in service.plan(now)}
+    assert planned == {"middle.json": "count", "old.json": "age"}
+
+
+def test_plan_size_and_pattern(tmp_path):
+    now = time.time()
+    reports = tmp_path / "reports"
+    reports.mkdir()
+    for name, age in [("a_1.html", 1), ("a_2.html", 2), ("a_3.html", 3), ("b_1.html", 4)]:
+        make_entry(str(reports), name, age, size=400 * 1024, now=now)
+    service = make_service(tmp_path, {"reports": {"max_size_mb": 1, "pattern": "a_*"}})
+    assert [(entry["name"], entry["reason"]) for entry in service.plan(now)] == [("a_3.html", "size")]
+
+
+def test_plan_skips_entries_in_use(tmp_path):
+    now = time.time()
+    results = tmp_path / "results"
+    results.mkdir()
+    make_entry(str(results), "running.json", 0, now=now)
+    make_entry(str(results), "done.json", 1, now=now)
+    service = make_service(tmp_path, {"results": {"max_count": 0}}, min_age_seconds=600)
+    assert [entry["name"] for entry in service.plan(now)] == ["done.json"]
+
+
+def test_run_once_archives(tmp_path):
+    results = tmp_path / "results"
+    results.mkdir()
+    make_entry(str(results), "old.json", 40)
+    service = make_service(tmp_path, {"results": {"max_age_days": 30}})
+    assert [entry["name"] for entry in service.run_once(dry_run=True)["planned"]] == ["old.json"]
+    result = service.run_once()
+    assert result["archived"] == 1 and not result["errors"]
+    assert not (results / "old.json").exists()
+    assert [entry["name"] for entry in service.list_archives(directory="results")] == ["old.json"]
+    assert service.get_last_run()["archived"] == 1
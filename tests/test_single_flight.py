@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求合并测试
+键相同的并发请求只计算一次，异常传递给所有等待的请求，配置缓存时结果在有效期内复用
+"""
+import asyncio
+import threading
+import time
+
+from services.cache_service import CacheService, MemoryCacheBackend
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_coalesced():
+    calls = []
+    lock = threading.Lock()
+
+    def compute():
+        with lock:
+            calls.append(1)
+        time.sleep(0.05)
+        return {"value": 1}
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.run("convert", "k", compute) for _ in range(5)))
+        other = await flight.run("convert", "other", compute)
+        return flight, results, other
+
+    flight, results, other = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert [result for result, _ in results] == [{"value": 1}] * 5
+    assert sorted(coalesced for _, coalesced in results) == [False] + [True] * 4
+    assert other == ({"value": 1}, False)
+    assert flight.stats()["convert"] == {"calls": 6, "coalesced": 4, "executions": 2}
+
+
+def test_errors_propagate():
+    def compute():
+        time.sleep(0.02)
+        raise ValueError("失败")
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.run("analyze", "k", compute) for _ in range(3)),
+                                       return_exceptions=True)
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()["analyze"]["errors"] == 1
+    assert "inflight" not in flight.stats()["analyze"]
+
+
+def test_shared_cache_reuses_result():
+    calls = []
+    flight = SingleFlight(cache=CacheService(MemoryCacheBackend()), result_ttl=60)
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    first = asyncio.run(flight.run("execute", "k", compute))
+    second = asyncio.run(flight.run("execute", "k", compute))
+    assert (first, second) == ((1, False), (1, True))
+    assert flight.stats()["execute"]["coalesced_remote"] == 1
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+需求修订增量生成测试
+被修改的需求重新生成测试用例，不能通过复用索引沿用修改前的测试用例
+"""
+import os
+
+import pytest
+
+from config import Config
+from services import test_case_service
+
+RULE = "订单金额满一百元时优惠券可与满减活动叠加使用，叠加后的优惠总额不超过订单金额的一半，超出部分按比例退回到用户账户"
+EDITED_RULE = RULE.replace("退回", "退还")
+POINTS_RULE = "会员积分每月月底清零"
+
+
+class FakeLangChainService:
+    """记录调用的大模型服务替身"""
+
+    def __init__(self):
+        self.requests = []
+
+    def get_prompt_version(self, name):
+        return "v1"
+
+    def generate_test_cases_batched(self, requirements, contexts):
+        self.requests.append(list(requirements))
+        return [f"用例: {requirement}" for requirement in requirements]
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    for name in ("TEST_POINT_REGISTRY_PATH", "REUSE_INDEX_PATH", "REQUIREMENT_VERSION_STORE_PATH"):
+        monkeypatch.setattr(Config, name, os.path.join(str(tmp_path), f"{name.lower()}.db"))
+    # 开启模糊复用，修改前后的需求相似度超过阈值，仍不能复用旧测试用例
+    monkeypatch.setattr(Config, "REUSE_FUZZY_ENABLED", True)
+    service = test_case_service.TestCaseConversionService()
+    service.langchain_service = FakeLangChainService()
+    return service
+
+
+def units(*contents):
+    return [{"kind": "paragraph", "location": f"段落{i}", "content": content} for i, content in enumerate(contents, 1)]
+
+
+def test_changed_unit_regenerated(service):
+    first = service.regenerate_from_requirements("doc", units("一、优惠规则", RULE, POINTS_RULE))
+    assert first["status"] == "success"
+    assert service.langchain_service.requests == [[RULE, POINTS_RULE]]
+
+    second = service.regenerate_from_requirements("doc", units("一、优惠规则", EDITED_RULE, POINTS_RULE))
+    assert second["status"] == "success"
+    assert service.langchain_service.requests[-1] == [EDITED_RULE]
+    assert [change["content"] for change in second["changed"]] == [EDITED_RULE]
+    assert second["changed"][0]["generated_test_cases"] == f"用例: {EDITED_RULE}"
+    assert second["changed"][0]["previous_content"] == RULE
+    assert second["unchanged"] == 2
+    assert second["reused_artefacts"] == []
+
+
+def test_added_unit_reuses_similar_unit_of_other_document(service):
+    service.regenerate_from_requirements("doc-a", units(RULE))
+    second = service.regenerate_from_requirements("doc-b", units(EDITED_RULE))
+    assert service.langchain_service.requests == [[RULE]]
+    assert second["added"][0]["generated_test_cases"] == f"用例: {RULE}"
+    assert second["reused_artefacts"][0]["source_content"] == RULE
+
+
+def test_unchanged_document_skipped(service):
+    service.regenerate_from_requirements("doc", units(RULE), sha256="abc")
+    second = service.regenerate_from_requirements("doc", units(RULE), sha256="abc")
+    assert len(service.langchain_service.requests) == 1
+    assert second["version"] == second["previous_version"] == 1
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试要点去重测试
+近似重复的要点合并为一簇，数字、否定词、HTTP方法或接口路径不同的要点不能合并
+"""
+from services import test_point_dedup
+
+
+def test_exact_duplicates_merged():
+    texts = ["用户登录成功", "用户登录成功。", "  用户登录成功 "]
+    assert test_point_dedup.TestPointDeduplicator().cluster(texts) == [[0, 1, 2]]
+
+
+def test_near_duplicates_merged():
+    texts = [
+        "用户账户余额充足且已完成实名认证时允许发起转账",
+        "用户账户余额充足且已经完成实名认证时允许发起转账"
+    ]
+    assert test_point_dedup.TestPointDeduplicator().cluster(texts) == [[0, 1]]
+
+
+def test_negation_not_merged():
+    texts = [
+        "用户账户余额充足且已完成实名认证时允许发起转账",
+        "用户账户余额充足且已完成实名认证时不允许发起转账"
+    ]
+    assert test_point_dedup.TestPointDeduplicator().cluster(texts) == [[0], [1]]
+
+
+def test_english_negation_not_merged():
+    texts = ["The user can transfer money after verification",
+             "The user cannot transfer money after verification"]
+    assert test_point_dedup.TestPointDeduplicator().cluster(texts) == [[0], [1]]
+
+
+def test_http_method_not_merged():
+    texts = ["GET /api/users returns list", "POST /api/users returns list"]
+    assert test_point_dedup.TestPointDeduplicator().cluster(texts) == [[0], [1]]
+
+
+def test_api_path_not_merged():
+    texts = ["GET /api/users returns the full list", "GET /api/roles returns the full list"]
+    assert test_point_dedup.TestPointDeduplicator().cluster(texts) == [[0], [1]]
+
+
+def test_numbers_not_merged():
+    texts = ["借款期限为12个月时利率为5%", "借款期限为24个月时利率为5%"]
+    assert test_point_dedup.TestPointDeduplicator().cluster(texts) == [[0], [1]]
+
+
+def test_extract_guard_tokens():
+    tokens = test_point_dedup.TestPointDeduplicator.extract_guard_tokens("使用POST请求 /api/v1/users 时禁止重复提交")
+    assert tokens == ["post", "/api/v1/users", "禁止"]
+
+
+def test_summarize():
+    texts = ["用户登录成功", "用户登录成功。", "用户退出登录"]
+    deduplicator = test_point_dedup.TestPointDeduplicator()
+    summary = deduplicator.summarize(texts, deduplicator.cluster(texts))
+    assert summary["unique_points"] == 2
+    assert summary["llm_calls_saved"] == 1
+    assert summary["duplicate_clusters"] == [{"representative": "用户登录成功", "duplicates": ["用户登录成功。"]}]
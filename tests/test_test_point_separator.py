@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试要点分离测试
+编号样式与层级识别、日期不视为编号、无编号文本按句拆分，以及稳定ID
+"""
+from services import test_point_separator
+from services.test_point_separator import compute_point_id, generation_points, normalize_point_content
+
+
+def separate(text: str):
+    return list(test_point_separator.TestPointSeparator().iter_points_from_text(text))
+
+
+def test_hierarchy_and_context():
+    points = separate("一、登录模块\n1. 正确密码登录成功\n2. 错误密码\n提示密码错误\n二、退出模块\n1. 退出成功")
+    assert [(p["number"], p["level"], p["path"]) for p in points] == [
+        ("一", 1, "一"), ("1", 2, "一/1"), ("2", 2, "一/2"), ("二", 1, "二"), ("1", 2, "二/1")
+    ]
+    assert points[0]["has_children"] and not points[1]["has_children"]
+    assert points[1]["parent_id"] == points[0]["id"]
+    assert points[2]["content"] == "错误密码\n提示密码错误"
+    assert points[4]["context"] == ["退出模块"]
+    assert generation_points(points) == [
+        "登录模块\n正确密码登录成功", "登录模块\n错误密码\n提示密码错误", "退出模块\n退出成功"
+    ]
+
+
+def test_heading_is_section():
+    points = separate("# 用户管理\n- 新增用户\n- 删除用户")
+    assert [(p["number"], p["section"]) for p in points] == [("1", "用户管理"), ("2", "用户管理")]
+
+
+def test_date_is_not_numbering():
+    points = separate("1. 有效期至\n2024.1.1 之后失效\n2. 续期")
+    assert [p["content"] for p in points] == ["有效期至\n2024.1.1 之后失效", "续期"]
+
+
+def test_unnumbered_text_split_by_sentence():
+    points = separate("用户可以登录。用户可以退出。")
+    assert [p["content"] for p in points] == ["用户可以登录", "用户可以退出"]
+
+
+def test_stable_ids():
+    assert normalize_point_content("  用户 登录。") == normalize_point_content("用户 登录")
+    assert compute_point_id("用户登录") == compute_point_id("用户登录。")
+    first, second = separate("1. 登录\n2. 登录")
+    assert first["id"] != second["id"]
+    assert [p["id"] for p in separate("1. 登录\n2. 退出")] == [p["id"] for p in separate("(1) 登录\n(2) 退出")]